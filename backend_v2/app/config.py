@@ -17,6 +17,13 @@ class Settings(BaseSettings):
     
     # Apify
     APIFY_TOKEN: str = ""
+    APIFY_API_URL: str = ""  # override the API base, e.g. http://localhost:8765 (fake_apify_server.py)
+    # Async mode: start the actor run and resume the pipeline from its webhook (see routers/pipeline.py)
+    APIFY_ASYNC_MODE: bool = False
+    APIFY_WEBHOOK_BASE_URL: str = ""  # public URL of this API; empty = polling only
+    APIFY_WEBHOOK_SECRET: str = ""  # expected as ?token= on the webhook; required for webhooks
+    APIFY_POLL_SECONDS: int = 30  # fallback polling of pending runs (lost webhooks)
+    APIFY_RUN_DEADLINE_SECONDS: int = 1200  # unfinished runs older than this fail their job
     
     # Gemini
     # Gemini
@@ -32,6 +39,55 @@ class Settings(BaseSettings):
     RUNPOD_API_KEY: str = ""
     IMAGE_PROVIDER: str = "dalle"  # dalle, comfyui
     
+    # Text-to-Speech clip cache
+    TTS_CACHE_DIR: str = ""  # default: <tmp>/pixely_tts_cache
+    TTS_CACHE_MAX_MB: int = 256
+    TTS_BATCH_CONCURRENCY: int = 4  # parallel edge_tts sessions per batch
+    
+    # Logging (see logging_config.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # per-module overrides, e.g. "httpx=WARNING,app.services.database=DEBUG"
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_FILE: str = ""  # optional file sink, written off the request path
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # fraction of DEBUG records kept
+
+    # Observability (tracing is off unless an OTLP endpoint is set)
+    OTEL_EXPORTER_OTLP_ENDPOINT: str = ""  # e.g. http://localhost:4318
+    OTEL_SERVICE_NAME: str = "pixely-backend"
+    METRICS_DIR: str = ""  # per-worker snapshots summed by /metrics (gunicorn.conf.py sets it for >1 worker)
+
+    # Shared state between workers (see services/state_store.py)
+    STATE_BACKEND: str = "memory"  # memory | sqlite | redis (memory = one worker only, see gunicorn.conf.py)
+    STATE_SQLITE_PATH: str = ""  # default: <tmp>/pixely_state.sqlite3
+    REDIS_URL: str = "redis://localhost:6379/0"
+    STATE_PURGE_SECONDS: int = 600  # how often expired entries are deleted (sqlite / memory)
+
+    # Local classifier tier (see services/local_classifier.py)
+    LOCAL_CLASSIFIER_ENABLED: bool = True
+    LOCAL_CLASSIFIER_THRESHOLD: float = 0.75  # confidence needed to skip the LLM (raw score unless calibrated)
+    LOCAL_CLASSIFIER_CALIBRATION: str = ""  # "a,b" fitted with bench_local_classifier.py; empty = raw score
+
+    # Analysis pipeline: per-stage timeout overrides, e.g. "scrape=1200,strategy=600"
+    PIPELINE_STAGE_TIMEOUTS: str = ""
+
+    # Strategy generation (see services/strategy_generator.py)
+    STRATEGY_CONCURRENCY: int = 4  # parallel concept completions
+    STRATEGY_BRANCH_RETRIES: int = 2  # extra attempts per failed branch
+
+    # Interview attachments (see services/documents.py)
+    DOCUMENTS_DIR: str = ""  # default: <tmp>/pixely_documents
+    DOCUMENT_MAX_MB: int = 25
+    DOCUMENT_PARSE_WORKERS: int = 2  # process pool for xlsx/pdf/docx parsing
+
+    # Classified items per report, as Parquet (see services/item_store.py)
+    ITEM_STORE_DIR: str = ""  # set in production; default: <tmp>/pixely_items (dev only, logs a warning)
+
+    # Incremental Instagram scraping (see services/scrape_state.py)
+    SCRAPE_INCREMENTAL: bool = True
+    SCRAPE_REFRESH_HOURS: int = 72  # recent posts are re-fetched: their comments still move
+    SCRAPE_FULL_REFRESH_DAYS: int = 7  # full re-scrape after this (drops deleted posts)
+    SCRAPE_CACHE_TTL_SECONDS: int = 900  # identical scrapes within this window reuse the result (0 = off)
+
     # Server
     PORT: int = 8000
     
@@ -0,0 +1,138 @@
+"""
+Logging setup for Backend v2.
+
+All records go through a QueueHandler; a single QueueListener thread does the
+formatting and I/O, so request handlers never block on stdout or files.
+
+Settings (see config.py):
+    LOG_LEVEL              root level (default INFO)
+    LOG_LEVELS             per-module overrides: "app.services.database=WARNING,httpx=WARNING"
+    LOG_FORMAT             "json" (one object per line) or "text"
+    LOG_FILE               optional extra file sink (written by the listener thread)
+    LOG_DEBUG_SAMPLE_RATE  fraction of DEBUG records kept (0..1)
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+from .config import settings
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records; INFO and above always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that skips the eager `prepare()` formatting: the record is
+    enqueued as-is and formatted on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, level = part.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Install the queue-based pipeline on the root logger (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter: logging.Formatter
+    if settings.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    sinks: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        sinks.append(logging.FileHandler(settings.LOG_FILE, encoding="utf-8"))
+    for sink in sinks:
+        sink.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _EnqueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork (gunicorn --preload): start a fresh one per worker
+    global _listener
+    if _listener is not None:
+        _listener = None
+        setup_logging()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
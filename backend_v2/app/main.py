@@ -4,30 +4,51 @@ Backend v2: The Aggregation Engine
 FastAPI entry point for the new serverless backend.
 """
 
+import asyncio
 import logging
 # Force reload trigger
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from .config import settings
+from .logging_config import setup_logging, shutdown_logging
+from .services.response_cache import ResponseCacheMiddleware, response_cache
+from .services.metrics import render_prometheus, setup_tracing, flush_snapshot, flush_snapshots_periodically
+from .services.documents import shutdown_pool as shutdown_document_pool
+from .services.state_store import purge_expired_periodically
 from .routers import pipeline, clients, analysis, auth, tasks, interview, personas, tts, strategy, brand, admin, planning, images, studio
 
+setup_logging()
+
 # Lifespan context
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: logging, db connections if needed
+    # Startup: SDK clients (Supabase, OpenAI, google.genai, Apify, edge_tts) are
+    # created lazily on first use, so nothing heavy happens here.
     logging.info("Starting up Aggregation Engine...")
-    print("--- LIFESPAN STARTUP ---")
-    for route in app.routes:
-        print(f"ROUTE: {route.path}")
-    print("------------------------")
+    setup_tracing()
+    _check_configuration()
+    logging.debug(f"{len(app.routes)} routes registered")
+    # Async Apify mode: fallback polling of pending runs (lost webhooks, run deadline)
+    apify_poller = asyncio.create_task(pipeline.poll_apify_runs()) if settings.APIFY_ASYNC_MODE else None
+    state_purger = asyncio.create_task(purge_expired_periodically())
+    # Several workers: each one's metrics go to METRICS_DIR, /metrics sums them
+    metrics_flusher = asyncio.create_task(flush_snapshots_periodically()) if settings.METRICS_DIR else None
     yield
     # Shutdown: Clean up resources
-    print("--- LIFESPAN SHUTDOWN ---")
     logging.info("Shutting down Aggregation Engine...")
+    if apify_poller:
+        apify_poller.cancel()
+    state_purger.cancel()
+    if metrics_flusher:
+        metrics_flusher.cancel()
+        flush_snapshot()
+    shutdown_document_pool()
     logging.info("✅ All async resources cleaned up")
+    shutdown_logging()
 
 app = FastAPI(
     title="Pixely Partners API v2",
@@ -36,55 +57,35 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-@app.on_event("startup")
-async def startup_event():
+def _check_configuration():
     """Validate configuration and log startup status."""
-    print("--- REGISTERED ROUTES ---")
-    for route in app.routes:
-        print(f"ROUTE: {route.path}")
-    print("-------------------------")
-    
-    # Validate critical configuration
-    print("\n--- CONFIGURATION CHECK ---")
-    
     # Check Supabase
     if not settings.SUPABASE_URL:
         logging.warning("⚠️  SUPABASE_URL not configured - database operations will fail!")
-        print("⚠️  SUPABASE_URL: MISSING")
     else:
-        print(f"✅ SUPABASE_URL: Configured ({settings.SUPABASE_URL[:30]}...)")
+        logging.info(f"✅ SUPABASE_URL: Configured ({settings.SUPABASE_URL[:30]}...)")
     
     if not settings.SUPABASE_KEY:
         logging.warning("⚠️  SUPABASE_KEY not configured - public operations will fail!")
-        print("⚠️  SUPABASE_KEY: MISSING")
-    else:
-        print("✅ SUPABASE_KEY: Configured")
     
     # CRITICAL: Service Key for admin operations
     if not settings.SUPABASE_SERVICE_KEY:
         logging.error("❌ SUPABASE_SERVICE_KEY not configured - ADMIN OPERATIONS WILL FAIL!")
         logging.error("   This includes: user creation, password reset, user updates")
-        print("❌ SUPABASE_SERVICE_KEY: MISSING - ADMIN FEATURES DISABLED!")
-    else:
-        print("✅ SUPABASE_SERVICE_KEY: Configured")
     
     # Check Apify
     if not settings.APIFY_TOKEN:
         logging.warning("⚠️  APIFY_TOKEN not configured - scraping will fail!")
-        print("⚠️  APIFY_TOKEN: MISSING")
-    else:
-        print("✅ APIFY_TOKEN: Configured")
+    if settings.APIFY_ASYNC_MODE and settings.APIFY_WEBHOOK_BASE_URL and not settings.APIFY_WEBHOOK_SECRET:
+        logging.error("❌ APIFY_WEBHOOK_SECRET not configured - Apify webhooks are disabled, runs resume by polling only")
     
     # Check Gemini
     if not settings.GEMINI_API_KEY:
         logging.warning("⚠️  GEMINI_API_KEY not configured - AI analysis will fail!")
-        print("⚠️  GEMINI_API_KEY: MISSING")
-    else:
-        print("✅ GEMINI_API_KEY: Configured")
-    
-    print("---------------------------\n")
 
 # Middleware
+# Response cache goes first so CORS (added last = outermost) decorates cached responses per request
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Strictify in logic later if needed
@@ -135,6 +136,15 @@ async def health_check():
         }
     }
 
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus scrape endpoint (pipeline stages, DB, LLM and image timings).
+    Summed over all workers when METRICS_DIR is set: see services/metrics.py.
+    """
+    body = await asyncio.to_thread(render_prometheus)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 @app.get("/debug-env", tags=["Health"])
 async def debug_env():
     """Debug environment variables."""
@@ -11,7 +11,7 @@ from typing import Optional, List
 from datetime import datetime
 import logging
 
-from ..services.database import db
+from ..services.database import db, TASK_SUMMARY_COLUMNS
 from ..services import gemini_service, aggregator
 
 
@@ -277,10 +277,9 @@ async def get_module_status(brand_id: str, module_id: str) -> dict:
     
     elif module_id == "strategy":
         # Depende de Analysis
-        report = db.get_latest_completed_report(brand_id)
-        strategies = db.get_strategy_nodes(brand_id) if hasattr(db, 'get_strategy_nodes') else []
+        report = db.get_latest_report_header(brand_id)
         
-        if strategies and len(strategies) > 0:
+        if db.has_strategy_nodes(brand_id):
             return {"status": "completed", "can_execute": True}
         elif report:
             return {"status": "ready", "can_execute": True}
@@ -288,8 +287,7 @@ async def get_module_status(brand_id: str, module_id: str) -> dict:
     
     elif module_id == "schedule":
         # Depende de Strategy
-        strategies = db.get_strategy_nodes(brand_id) if hasattr(db, 'get_strategy_nodes') else []
-        if strategies and len(strategies) > 0:
+        if db.has_strategy_nodes(brand_id):
              return {"status": "ready", "can_execute": True}
         return {"status": "pending", "can_execute": False}
     
@@ -400,8 +398,7 @@ async def create_brand_user(brand_id: str, request: UserCreate):
 @router.post("/brands/{brand_id}/analysis")
 async def execute_analysis(brand_id: str, request: AnalysisRequest, background_tasks: BackgroundTasks):
     """Execute analysis for a brand."""
-    from ..routers.pipeline import _run_full_pipeline
-    import uuid
+    from ..routers.pipeline import launch_pipeline
     
     # Verify brand exists
     brand = db.get_client(brand_id)
@@ -421,22 +418,11 @@ async def execute_analysis(brand_id: str, request: AnalysisRequest, background_t
         # Call the pipeline manually
         logger.info(f"Starting {request.analysis_type} analysis for brand {brand_id}")
         
-        report_id = str(uuid.uuid4())
-        
-        # 1. Create record in Supabase
-        db.create_report(report_id, brand_id, status="PROCESSING")
-        
-        # 2. Launch background task
-        background_tasks.add_task(
-            _run_full_pipeline, 
-            report_id=report_id,
-            client_id=brand_id,
-            instagram_url=request.instagram_url,
-            comments_limit=1000 # Default limit
-        )
+        # Create record + launch background task (or attach to the running one)
+        report_id, attached = launch_pipeline(background_tasks, brand_id, request.instagram_url)
         
         return {
-            "status": "started",
+            "status": "attached" if attached else "started",
             "analysis_type": request.analysis_type,
             "report_id": report_id,
             "message": f"Análisis {'de marca real' if request.analysis_type == 'real' else 'aspiracional'} iniciado"
@@ -455,10 +441,26 @@ async def get_brand_strategies(brand_id: str):
 
 
 @router.get("/brands/{brand_id}/tasks")
-async def get_brand_tasks(brand_id: str):
-    """Get tasks/schedule for a brand."""
-    tasks = db.get_tasks(brand_id) if hasattr(db, 'get_tasks') else []
-    return {"tasks": tasks}
+async def get_brand_tasks(
+    brand_id: str,
+    month_group: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """Get tasks/schedule for a brand (summary columns, keyset-paginated)."""
+    try:
+        page = db.get_tasks_page(
+            brand_id,
+            limit=limit,
+            cursor=cursor,
+            columns=TASK_SUMMARY_COLUMNS,
+            month_group=month_group,
+            status=status
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"tasks": page["items"], "next_cursor": page["next_cursor"]}
 
 
 @router.post("/brands/{brand_id}/manual")
@@ -499,7 +501,8 @@ async def seed_strategy_manually(brand_id: str):
     logger.info(f"♟️ [Admin] Iniciando generación manual de estrategia para {brand_id}")
     
     # 1. Validar prerrequisitos
-    report = db.get_latest_completed_report(brand_id)
+    # La estrategia solo usa Q9/Q10 del análisis
+    report = db.get_latest_completed_report(brand_id, sections=["Q9", "Q10"])
     if not report or not report.get("frontend_compatible_json"):
         raise HTTPException(
             status_code=400, 
@@ -577,7 +580,7 @@ async def reset_brand_strategy(brand_id: str):
             }
         
         # 3. Get analysis data
-        analysis = db.get_latest_completed_report(brand_id)
+        analysis = db.get_latest_completed_report(brand_id, sections=["Q9", "Q10"])
         if not analysis:
             logger.warning(f"⚠️ No analysis data found for {brand_name}, using minimal data")
             analysis = {
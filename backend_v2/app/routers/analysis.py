@@ -1,22 +1,55 @@
 
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
-from ..services.database import db
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from ..services.database import db, content_hash
+from ..services import item_store
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/semantic", tags=["Analysis"])
 
+def _matches_etag(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
 @router.get("/analysis/{client_id}") # Quitamos response_model para flexibilidad
-async def get_latest_analysis(client_id: str):
+async def get_latest_analysis(client_id: str, request: Request, response: Response, sections: Optional[str] = None):
     """
     Recupera el último análisis completado desde Supabase.
+    
+    - `sections=Q1,Q8` carga solo esos bloques.
+    - Devuelve ETag (hash del contenido); con If-None-Match igual responde 304
+      sin cargar los bloques JSON.
     """
-    report = db.get_latest_completed_report(client_id)
+    header = db.get_latest_report_header(client_id)
     
-    if not report:
+    if not header:
         raise HTTPException(status_code=404, detail="No analysis found")
     
-    return report.get("frontend_compatible_json", {})
+    wanted = [s.strip() for s in sections.split(",") if s.strip()] if sections else None
+    version = header.get("content_hash")
+    
+    if version:
+        etag = f'"{version}-{",".join(wanted)}"' if wanted else f'"{version}"'
+        if _matches_etag(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    
+    payload = db.get_report_sections(header, wanted)
+    
+    if not version:
+        # Legacy row (pre-split): hash what we loaded
+        etag = f'"{content_hash(payload)}"'
+        if _matches_etag(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return payload
 
 @router.get("/clients")
 async def get_clients_for_analysis():
@@ -51,3 +84,101 @@ async def get_context_status(client_id: str):
         "cache_active": status == "COMPLETED",
         "files": []
     }
+
+
+# ============================================================================
+# Drill-down over stored classified items (services/item_store.py)
+# ============================================================================
+
+# Query-string names -> item columns
+ITEM_DIMENSIONS = {
+    "topic": "ai_topic",
+    "emotion": "ai_emotion",
+    "personality": "ai_personality",
+    "week": "week",
+    "author": "author",
+    "post": "post_id",
+}
+
+
+def _item_scope(client_id: str, report_id: Optional[str]) -> Optional[str]:
+    """Missing report_id = latest report; "all" = every stored report of the client."""
+    if not item_store.available():
+        raise HTTPException(status_code=503, detail="Item store not available (duckdb/pyarrow missing)")
+    if report_id == "all":
+        return None
+    if report_id:
+        return report_id
+    header = db.get_latest_report_header(client_id)
+    if not header:
+        raise HTTPException(status_code=404, detail="No analysis found")
+    return header["id"]
+
+
+def _dimension(name: str) -> str:
+    if name not in ITEM_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown dimension '{name}' (use: {', '.join(ITEM_DIMENSIONS)})")
+    return ITEM_DIMENSIONS[name]
+
+
+async def _run_item_query(fn, *args, **kwargs):
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/items/{client_id}")
+async def list_classified_items(
+    client_id: str,
+    report_id: Optional[str] = None,
+    topic: Optional[str] = None,
+    emotion: Optional[str] = None,
+    personality: Optional[str] = None,
+    week: Optional[date] = None,
+    author: Optional[str] = None,
+    post: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """
+    Comentarios clasificados (más recientes primero), filtrables por tópico,
+    emoción, personalidad, semana (inicio de la semana de Q8: martes,
+    YYYY-MM-DD), autor o post.
+    """
+    scope = _item_scope(client_id, report_id)
+    filters = {"ai_topic": topic, "ai_emotion": emotion, "ai_personality": personality,
+               "week": week, "author": author, "post_id": post}
+    return await _run_item_query(item_store.list_items, client_id, scope, filters, limit, offset)
+
+
+@router.get("/items/{client_id}/breakdown")
+async def classified_items_breakdown(
+    client_id: str,
+    by: str = "topic",
+    report_id: Optional[str] = None,
+    topic: Optional[str] = None,
+    emotion: Optional[str] = None,
+    week: Optional[date] = None
+):
+    """Conteo, % y sentimiento por dimensión (`by`), p. ej. emociones dentro de un tópico."""
+    scope = _item_scope(client_id, report_id)
+    filters = {"ai_topic": topic, "ai_emotion": emotion, "week": week}
+    return await _run_item_query(item_store.breakdown, client_id, _dimension(by), scope, filters)
+
+
+@router.get("/items/{client_id}/authors/{author}")
+async def classified_items_author(client_id: str, author: str):
+    """Perfil de un usuario a través de todos los reportes del cliente."""
+    _item_scope(client_id, "all")
+    profile = await _run_item_query(item_store.author_profile, client_id, author)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Author not found in stored reports")
+    return profile
+
+
+@router.get("/items/{client_id}/trend")
+async def classified_items_trend(client_id: str, by: Optional[str] = None):
+    """Volumen y sentimiento por reporte (opcionalmente desglosado por `by`) para comparar reportes."""
+    _item_scope(client_id, "all")
+    return await _run_item_query(item_store.report_trend, client_id, _dimension(by) if by else None)
@@ -9,7 +9,7 @@ import logging
 from typing import Optional, Any
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
 from ..services.database import db
 
@@ -64,9 +64,19 @@ class ClientStatus(BaseModel):
 # ============================================================================
 
 @router.get("", response_model=list[ClientResponse])
-async def list_clients():
-    """List all clients from Supabase."""
-    return db.list_clients()
+async def list_clients(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None):
+    """
+    List clients from Supabase. Without `limit` / `cursor`, every client; with them,
+    keyset-paginated, and the cursor for the next page (if any) is returned in the
+    X-Next-Cursor header.
+    """
+    try:
+        page = db.list_clients_page(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["items"]
 
 
 @router.post("", response_model=ClientResponse)
@@ -159,7 +169,7 @@ async def get_client_status(client_id: str):
         can_execute = has_interview and has_brand
     
     # Get latest analysis status (placeholder for now)
-    latest_analysis = db.get_latest_completed_report(client_id)
+    latest_analysis = db.get_latest_report_header(client_id)
     last_date = None
     analysis_status = None
     
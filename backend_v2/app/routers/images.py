@@ -117,23 +117,28 @@ async def get_task_images(task_id: str):
 
 
 @router.get("/client/{client_id}")
-async def get_client_images(client_id: str, limit: int = 50):
+async def get_client_images(client_id: str, limit: int = 50, cursor: Optional[str] = None):
     """
     Get recent generated images for a client (for gallery view).
     
     Args:
         client_id: Client identifier
         limit: Maximum number of images to return (default: 50)
+        cursor: next_cursor from the previous page
     """
     try:
-        images = await image_service.get_images_for_client(client_id, limit)
+        page = await image_service.get_images_for_client(client_id, limit, cursor=cursor)
+        images = page["items"]
         
         return {
             "status": "success",
             "count": len(images),
-            "images": images
+            "images": images,
+            "next_cursor": page["next_cursor"]
         }
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Failed to fetch client images: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -4,6 +4,7 @@ import json
 from typing import Optional
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
 from ..services.database import db
+from ..services.documents import ingest_upload, DocumentTooLarge
 
 logger = logging.getLogger(__name__)
 
@@ -26,32 +27,21 @@ async def save_interview_data(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON format in 'data' field")
 
-        # 2. Handle File (Read content for Context)
+        # 2. Handle File: stored, parsed off-loop and indexed for retrieval
         if file:
             logger.info(f"Processing file: {file.filename} ({file.content_type})")
-            file_content = ""
             
             try:
-                contents = await file.read()
+                doc = await ingest_upload(client_id, file)
                 
-                if file.filename.endswith('.xlsx') or file.filename.endswith('.xls'):
-                    import pandas as pd
-                    from io import BytesIO
-                    df = pd.read_excel(BytesIO(contents))
-                    # Convert full dataframe to string for context
-                    file_content = df.to_string()
-                elif file.filename.endswith('.pdf'):
-                    # Basic PDF text extraction (Placeholder - requires pypdf or similar if strictly needed)
-                    # For now we skip complex PDF parsing to avoid extra heavy deps unless requested
-                    file_content = f"[PDF File: {file.filename} uploaded. Content extraction pending.]"
-                else:
-                    # Generic text decoding
-                    file_content = contents.decode('utf-8', errors='ignore')
-                
-                # Ingest into context
-                parsed_data["product_context"] = file_content[:10000] # Limit context size
+                # Durable fallback for prompts if the local index is lost; prompts
+                # normally retrieve relevant chunks via document_index.retrieve_context
+                parsed_data["product_context"] = doc.pop("preview")
                 parsed_data["attached_file_name"] = file.filename
+                parsed_data["attached_document"] = doc
                 
+            except DocumentTooLarge as file_err:
+                raise HTTPException(status_code=413, detail=str(file_err))
             except Exception as file_err:
                 logger.error(f"Error reading file {file.filename}: {file_err}")
                 parsed_data["file_error"] = str(file_err)
@@ -61,6 +51,8 @@ async def save_interview_data(
 
         return {"status": "success", "message": "Interview data saved successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error saving interview for client {client_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from ..config import settings
 from ..services.database import db
 from ..services.gemini_service import _call_gemini
+from ..services.document_index import retrieve_context
 
 router = APIRouter(prefix="/clients", tags=["Personas"])
 logger = logging.getLogger(__name__)
@@ -32,12 +33,17 @@ async def generate_personas(client_id: str, request: PersonaRequest):
             interview_data = db.get_interview(client_id)
             if interview_data and interview_data.get("data"):
                 stored = interview_data["data"]
+                # Catalog chunks relevant to this audience, not the file's first pages
+                query = json.dumps([request.audience_data, request.business_context], ensure_ascii=False)
+                catalog = retrieve_context(
+                    client_id, query, max_chars=3000, fallback=stored.get('product_context', '')
+                ) or 'No disponible'
                 interview_context = f"""
                 Nombre del Negocio: {stored.get('businessName', 'N/A')}
                 Historia: {stored.get('history', 'N/A')}
                 Visión: {stored.get('vision', 'N/A')}
                 Diferenciadores: {stored.get('differentiator', [])}
-                Catálogo de Productos: {stored.get('product_context', 'No disponible')[:3000]}
+                Catálogo de Productos: {catalog}
                 """
         except Exception as e:
             logger.warning(f"Could not fetch interview context: {e}")
@@ -1,10 +1,24 @@
 
+import asyncio
+import hmac
 import logging
+import time
+import uuid
 from typing import Optional
 from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel
-from ..services import apify_service, gemini_service, aggregator
+from ..services import apify_service, gemini_service, aggregator, item_store
 from ..services.database import db
+from ..services.response_cache import response_cache
+from ..services.metrics import pipeline_stage, current_tenant
+from ..services.state_store import (
+    get_state_store, set_job_state, get_job_state, delete_job_state, claim_inflight, refresh_inflight, release_inflight
+)
+from ..services.scrape_state import normalize_profile_url
+from ..services.dedup import collapse_comments, SKIPPED_CLASSIFICATION
+from ..services.document_index import retrieve_context
+from ..services.pipeline_dag import Stage, run_dag
+from ..config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/pipeline", tags=["Pipeline"])
@@ -26,151 +40,313 @@ class PipelineStatusResponse(BaseModel):
     progress: int
     message: Optional[str] = None
 
-# Endpoints
-@router.post("/start", response_model=PipelineStartResponse)
-async def start_pipeline(request: PipelineStartRequest, background_tasks: BackgroundTasks):
-    import uuid
+# Lanzamiento (single-flight por cliente + perfil)
+def _inflight_key(client_id: str, instagram_url: str) -> str:
+    return f"pipeline:{client_id}:{normalize_profile_url(instagram_url)}"
+
+
+def launch_pipeline(background_tasks: BackgroundTasks, client_id: str, instagram_url: str,
+                    comments_limit: int = 1000) -> tuple[str, bool]:
+    """
+    Create the report and schedule the pipeline. Single-flight per client + profile:
+    if one is already running (any worker), nothing is started and its report_id
+    is returned instead. Returns (report_id, attached).
+    """
     report_id = str(uuid.uuid4())
-    
-    # 1. Crear registro en Supabase
-    db.create_report(report_id, request.client_id, status="PROCESSING")
+    # Written before claiming: claim_inflight treats entries without a job state as stale
+    set_job_state(report_id, "PROCESSING", 0, client_id=client_id)
+    running = claim_inflight(_inflight_key(client_id, instagram_url), report_id)
+    if running:
+        delete_job_state(report_id)  # never started: don't leave it PROCESSING
+        logger.info(f"🔗 Pipeline already running for {client_id} / {instagram_url}: attaching to {running}")
+        return running, True
 
-    # 2. Lanzar tarea en background (Pasando argumentos explícitos)
+    try:
+        db.create_report(report_id, client_id, status="PROCESSING")
+    except Exception as e:
+        set_job_state(report_id, "ERROR", 100, str(e), client_id=client_id)
+        release_inflight(_inflight_key(client_id, instagram_url), report_id)
+        raise
     background_tasks.add_task(
-        _run_full_pipeline, 
+        _run_full_pipeline,
         report_id=report_id,
-        client_id=request.client_id,  # <-- CRITICAL: Pass client_id for task generation
-        instagram_url=request.instagram_url, 
-        comments_limit=request.comments_limit
+        client_id=client_id,  # <-- CRITICAL: Pass client_id for task generation
+        instagram_url=instagram_url,
+        comments_limit=comments_limit
+    )
+    return report_id, False
+
+
+# Endpoints
+@router.post("/start", response_model=PipelineStartResponse)
+async def start_pipeline(request: PipelineStartRequest, background_tasks: BackgroundTasks):
+    # 1. Crear registro en Supabase y lanzar tarea en background (o unirse a la que ya corre)
+    report_id, attached = launch_pipeline(
+        background_tasks, request.client_id, request.instagram_url, request.comments_limit
     )
 
     return PipelineStartResponse(
         report_id=report_id,
         status="PROCESSING",
-        message="Pipeline started successfully"
+        message="Pipeline already running; attached to it" if attached else "Pipeline started successfully"
     )
 
-@router.get("/status/{report_id}")
+@router.get("/status/{report_id}", response_model=PipelineStatusResponse)
 async def get_pipeline_status(report_id: str):
-    return {"status": "Please check /semantic/analysis/{client_id} for results"}
+    # Progress is kept in the shared state store, so any worker can answer
+    job = get_job_state(report_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown or expired pipeline run. Check /semantic/analysis/{client_id} for results")
+    return PipelineStatusResponse(
+        report_id=report_id,
+        status=job["status"],
+        progress=job["progress"],
+        message=job.get("message")
+    )
 
 @router.get("/result/{report_id}")
 async def get_pipeline_result(report_id: str):
     return {"status": "Please use /semantic/analysis/{client_id}"}
 
 # Tarea Background (Limpia de memoria local)
-async def _run_full_pipeline(report_id: str, client_id: str, instagram_url: str, comments_limit: int = 1000):
-    try:
-        logger.info(f"🚀 [{report_id}] Pipeline STARTED for {instagram_url}")
-        
-        # PASO 1: SCRAPING
-        logger.info(f"📥 [{report_id}] Scraping Instagram...")
-        # Con latestComments (~8-10 por post), 12 posts = ~100 comentarios
-        # Esto garantiza 50-100 comentarios con 1 sola llamada a Apify
-        scrape_result = await apify_service.scrape_instagram_profile_with_posts_and_comments(
-            profile_url=instagram_url,
-            posts_limit=12,  # 12 posts * ~8-10 latestComments = 50-100 comentarios
-            comments_per_post=0  # No se usa, latestComments viene incluido
-        )
-        
+#
+# El pipeline es un DAG (services/pipeline_dag.py): cada etapa declara sus entradas
+# y arranca en cuanto están listas.
+#
+#   scrape ─────┐
+#   interview ──┼─> classify ─> aggregate ─┬─> interpret (+ brand)
+#   brand       │                          └─> strategy  (+ interview, client)
+#   client      │
+#
+# Las lecturas de DB corren en paralelo con el scraping, y la entrevista se lee una
+# sola vez. Interpretaciones y estrategia (independientes) corren a la vez.
+
+# Timeouts por etapa (segundos); override con PIPELINE_STAGE_TIMEOUTS="strategy=600,..."
+STAGE_TIMEOUTS = {
+    "scrape": 900,
+    "interview": 30,
+    "brand": 30,
+    "client": 30,
+    "classify": 900,
+    "aggregate": 120,
+    "interpret": 240,
+    "strategy": 420,
+    "items": 120,
+}
+
+
+# Con latestComments (~8-10 por post), 12 posts = ~100 comentarios:
+# 50-100 comentarios con 1 sola llamada a Apify
+POSTS_LIMIT = 12
+
+
+def _stage_timeouts() -> dict[str, float]:
+    timeouts = dict(STAGE_TIMEOUTS)
+    for part in settings.PIPELINE_STAGE_TIMEOUTS.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            try:
+                timeouts[name.strip()] = float(value)
+            except ValueError:
+                logger.warning(f"⚠️ Ignoring invalid stage timeout '{part}'")
+    return timeouts
+
+
+def _build_brand_context(interview_record: Optional[dict], client_id: str = "") -> str:
+    """Classification context from the interview answers (+ relevant attachment chunks)."""
+    if not interview_record or not interview_record.get("data"):
+        return ""
+    idata = interview_record.get("data", {})
+    
+    # Construir string de contexto rico
+    parts = []
+    if "Q1" in idata: parts.append(f"Misión/Descripción: {idata['Q1']}")
+    if "Q2" in idata: parts.append(f"Público Objetivo: {idata['Q2']}")
+    if "Q3" in idata: parts.append(f"Propuesta de Valor: {idata['Q3']}")
+    if "type" in idata: parts.append(f"Tipo de Producto: {idata['type']}")
+    if "competitors" in idata: parts.append(f"Competidores: {idata['competitors']}")
+    if "tone" in idata: parts.append(f"Tono deseado: {idata['tone']}")
+    
+    # Attachment chunks about what the interview says the brand sells
+    query = " ".join(str(idata.get(k, "")) for k in ("Q1", "Q3", "type", "competitors"))
+    attachment = retrieve_context(client_id, query, max_chars=2000, fallback=idata.get("product_context", ""))
+    if attachment:
+        parts.append(f"--- Contexto Adicional (Archivo) ---\n{attachment}")
+    
+    return "\n".join(parts)
+
+
+def _build_stages(report_id: str, client_id: str, instagram_url: str,
+                  scraped: Optional[dict] = None) -> list[Stage]:
+    timeouts = _stage_timeouts()
+
+    # PASO 1: SCRAPING (en modo asíncrono llega ya hecho: `scraped`)
+    async def scrape():
+        if scraped is not None:
+            scrape_result = scraped
+        else:
+            logger.info(f"📥 [{report_id}] Scraping Instagram...")
+            set_job_state(report_id, "SCRAPING", 10, client_id=client_id)
+            # Incremental: solo se piden a Apify los posts nuevos/recientes; el resto
+            # de la ventana sale del estado guardado del perfil (services/scrape_state.py).
+            # Un scrape idéntico reciente se reutiliza (SCRAPE_CACHE_TTL_SECONDS)
+            scrape_result = await apify_service.scrape_instagram_profile_cached(
+                profile_url=instagram_url,
+                posts_limit=POSTS_LIMIT
+            )
         all_content = scrape_result.get("all_comments", [])
         if not all_content:
             raise ValueError("No content retrieved from Instagram.")
-            
         logger.info(f"📦 [{report_id}] Scraped {len(all_content)} items")
+        return scrape_result
 
-        # PASO 1.5: RECUPERAR CONTEXTO DE ENTREVISTA (Integración)
-        brand_context = ""
-        try:
-            logger.info(f"🔍 [{report_id}] Fetching Interview Context for {client_id}...")
-            interview_record = db.get_interview(client_id)
-            if interview_record and interview_record.get("data"):
-                idata = interview_record.get("data", {})
-                
-                # Construir string de contexto rico
-                parts = []
-                if "Q1" in idata: parts.append(f"Misión/Descripción: {idata['Q1']}")
-                if "Q2" in idata: parts.append(f"Público Objetivo: {idata['Q2']}")
-                if "Q3" in idata: parts.append(f"Propuesta de Valor: {idata['Q3']}")
-                if "type" in idata: parts.append(f"Tipo de Producto: {idata['type']}")
-                if "competitors" in idata: parts.append(f"Competidores: {idata['competitors']}")
-                if "tone" in idata: parts.append(f"Tono deseado: {idata['tone']}")
-                
-                if "product_context" in idata:
-                    parts.append(f"--- Contexto Adicional (Archivo) ---\n{idata['product_context'][:2000]}...") # Limit context
-                
-                brand_context = "\n".join(parts)
-                logger.info(f"✅ [{report_id}] Context Loaded ({len(brand_context)} chars)")
-            else:
-                logger.warning(f"⚠️ [{report_id}] No Interview Data found. Analysis will be generic.")
-        except Exception as e:
-            logger.error(f"❌ [{report_id}] Failed to load interview context: {e}")
+    # PASO 2: CLASIFICACIÓN
+    async def classify(scrape, interview):
+        all_content = scrape["all_comments"]
+        delta = scrape.get("delta") or {}
+        brand_context = await asyncio.to_thread(_build_brand_context, interview, client_id)
+        if brand_context:
+            logger.info(f"✅ [{report_id}] Context Loaded ({len(brand_context)} chars)")
+        else:
+            logger.warning(f"⚠️ [{report_id}] No Interview Data found. Analysis will be generic.")
 
-        # PASO 2: CLASIFICACIÓN
         db.update_report_status(report_id, "CLASSIFYING")
+        set_job_state(report_id, "CLASSIFYING", 30, f"{len(all_content)} items scraped", client_id=client_id)
         normalized_items = [
             apify_service.normalize_comment_for_classification(item)
             for item in all_content
         ]
-        texts_to_classify = [item["content"] for item in normalized_items if item["content"]]
+
+        # Unchanged posts of an incremental/cached scrape: reuse the last report's classifications
+        reused = {}
+        if delta.get("mode") in ("incremental", "cached"):
+            fresh = set(delta.get("fresh_posts", []))
+            stable_posts = sorted({item["post_id"] for item in normalized_items if item["post_id"] not in fresh})
+            try:
+                previous = await asyncio.to_thread(item_store.latest_classifications, client_id, stable_posts)
+            except Exception as e:
+                logger.warning(f"⚠️ [{report_id}] Could not load previous classifications: {e}")
+                previous = {}
+            for i, item in enumerate(normalized_items):
+                c = previous.get((item["post_id"], item["author"], item["content"]))
+                if c is not None:
+                    reused[i] = {**item, **c}
+        pending = [i for i in range(len(normalized_items)) if i not in reused]
+
+        # Collapse duplicates / trivial comments: each distinct comment is classified once
+        dedup = collapse_comments([normalized_items[i] for i in pending])
+        texts_to_classify = [normalized_items[pending[j]]["content"] for j in dedup.representatives]
         
-        logger.info(f"🧠 [{report_id}] Classifying {len(texts_to_classify)} items...")
+        logger.info(
+            f"🧠 [{report_id}] Classifying {len(texts_to_classify)} unique items "
+            f"(of {len(normalized_items)}, {len(reused)} reused)..."
+        )
         
         # Pass brand_context to Gemini
         classifications = await gemini_service.classify_comments_batch(
             texts_to_classify, 
             brand_context=brand_context
-        )
+        ) if texts_to_classify else []
         
-        # Merge
-        raw_items = []
+        # Merge: copy each representative's classification to every comment it stands for
+        merged = list(reused.items())
         classification_map = {c["idx"]: c for c in classifications}
-        for i, normalized in enumerate(normalized_items):
-            if i in classification_map:
-                c = classification_map[i]
-                raw_items.append({
-                    **normalized,
+        for position, representative in enumerate(dedup.representatives):
+            c = classification_map.get(position)
+            if c is None:
+                continue
+            for j in dedup.members[representative]:
+                i = pending[j]
+                merged.append((i, {
+                    **normalized_items[i],
                     "ai_emotion": c.get("emotion", "Otro"),
                     "ai_personality": c.get("personality", "Sinceridad"),
                     "ai_topic": c.get("topic", "Otro"),
                     "ai_sentiment_score": c.get("sentiment_score", 0.0)
-                })
+                }))
+        # Mentions / links / empty: not worth an LLM call, but still part of the data
+        for j, reason in dedup.dropped.items():
+            i = pending[j]
+            merged.append((i, {**normalized_items[i], **SKIPPED_CLASSIFICATION, "skip_reason": reason}))
+        merged.sort(key=lambda pair: pair[0])
+        raw_items = [item for _, item in merged]
+        if not raw_items:
+            raise Exception("No items classified to aggregate")
+        return {"raw_items": raw_items, "classifications": classifications, "dedup": dedup, "reused": len(reused)}
 
-        # PASO 3: AGREGACIÓN
+    # PASO 3: AGREGACIÓN
+    def aggregate(classify):
         db.update_report_status(report_id, "AGGREGATING")
-        if not raw_items: # Changed from classified_items to raw_items
-             # Fallback if classification failed but scraping worked?
-             # For now, we need items.
-             raise Exception("No items classified to aggregate")
+        set_job_state(report_id, "AGGREGATING", 55, client_id=client_id)
+        return aggregator.build_frontend_compatible_json(classify["raw_items"])
 
-        result_json = aggregator.build_frontend_compatible_json(raw_items)
-        
-        # =========================================
-        # PASO 4: GENERACIÓN DE INTERPRETACIONES (NEW!)
-        # =========================================
+    # PASO 4: INTERPRETACIONES (solo lee result_json; se inyectan al final)
+    async def interpret(aggregate, interview, brand):
         logger.info(f"🗣️ [{report_id}] Translating data to human language...")
-        
-        # 4.1 Fetch Context (Interview + Brand Identity)
-        interview_record = db.get_interview(client_id)
-        interview_data = interview_record.get("data") if interview_record else {}
-        
-        brand_record = db.get_brand_identity(client_id)
-        # Ensure we have a dict
-        if not brand_record: brand_record = {}
-
+        set_job_state(report_id, "INTERPRETING", 65, client_id=client_id)
         full_context = {
-            "interview": interview_data,
-            "brand": brand_record
+            "interview": interview.get("data") if interview else {},
+            "brand": brand or {}
         }
+        return await gemini_service.generate_interpretations(
+            aggregate, context=full_context, client_id=client_id
+        )
+
+    # PASO 5: ESTRATEGIA (CASCADA) — solo necesita result_json, no las interpretaciones
+    async def strategy(aggregate, interview, client):
+        logger.info("🧠 Generando Plan Estratégico con IA (Tree Structure)...")
+        set_job_state(report_id, "STRATEGY", 80, client_id=client_id)
+        plan_type = client.get("plan", "pro") if client else "pro"
+        strategy_tree = await gemini_service.generate_strategic_plan(
+            interview_data=interview.get("data") if interview else {},
+            analysis_json=aggregate,
+            plan_type=plan_type
+        )
+        # Convertir a Nodos Visuales para Frontend y guardar (sobreescribe cualquier anterior)
+        strategy_nodes = aggregator.convert_tree_to_nodes(client_id, strategy_tree)
+        await asyncio.to_thread(db.sync_strategy_nodes, client_id, strategy_nodes)
+        logger.info(f"✅ Estrategia Generada y Guardada: {len(strategy_nodes)} nodos.")
+        return strategy_nodes
+
+    return [
+        Stage("scrape", scrape, timeout=timeouts["scrape"]),
+        Stage("interview", lambda: db.get_interview(client_id), timeout=timeouts["interview"], required=False),
+        Stage("brand", lambda: db.get_brand_identity(client_id), timeout=timeouts["brand"], required=False, default={}),
+        Stage("client", lambda: db.get_client(client_id), timeout=timeouts["client"], required=False),
+        Stage("classify", classify, inputs=("scrape", "interview"), timeout=timeouts["classify"]),
+        Stage("aggregate", aggregate, inputs=("classify",), timeout=timeouts["aggregate"]),
+        # Non-blocking: el reporte se guarda aunque fallen
+        Stage("interpret", interpret, inputs=("aggregate", "interview", "brand"),
+              timeout=timeouts["interpret"], required=False, default={}),
+        Stage("strategy", strategy, inputs=("aggregate", "interview", "client"),
+              timeout=timeouts["strategy"], required=False),
+        # Drill-down store (Parquet), written while interpretations/strategy run
+        Stage("items", lambda classify: item_store.write_report_items(client_id, report_id, classify["raw_items"]),
+              inputs=("classify",), timeout=timeouts["items"], required=False),
+    ]
+
+
+async def _run_full_pipeline(report_id: str, client_id: str, instagram_url: str, comments_limit: int = 1000,
+                             scraped: Optional[dict] = None):
+    current_tenant.set(client_id)
+    suspended = False
+    try:
+        if scraped is None and settings.APIFY_ASYNC_MODE:
+            scraped = apify_service.get_cached_scrape(instagram_url, POSTS_LIMIT)
+            if scraped is None:
+                await _start_apify_run(report_id, client_id, instagram_url)
+                suspended = True  # se reanuda en _resume_from_run (webhook o sondeo)
+                return
+
+        logger.info(f"🚀 [{report_id}] Pipeline STARTED for {instagram_url}")
         
-        try:
-            interpretations = await gemini_service.generate_interpretations(result_json, context=full_context)
-        except Exception as e:
-            import traceback
-            print(f"❌ [DEBUG] INTERPRETATION ERROR: {type(e).__name__}: {e}")
-            print(f"❌ [DEBUG] TRACEBACK:\n{traceback.format_exc()}")
-            logger.warning(f"⚠️ [{report_id}] Interpretation generation failed: {e}")
-            interpretations = {}
+        results = await run_dag(_build_stages(report_id, client_id, instagram_url, scraped), label=f"[{report_id}] ")
+        all_content = results["scrape"]["all_comments"]
+        scrape_delta = results["scrape"].get("delta") or {}
+        classified = results["classify"]
+        classifications, raw_items, dedup = classified["classifications"], classified["raw_items"], classified["dedup"]
+        result_json = results["aggregate"]
+        interpretations = results["interpret"]
 
         if not interpretations:
             logger.warning(f"⚠️ [{report_id}] No interpretations generated. Using fallback.")
@@ -180,9 +356,6 @@ async def _run_full_pipeline(report_id: str, client_id: str, instagram_url: str,
 
         # Inject interpretation_text into each Q block
         count_injected = 0
-        print(f"🔍 [DEBUG] Interpretations received keys: {list(interpretations.keys())}")
-        print(f"🔍 [DEBUG] result_json keys: {list(result_json.keys())}")
-        
         for q_key, q_data in result_json.items():
             interpretation_key = f"{q_key}_interpretation"
             if interpretation_key in interpretations:
@@ -190,48 +363,16 @@ async def _run_full_pipeline(report_id: str, client_id: str, instagram_url: str,
                 if isinstance(q_data, dict):
                     q_data["interpretation_text"] = interpretations[interpretation_key]
                     count_injected += 1
-                    print(f"✅ [DEBUG] Injected {interpretation_key} -> {interpretations[interpretation_key][:50]}...")
         
-        print(f"🔍 [DEBUG] Total injected: {count_injected}")
-        logger.info(f"✅ [{report_id}] Interpretations injected: {count_injected} blocks updated")
-        
-
-        # =========================================================================
-        # PASO 5: GENERACIÓN AUTOMÁTICA DE ESTRATEGIA (CASCADA)
-        # =========================================================================
-        try:
-            logger.info("🧠 Generando Plan Estratégico con IA (Tree Structure)...")
-            
-            # 1. Obtener tipo de plan del cliente (para saber si generar tareas o contenido)
-            client_record = db.get_client(client_id)
-            plan_type = client_record.get("plan", "pro") if client_record else "pro"
-            
-            # 2. Contexto completo de Entrevista (reutilizando variable interview_data ya cargada arriba o DB)
-            # Nota: interview_data ya se cargó en línea 155, usamos esa.
-            
-            # 3. Generar Árbol
-            strategy_tree = await gemini_service.generate_strategic_plan(
-                interview_data=interview_data, # Usamos la variable local ya cargada
-                analysis_json=result_json,
-                plan_type=plan_type
-            )
-            
-            # 4. Convertir a Nodos Visuales para Frontend
-            strategy_nodes = aggregator.convert_tree_to_nodes(client_id, strategy_tree)
-            
-            # 5. Guardar en Base de Datos (Sobreescribe cualquier anterior)
-            db.sync_strategy_nodes(client_id, strategy_nodes)
-            
-            logger.info(f"✅ Estrategia Generada y Guardada: {len(strategy_nodes)} nodos.")
-            
-            # (Opcional) Marcar en el JSON que existe estrategia
-            if "Q10" in result_json:
-                    if "results" not in result_json["Q10"]: result_json["Q10"]["results"] = {}
-                    result_json["Q10"]["results"]["estrategia_generada"] = True
+        logger.info(
+            f"✅ [{report_id}] Interpretations injected: {count_injected} blocks updated",
+            extra={"report_id": report_id, "interpretation_keys": sorted(interpretations)}
+        )
 
-        except Exception as e:
-            # NO detenemos el pipeline si falla la estrategia, es un módulo "extra"
-            logger.error(f"⚠️ Error generando estrategia (Non-blocking): {e}")
+        # (Opcional) Marcar en el JSON que existe estrategia
+        if results["strategy"] is not None and "Q10" in result_json:
+            if "results" not in result_json["Q10"]: result_json["Q10"]["results"] = {}
+            result_json["Q10"]["results"]["estrategia_generada"] = True
         
         # =========================================
         # FINAL: AUDITORÍA Y GUARDADO
@@ -248,22 +389,179 @@ async def _run_full_pipeline(report_id: str, client_id: str, instagram_url: str,
             "data_integrity": {
                 "scraped_count": len(all_content),
                 "classified_count": len(classifications),
+                "deduplication": dedup.stats,
+                "scrape_delta": {k: v for k, v in scrape_delta.items() if k != "fresh_posts"},
+                "reused_classifications": classified["reused"],
                 "date_range_start": all_content[0].get("timestamp") if all_content else None,
                 "date_range_end": all_content[-1].get("timestamp") if all_content else None,
                 "has_imputed_dates": has_fallback_dates,
-                "sampling_ratio": f"{len(classifications)}/{len(all_content)}"
+                "sampling_ratio": f"{len(raw_items)}/{len(all_content)}"
             },
             "execution_checks": {
-                "gemini_classification_success": len(classifications) > 0,
-                "interpretation_generated": "interpretation_text" in (result_json.get("Q1") or {})
+                "gemini_classification_success": len(classifications) > 0 or classified["reused"] > 0,
+                "interpretation_generated": "interpretation_text" in (result_json.get("Q1") or {}),
+                "strategy_generated": results["strategy"] is not None,
+                "items_stored": results["items"] is not None
             },
             "flags": ["REAL_DATA"] + (["MISSING_DATES"] if has_fallback_dates else ["VERIFIED_DATES"])
         }
 
-        db.update_report_status(report_id, "COMPLETED", result=result_json, audit_log=audit_log)
+        with pipeline_stage("save"):
+            db.update_report_status(report_id, "COMPLETED", result=result_json, audit_log=audit_log)
+        response_cache.invalidate_client(client_id, "analysis")
+        set_job_state(report_id, "COMPLETED", 100, client_id=client_id)
         logger.info(f"✅ [{report_id}] Pipeline FINISHED and saved with Audit Log.")
 
     except Exception as e:
         logger.error(f"❌ [{report_id}] Pipeline FAILED: {e}", exc_info=True)
         # Guardar error en DB
         db.update_report_status(report_id, "ERROR", error=str(e))
+        set_job_state(report_id, "ERROR", 100, str(e), client_id=client_id)
+    finally:
+        if not suspended:
+            release_inflight(_inflight_key(client_id, instagram_url), report_id)
+
+
+# Modo asíncrono de Apify (APIFY_ASYNC_MODE)
+#
+# En lugar de esperar al actor (hasta 5 min reteniendo la corrutina y su memoria),
+# el pipeline arranca el run, guarda su id en el job y termina. Apify llama al
+# webhook al acabar (POST /pipeline/apify/webhook) y el pipeline se reanuda desde
+# ahí, en cualquier worker: el registro del run vive en el state store
+# (apify:run:<id>, borrado al reanudar). poll_apify_runs() recorre esos registros
+# por si se pierde un webhook; un run que no termina en APIFY_RUN_DEADLINE_SECONDS
+# se aborta y su job pasa a ERROR. Para desarrollo: fake_apify_server.py + APIFY_API_URL.
+
+RUN_RECORD_TTL = 24 * 3600
+RUN_RECORD_PREFIX = "apify:run:"
+_resume_tasks: set[asyncio.Task] = set()
+
+
+def _run_key(run_id: str) -> str:
+    return f"{RUN_RECORD_PREFIX}{run_id}"
+
+
+def _webhook_url() -> Optional[str]:
+    """None (polling only) unless both APIFY_WEBHOOK_BASE_URL and APIFY_WEBHOOK_SECRET are set."""
+    if not settings.APIFY_WEBHOOK_BASE_URL or not settings.APIFY_WEBHOOK_SECRET:
+        return None
+    return f"{settings.APIFY_WEBHOOK_BASE_URL.rstrip('/')}{router.prefix}/apify/webhook?token={settings.APIFY_WEBHOOK_SECRET}"
+
+
+async def _start_apify_run(report_id: str, client_id: str, instagram_url: str):
+    plan = apify_service.plan_delta_scrape(instagram_url, POSTS_LIMIT)
+    run = await apify_service.start_instagram_posts_run(
+        instagram_url, limit=POSTS_LIMIT, newer_than=plan["newer_than"], webhook_url=_webhook_url()
+    )
+    get_state_store().set_json(_run_key(run["id"]), {
+        "run_id": run["id"],
+        "report_id": report_id,
+        "client_id": client_id,
+        "instagram_url": instagram_url,
+        "plan": plan,
+        "started_at": time.time(),
+    }, ttl=RUN_RECORD_TTL)
+    set_job_state(report_id, "SCRAPING", 10, "Waiting for Apify run", client_id=client_id, apify_run_id=run["id"])
+    logger.info(f"⏸️ [{report_id}] Pipeline suspended until Apify run {run['id']} finishes")
+
+
+def _fail_suspended(record: dict, error: str):
+    report_id, client_id = record["report_id"], record["client_id"]
+    logger.error(f"❌ [{report_id}] Pipeline FAILED: {error}")
+    db.update_report_status(report_id, "ERROR", error=error)
+    set_job_state(report_id, "ERROR", 100, error, client_id=client_id)
+    release_inflight(_inflight_key(client_id, record["instagram_url"]), report_id)
+
+
+async def _resume_from_run(run_id: str) -> bool:
+    """
+    Collect a finished run and run the rest of its pipeline, or fail the job if
+    the run is past APIFY_RUN_DEADLINE_SECONDS. Safe to call many times (webhook
+    retries, pollers in several workers): only the first call for a finished run
+    resumes it. Returns True if this call resumed (or failed) it.
+    """
+    store = get_state_store()
+    record = store.get_json(_run_key(run_id))
+    if not record:
+        return False
+    # The webhook body is never trusted: the run is read back from the API
+    try:
+        run = await apify_service.get_run(run_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read Apify run {run_id}: {e}")
+        run = None
+    finished = bool(run) and run.get("status") in apify_service.RUN_TERMINAL_STATUSES
+    overdue = time.time() - record.get("started_at", time.time()) > settings.APIFY_RUN_DEADLINE_SECONDS
+    if not finished and not overdue:
+        return False
+    if not store.add(f"apify:resumed:{run_id}", b"1", ttl=RUN_RECORD_TTL):
+        return False
+    store.delete(_run_key(run_id))
+
+    report_id, client_id, instagram_url = record["report_id"], record["client_id"], record["instagram_url"]
+    current_tenant.set(client_id)
+    if not finished:
+        try:
+            await apify_service.abort_run(run_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not abort Apify run {run_id}: {e}")
+        _fail_suspended(record, f"Apify run {run_id} did not finish within {settings.APIFY_RUN_DEADLINE_SECONDS}s")
+        return True
+
+    logger.info(f"▶️ [{report_id}] Apify run {run_id} {run['status']}: resuming pipeline")
+    try:
+        if run["status"] != "SUCCEEDED":
+            raise RuntimeError(f"Apify run {run_id} ended with status {run['status']}")
+        items = await apify_service.fetch_run_items(run)
+        scraped = apify_service.apply_delta_scrape(record["plan"], items)
+        apify_service.cache_scrape(instagram_url, POSTS_LIMIT, scraped)
+    except Exception as e:
+        _fail_suspended(record, str(e))
+        return True
+
+    # El run pudo tardar hasta APIFY_RUN_DEADLINE_SECONDS: el TTL del inflight se
+    # reinicia para cubrir las etapas que faltan
+    if not refresh_inflight(_inflight_key(client_id, instagram_url), report_id):
+        logger.warning(f"⚠️ [{report_id}] Inflight key taken over while waiting for run {run_id}")
+    await _run_full_pipeline(report_id, client_id, instagram_url, scraped=scraped)
+    return True
+
+
+def _spawn_resume(run_id: str):
+    task = asyncio.create_task(_resume_from_run(run_id))
+    _resume_tasks.add(task)
+    task.add_done_callback(_resume_tasks.discard)
+
+
+def poll_pending_runs() -> int:
+    """Check every pending run once (from any worker). Returns how many were checked."""
+    run_ids = [key.removeprefix(RUN_RECORD_PREFIX) for key in get_state_store().keys(RUN_RECORD_PREFIX)]
+    for run_id in run_ids:
+        _spawn_resume(run_id)
+    return len(run_ids)
+
+
+async def poll_apify_runs():
+    """Fallback for lost webhooks and stuck runs: every APIFY_POLL_SECONDS, one worker polls the pending runs."""
+    while True:
+        await asyncio.sleep(settings.APIFY_POLL_SECONDS)
+        try:
+            # Workers tick independently: whoever takes the slot polls for this interval
+            if get_state_store().add("apify:poll", b"1", ttl=settings.APIFY_POLL_SECONDS * 0.9):
+                poll_pending_runs()
+        except Exception as e:
+            logger.warning(f"⚠️ Apify run polling failed: {e}")
+
+
+@router.post("/apify/webhook", status_code=202)
+async def apify_webhook(payload: dict, token: str = ""):
+    """Apify run webhook (async mode): resumes the pipeline waiting on the run."""
+    # No secret, no webhooks (see _webhook_url): an open endpoint would let anyone poke at runs
+    if not settings.APIFY_WEBHOOK_SECRET or not hmac.compare_digest(token, settings.APIFY_WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+    run_id = (payload.get("resource") or {}).get("id") or (payload.get("eventData") or {}).get("actorRunId")
+    if not run_id:
+        raise HTTPException(status_code=400, detail="Missing run id")
+    logger.info(f"🔔 Apify webhook {payload.get('eventType')} for run {run_id}")
+    _spawn_resume(run_id)
+    return {"status": "accepted", "run_id": run_id}
@@ -5,7 +5,7 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks, Body
 from pydantic import BaseModel
 from datetime import datetime
 
-from ..services.database import db
+from ..services.database import db, TASK_COLUMNS_BY_VIEW
 from ..services import content_generator
 
 logger = logging.getLogger(__name__)
@@ -62,15 +62,35 @@ async def save_monthly_plan(request: SaveMonthRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{client_id}/history")
-async def get_planning_history(client_id: str, month_group: Optional[str] = None):
+async def get_planning_history(
+    client_id: str,
+    month_group: Optional[str] = None,
+    status: Optional[str] = None,
+    week: Optional[int] = None,
+    fields: str = "full",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
     """
     Get planning history (tasks) for a specific month or all time.
+    Filters run in the database; results are keyset-paginated via `cursor`.
+    Use fields=summary to skip the heavy JSON columns (key_elements, dos, donts...).
     """
-    # Use existing db.get_tasks but filter by month_group if possible
-    # For now, we fetch all and filter in python as get_tasks might not support filtering
-    tasks = db.get_tasks(client_id)
-    
-    if month_group:
-        tasks = [t for t in tasks if t.get("month_group") == month_group]
+    columns = TASK_COLUMNS_BY_VIEW.get(fields)
+    if columns is None:
+        raise HTTPException(status_code=400, detail=f"Invalid fields. Must be one of: {list(TASK_COLUMNS_BY_VIEW.keys())}")
+
+    try:
+        page = db.get_tasks_page(
+            client_id,
+            limit=limit,
+            cursor=cursor,
+            columns=columns,
+            month_group=month_group,
+            status=status,
+            week=week
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
         
-    return {"tasks": tasks}
+    return {"tasks": page["items"], "next_cursor": page["next_cursor"]}
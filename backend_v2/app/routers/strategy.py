@@ -1,9 +1,14 @@
 
+import asyncio
+import json
 import logging
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from ..services.database import db
+from ..services import aggregator
+from ..services.strategy_generator import stream_strategy_tree, ROOT_LABEL, MIN_OBJECTIVES
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/strategy", tags=["Strategy"])
@@ -27,6 +32,32 @@ class StrategySyncRequest(BaseModel):
     client_id: str
     nodes: List[StrategyNode]
 
+def _to_frontend(n: dict) -> dict:
+    """DB snake_case -> Frontend camelCase"""
+    return {
+        "id": n["id"],
+        "type": n["type"],
+        "label": n["label"],
+        "description": n["description"],
+        "parentId": n["parent_id"],
+        "x": n["x"],
+        "y": n["y"],
+        "suggested_format": n.get("suggested_format"),
+        "suggested_frequency": n.get("suggested_frequency"),
+        "tags": n.get("tags", [])
+    }
+
+def _restore_strategy(client_id: str, nodes: list[dict]):
+    """Put back the tree a failed / abandoned stream had replaced."""
+    try:
+        db.sync_strategy_nodes(client_id, nodes)
+        logger.info(f"↩️ Previous strategy restored for client {client_id} ({len(nodes)} nodes)")
+    except Exception as e:
+        logger.error(f"❌ Could not restore the previous strategy for client {client_id}: {e}")
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 # --- Endpoints ---
 
 @router.get("/{client_id}", response_model=List[dict])
@@ -39,24 +70,92 @@ async def get_strategy(client_id: str):
     nodes = db.get_strategy_nodes(client_id)
     
     # Transform DB snake_case to Frontend camelCase
-    frontend_nodes = []
-    for n in nodes:
-        frontend_nodes.append({
-            "id": n["id"],
-            "type": n["type"],
-            "label": n["label"],
-            "description": n["description"],
-            "parentId": n["parent_id"],
-            "x": n["x"],
-            "y": n["y"],
-            "suggested_format": n.get("suggested_format"),
-            "suggested_frequency": n.get("suggested_frequency"),
-            "tags": n.get("tags", [])
-        })
+    frontend_nodes = [_to_frontend(n) for n in nodes]
     
     logger.info(f"📤 Returning {len(frontend_nodes)} nodes for client {client_id}")
     return frontend_nodes
 
+@router.get("/{client_id}/generate/stream")
+async def stream_strategy(client_id: str):
+    """
+    Generate the strategy and stream it as Server-Sent Events (EventSource-friendly GET).
+    Events: `root`, `objective`, `strategy`, `concept` (one frontend node each, as soon as
+    its subtree is complete), then `done` or `error`.
+    Nodes are persisted as they are emitted; the previous strategy is replaced only once
+    the first objective has arrived, and restored if the stream then fails (`error`, e.g.
+    every branch failed) or the client goes away before `done`.
+    """
+    logger.info(f"♟️ GET /strategy/{client_id}/generate/stream")
+
+    # La estrategia solo usa Q9/Q10 del análisis
+    report = await asyncio.to_thread(db.get_latest_completed_report, client_id, ["Q9", "Q10"])
+    analysis = (report or {}).get("frontend_compatible_json") or {}
+    if "Q10" not in analysis:
+        raise HTTPException(status_code=400, detail="No se puede generar estrategia: El Análisis no está completado.")
+    client = await asyncio.to_thread(db.get_client, client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    interview = await asyncio.to_thread(db.get_interview, client_id)
+
+    async def events():
+        objective_nodes: dict[int, dict] = {}
+        strategy_nodes: dict[tuple[int, int], dict] = {}
+        count = 0
+        previous: Optional[list[dict]] = None  # old tree, once it has been replaced
+        try:
+            async for event in stream_strategy_tree(
+                interview.get("data", {}) if interview else {},
+                analysis,
+                client.get("plan", "pro")
+            ):
+                out: list[tuple[str, dict]] = []
+                if event["type"] == "objective":
+                    i, obj = event["index"], event["objective"]
+                    # Total unknown while streaming: center on the expected minimum
+                    obj_node = aggregator.objective_node(client_id, obj, aggregator.objective_y(i, MIN_OBJECTIVES))
+                    objective_nodes[i] = obj_node
+                    out.append(("objective", obj_node))
+                    for j, strat in enumerate(obj["strategies"]):
+                        strategy_nodes[(i, j)] = aggregator.strategy_node(client_id, strat, obj_node, j)
+                        out.append(("strategy", strategy_nodes[(i, j)]))
+                    if count == 0:
+                        root = aggregator.root_node(client_id, ROOT_LABEL)
+                        previous = await asyncio.to_thread(db.get_strategy_nodes, client_id)
+                        await asyncio.to_thread(db.sync_strategy_nodes, client_id, [root])
+                        count += 1
+                        yield _sse("root", _to_frontend(root))
+                elif event["type"] == "concepts":
+                    parent = strategy_nodes[(event["objective_index"], event["strategy_index"])]
+                    out = [("concept", n) for n in aggregator.concept_nodes(client_id, event["concepts"], parent)]
+                else:  # "done": everything was already persisted
+                    continue
+
+                await asyncio.to_thread(db.append_strategy_nodes, client_id, [n for _, n in out])
+                count += len(out)
+                for name, node in out:
+                    yield _sse(name, _to_frontend(node))
+
+            logger.info(f"✅ Estrategia transmitida y guardada: {count} nodos.")
+            previous = None
+            yield _sse("done", {"nodes_count": count})
+        except Exception as e:
+            logger.error(f"❌ Strategy stream failed for client {client_id}: {e}")
+            if previous is not None:
+                await asyncio.to_thread(_restore_strategy, client_id, previous)
+                previous = None
+            yield _sse("error", {"detail": str(e), "nodes_count": 0})
+        finally:
+            if previous is not None:
+                # Client went away mid-stream: can't await here (the task is being
+                # cancelled), so restore in the executor without waiting for it
+                asyncio.get_running_loop().run_in_executor(None, _restore_strategy, client_id, previous)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/sync")
 async def sync_strategy(request: StrategySyncRequest):
     """
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Optional
 from pydantic import BaseModel
-from ..services.database import db
+from ..services.database import db, TASK_COLUMNS_BY_VIEW
 
 router = APIRouter(
     prefix="/api/v1",
@@ -44,9 +44,18 @@ class TaskUpdate(BaseModel):
 # --- Endpoints ---
 
 @router.get("/fichas/{client_id}/tasks", response_model=dict)
-async def get_tasks(client_id: str):
-    """Get all tasks for a client, grouped by week."""
-    tasks = db.get_tasks(client_id)
+async def get_tasks(
+    client_id: str,
+    month_group: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: str = "full"
+):
+    """Get tasks for a client (optionally one month / status), grouped by week."""
+    columns = TASK_COLUMNS_BY_VIEW.get(fields)
+    if columns is None:
+        raise HTTPException(status_code=400, detail=f"Invalid fields. Must be one of: {list(TASK_COLUMNS_BY_VIEW.keys())}")
+
+    tasks = db.get_tasks(client_id, columns=columns, month_group=month_group, status=status)
     
     # Transform to frontend structure
     week_1 = []
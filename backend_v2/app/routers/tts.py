@@ -4,14 +4,20 @@ TTS Router
 Handles text-to-speech generation using Microsoft Edge TTS (free, high quality).
 """
 
-import os
-import uuid
-import edge_tts
+import asyncio
+import json
+import logging
+import re
+from typing import List, Literal, Optional
+
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, Response
-from pydantic import BaseModel
-import tempfile
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from ..config import settings
+from ..services.tts_cache import tts_cache, clip_key
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/tts", tags=["Text-to-Speech"])
 
 class TTSRequest(BaseModel):
@@ -23,26 +29,168 @@ class TTSRequest(BaseModel):
     # es-US-AlonsoNeural (Male - US/Neutral)
     # es-ES-ElviraNeural (Female - Spain)
 
+class TTSSegment(BaseModel):
+    text: str
+    voice: Optional[str] = None  # Falls back to TTSBatchRequest.voice
+
+class TTSBatchRequest(BaseModel):
+    segments: List[TTSSegment] = Field(..., min_length=1, max_length=200)
+    voice: str = "es-MX-DaliaNeural"
+    output: Literal["manifest", "stream"] = "manifest"
+
+# edge_tts default output is audio-24khz-48kbitrate-mono-mp3 (constant bitrate)
+EDGE_TTS_BYTES_PER_MS = 48_000 / 8 / 1000
+# Common proxies reject header blocks over 8KB
+TIMING_HEADER_MAX_BYTES = 4096
+
+
+async def _audio_chunks(text: str, voice: str):
+    """Yield MP3 bytes as edge_tts produces them."""
+    import edge_tts  # deferred: only TTS requests pay for the import
+
+    communicate = edge_tts.Communicate(text, voice)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            yield chunk["data"]
+
+
 @router.post("/generate")
 async def generate_speech(request: TTSRequest):
     """
     Generates audio from text using Edge TTS.
-    Returns the audio content as streaming bytes (audio/mpeg).
+    Streams audio/mpeg chunks as they are synthesized; finished clips are cached
+    on disk by (text, voice) and served directly on repeat requests.
     """
+    key = clip_key(request.text, request.voice)
+    cached = tts_cache.get(key)
+    if cached:
+        return FileResponse(cached, media_type="audio/mpeg", headers={"X-TTS-Cache": "HIT"})
+
+    chunks = _audio_chunks(request.text, request.voice)
     try:
-        communicate = edge_tts.Communicate(request.text, request.voice)
-        
-        # Stream directly to memory buffer not to fill up disk
-        audio_data = b""
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_data += chunk["data"]
-                
-        return Response(content=audio_data, media_type="audio/mpeg")
+        # Pull the first chunk before answering so synthesis errors still map to a 500
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        raise HTTPException(status_code=500, detail="No audio was received from TTS service")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def stream_and_cache():
+        parts = [first]
+        yield first
+        async for data in chunks:
+            parts.append(data)
+            yield data
+        # Only complete clips reach this point (client disconnects cancel the generator)
+        try:
+            await asyncio.to_thread(tts_cache.put, key, b"".join(parts))
+        except Exception as e:
+            logger.warning(f"TTS cache write failed: {e}")
+
+    return StreamingResponse(stream_and_cache(), media_type="audio/mpeg", headers={"X-TTS-Cache": "MISS"})
+
+async def _synthesize(text: str, voice: str) -> tuple[str, bytes, bool]:
+    """
+    Return (key, clip bytes, was_cached), synthesizing + caching the clip if needed.
+    The bytes are kept: the LRU may evict the file before the caller is done.
+    """
+    key = clip_key(text, voice)
+    cached = tts_cache.get(key)
+    if cached:
+        try:
+            return key, await asyncio.to_thread(cached.read_bytes), True
+        except FileNotFoundError:  # evicted between get() and the read
+            pass
+    parts = [data async for data in _audio_chunks(text, voice)]
+    if not parts:
+        raise ValueError(f"No audio was received for segment: {text[:40]}...")
+    audio = b"".join(parts)
+    await asyncio.to_thread(tts_cache.put, key, audio)
+    return key, audio, False
+
+
+@router.post("/batch")
+async def generate_speech_batch(request: TTSBatchRequest):
+    """
+    Render a whole presentation in one call.
+    Segments are synthesized concurrently (bounded by TTS_BATCH_CONCURRENCY) and cached.
+    
+    - output=manifest: JSON with per-segment clip URLs and timings.
+    - output=stream: one concatenated audio/mpeg body; the timing index is
+      returned in the X-TTS-Timing header (JSON list of start/duration in ms)
+      when it fits in TIMING_HEADER_MAX_BYTES. Larger batches get
+      X-TTS-Timing: omitted; ask for output=manifest (clips are cached by then).
+    """
+    sem = asyncio.Semaphore(max(1, settings.TTS_BATCH_CONCURRENCY))
+    # Identical (text, voice) pairs are synthesized once
+    jobs: dict[str, asyncio.Task] = {}
+
+    async def render(text: str, voice: str):
+        async with sem:
+            return await _synthesize(text, voice)
+
+    resolved = [(seg.text, seg.voice or request.voice) for seg in request.segments]
+    for text, voice in resolved:
+        key = clip_key(text, voice)
+        if key not in jobs:
+            jobs[key] = asyncio.create_task(render(text, voice))
 
+    try:
+        await asyncio.gather(*jobs.values())
     except Exception as e:
+        for job in jobs.values():
+            job.cancel()
+        logger.error(f"TTS batch failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    segments = []
+    clips = []
+    start_ms = 0
+    for i, (text, voice) in enumerate(resolved):
+        key, audio, was_cached = jobs[clip_key(text, voice)].result()
+        duration_ms = int(len(audio) / EDGE_TTS_BYTES_PER_MS)
+        clips.append(audio)
+        segments.append({
+            "index": i,
+            "key": key,
+            "voice": voice,
+            "url": f"/tts/clips/{key}",
+            "bytes": len(audio),
+            "cached": was_cached,
+            "start_ms": start_ms,
+            "duration_ms": duration_ms
+        })
+        start_ms += duration_ms
+
+    if request.output == "manifest":
+        return {"segments": segments, "total_duration_ms": start_ms}
+
+    async def concatenated():
+        for audio in clips:
+            yield audio
+
+    timing = json.dumps(
+        [{"index": s["index"], "start_ms": s["start_ms"], "duration_ms": s["duration_ms"]} for s in segments],
+        separators=(",", ":")
+    )
+    return StreamingResponse(
+        concatenated(),
+        media_type="audio/mpeg",
+        headers={"X-TTS-Timing": timing if len(timing) <= TIMING_HEADER_MAX_BYTES else "omitted"}
+    )
+
+
+@router.get("/clips/{key}")
+async def get_clip(key: str):
+    """Serve a cached clip referenced by a batch manifest."""
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        raise HTTPException(status_code=400, detail="Invalid clip key")
+    path = tts_cache.get(key)
+    if not path:
+        raise HTTPException(status_code=404, detail="Clip expired from cache; re-run the batch")
+    return FileResponse(path, media_type="audio/mpeg", headers={"Cache-Control": "public, max-age=86400, immutable"})
+
+
 @router.get("/voices")
 async def list_voices():
     """List recommended Spanish voices."""
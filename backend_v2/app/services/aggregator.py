@@ -6,9 +6,13 @@ This is the "source of truth" - all percentages are calculated, not estimated.
 """
 
 import logging
+import uuid
 from collections import Counter, defaultdict
 from typing import Any
 
+from .influence_graph import rank_influencers
+from .temporal import temporal_series
+
 logger = logging.getLogger(__name__)
 
 
@@ -131,36 +135,14 @@ def aggregate_q4_narrative_frames(raw_items: list[dict[str, Any]]) -> dict:
     }
 
 
-def aggregate_q5_influencers(raw_items: list[dict[str, Any]]) -> dict:
+def aggregate_q5_influencers(raw_items: list[dict[str, Any]], top_k: int = 5) -> dict:
     """
-    Q5: Top Influencers by comment frequency.
+    Q5: Top Influencers by centrality in the author/post/mention/hashtag graph.
+    See influence_graph.py for how the graph and scores are built.
     """
-    # Group by author
-    authors = defaultdict(list)
-    for item in raw_items:
-        author = item.get("author", "anon")
-        authors[author].append(item)
-    
-    # Sort by frequency, take top 5
-    sorted_authors = sorted(authors.items(), key=lambda x: -len(x[1]))[:5]
-    total = len(raw_items)
-    
     return {
         "results": {
-            "influenciadores_globales": [
-                {
-                    "username": f"@{author}",
-                    "autoridad_promedio": min(95, 50 + len(items) * 5),
-                    "afinidad_promedio": 70,
-                    "menciones": len(items),
-                    "score_centralidad": round(len(items) / total, 2) if total else 0,
-                    "sentimiento": round(
-                        sum(i.get("ai_sentiment_score", 0) for i in items) / len(items), 2
-                    ) if items else 0,
-                    "comentario_evidencia": items[0].get("content", "")[:100] if items else ""
-                }
-                for author, items in sorted_authors
-            ]
+            "influenciadores_globales": rank_influencers(raw_items, k=top_k)
         }
     }
 
@@ -252,10 +234,11 @@ def aggregate_q7_sentiment(raw_items: list[dict[str, Any]]) -> dict:
     }
 
 
-def aggregate_q8_temporal(raw_items: list[dict[str, Any]]) -> dict:
+def aggregate_q8_temporal(raw_items: list[dict[str, Any]], freq: str = "weekly", last_n: int = 5) -> dict:
     """
     Q8: Temporal Evolution using real posted_at dates.
-    Groups comments by week and tracks sentiment/topics over time.
+    Groups comments by week (or day / month) and tracks sentiment/topics over time.
+    Only the last `last_n` periods are reported.
     """
     if not raw_items:
         return {
@@ -266,48 +249,27 @@ def aggregate_q8_temporal(raw_items: list[dict[str, Any]]) -> dict:
         }
     
     try:
-        import pandas as pd
-        from datetime import datetime
-        
-        # Convert to DataFrame for easier date manipulation
-        df = pd.DataFrame(raw_items)
+        series = temporal_series(
+            (item.get("posted_at") for item in raw_items),
+            (item.get("ai_sentiment_score") for item in raw_items),
+            (None if item.get("skipped") else item.get("ai_topic") for item in raw_items),
+            freq=freq,
+            last_n=last_n
+        )
         
-        # Parse posted_at to datetime
-        df['posted_at'] = pd.to_datetime(df['posted_at'], errors='coerce')
-        
-        # Filter out items without valid dates
-        df = df.dropna(subset=['posted_at'])
-        
-        if df.empty:
+        if not series:
             logger.warning("No valid dates found in posted_at field, using fallback")
             return _aggregate_q8_fallback(raw_items)
         
-        # Sort by date
-        df = df.sort_values('posted_at')
-        
-        # Group by week (using Monday as start of week)
-        df['week'] = df['posted_at'].dt.to_period('W-MON')
-        
-        weeks = []
-        for week_period, group in df.groupby('week'):
-            avg_sentiment = group['ai_sentiment_score'].fillna(0).mean()
-            
-            # Find most common topic in this week
-            topics = group['ai_topic'].value_counts()
-            top_topic = topics.index[0] if len(topics) > 0 else "General"
-            
-            # Calculate engagement as comment count
-            engagement = len(group)
-            
-            weeks.append({
-                "fecha_semana": str(week_period),
-                "porcentaje_positivo": round((avg_sentiment + 1) / 2, 2),  # Normalize -1,1 to 0,1
-                "engagement": engagement,
-                "topico_principal": top_topic
-            })
-        
-        # Take last 5 weeks if there are more
-        weeks = weeks[-5:] if len(weeks) > 5 else weeks
+        weeks = [
+            {
+                "fecha_semana": bucket["bucket"],
+                "porcentaje_positivo": round((bucket["mean_sentiment"] + 1) / 2, 2),  # Normalize -1,1 to 0,1
+                "engagement": bucket["count"],  # Engagement as comment count
+                "topico_principal": bucket["top_topic"]
+            }
+            for bucket in series
+        ]
         
         # Determine trend
         if len(weeks) >= 2:
@@ -329,9 +291,6 @@ def aggregate_q8_temporal(raw_items: list[dict[str, Any]]) -> dict:
             }
         }
         
-    except ImportError:
-        logger.warning("pandas not available, using fallback temporal grouping")
-        return _aggregate_q8_fallback(raw_items)
     except Exception as e:
         logger.error(f"Error in temporal aggregation: {e}, using fallback")
         return _aggregate_q8_fallback(raw_items)
@@ -339,7 +298,7 @@ def aggregate_q8_temporal(raw_items: list[dict[str, Any]]) -> dict:
 
 def _aggregate_q8_fallback(raw_items: list[dict[str, Any]]) -> dict:
     """
-    Fallback Q8 implementation when pandas is unavailable or dates are invalid.
+    Fallback Q8 implementation when dates are missing or invalid.
     Uses 5 equal chunks as before.
     """
     chunk_size = max(1, len(raw_items) // 5)
@@ -487,19 +446,23 @@ def build_frontend_compatible_json(raw_items: list[dict[str, Any]]) -> dict:
         Dictionary matching frontend contract (api.ts types)
     """
     logger.info(f"📊 Aggregating {len(raw_items)} items into Q1-Q10...")
-    
+
+    # Skipped items (mention-only, links: see dedup.SKIPPED_CLASSIFICATION) count as
+    # volume (Q5, Q8) but carry no emotion / topic / sentiment of their own
+    classified = [item for item in raw_items if not item.get("skipped")]
+
     # Parallel aggregation could be better, but sequential is fine for now
-    q1 = aggregate_q1_emotions(raw_items)
-    q2 = aggregate_q2_personality(raw_items)
-    q3 = aggregate_q3_topics(raw_items)
-    q4 = aggregate_q4_narrative_frames(raw_items)
+    q1 = aggregate_q1_emotions(classified)
+    q2 = aggregate_q2_personality(classified)
+    q3 = aggregate_q3_topics(classified)
+    q4 = aggregate_q4_narrative_frames(classified)
     q5 = aggregate_q5_influencers(raw_items)
-    q6 = aggregate_q6_opportunities(raw_items)
-    q7 = aggregate_q7_sentiment(raw_items)
+    q6 = aggregate_q6_opportunities(classified)
+    q7 = aggregate_q7_sentiment(classified)
     q8 = aggregate_q8_temporal(raw_items)
     
     # Dependent aggregations
-    q9 = aggregate_q9_recommendations(raw_items, q6)
+    q9 = aggregate_q9_recommendations(classified, q6)
     q10 = aggregate_q10_executive(raw_items, q1, q7, q9)
     
     result = {
@@ -614,97 +577,101 @@ def generate_suggested_tasks(client_id: str, analysis_data: dict) -> list[dict]:
         
     return tasks
 
-def convert_tree_to_nodes(client_id: str, tree_data: dict) -> list[dict]:
-    """
-    Convierte el JSON jerárquico de IA en una lista plana de Nodos con coordenadas (X, Y)
-    para el Canvas de Estrategia del Frontend.
-    """
-    import uuid
-    nodes = []
-    
-    # Configuración de espaciado visual
-    X_GAP = 350  # Espacio horizontal entre niveles
-    Y_GAP_OBJ = 400 # Espacio vertical entre objetivos
-    Y_GAP_STRAT = 180 # Espacio vertical entre estrategias
-    
+
+# Configuración de espaciado visual del Canvas de Estrategia
+X_GAP = 350  # Espacio horizontal entre niveles
+Y_GAP_OBJ = 400 # Espacio vertical entre objetivos
+Y_GAP_STRAT = 180 # Espacio vertical entre estrategias
+Y_GAP_CONCEPT = 90 # Más apiñados
+ROOT_NODE_ID = "root"
+
+
+def objective_y(index: int, total: int) -> float:
+    """Posición vertical del objetivo `index`, centrando `total` objetivos en la raíz."""
+    start_y = -(total * Y_GAP_OBJ / 2) + (Y_GAP_OBJ / 2)
+    return start_y + (index * Y_GAP_OBJ)
+
+
+def root_node(client_id: str, label: str) -> dict:
     # 1. Nodo Raíz (La Marca/Estrategia Central)
-    root_id = "root"
-    nodes.append({
-        "id": root_id, 
-        "type": "main", 
-        "label": tree_data.get("root_label", "Estrategia"), 
+    return {
+        "id": ROOT_NODE_ID,
+        "type": "main",
+        "label": label,
         "description": "Núcleo Estratégico",
-        "x": 0, "y": 0, 
-        "parent_id": None, 
+        "x": 0, "y": 0,
+        "parent_id": None,
         "client_id": client_id
-    })
+    }
 
-    objectives = tree_data.get("objectives", [])
-    
-    # Calcular offset vertical inicial para centrar el árbol
-    total_height = len(objectives) * Y_GAP_OBJ
-    start_y = -(total_height / 2) + (Y_GAP_OBJ / 2)
 
-    for i, obj in enumerate(objectives):
-        obj_y = start_y + (i * Y_GAP_OBJ)
-        obj_id = str(uuid.uuid4())
-        
-        # Nivel 1: Objetivos
+def objective_node(client_id: str, obj: dict, y: float) -> dict:
+    # Nivel 1: Objetivos
+    return {
+        "id": str(uuid.uuid4()),
+        "type": "secondary",
+        "label": obj["title"],
+        "description": obj.get("rationale", ""), # Aquí va el cruce (Por qué este objetivo)
+        "x": X_GAP,
+        "y": y,
+        "parent_id": ROOT_NODE_ID,
+        "client_id": client_id
+    }
+
+
+def strategy_node(client_id: str, strat: dict, objective: dict, index: int) -> dict:
+    # Nivel 2: Estrategias (sub-distribución vertical bajo su objetivo)
+    return {
+        "id": str(uuid.uuid4()),
+        "type": "secondary",
+        "label": strat["title"],
+        "description": "Estrategia Táctica",
+        "x": X_GAP * 2,
+        "y": objective["y"] + ((index - 0.5) * Y_GAP_STRAT),
+        "parent_id": objective["id"],
+        "client_id": client_id
+    }
+
+
+def concept_nodes(client_id: str, concepts: list[dict], strategy: dict) -> list[dict]:
+    nodes = []
+    for k, concept in enumerate(concepts):
+        # Nivel 3: Conceptos/Arquetipos (Reemplaza Posts específicos)
+        # Handle both old format (actions with title) and new format (concepts with label)
         nodes.append({
-            "id": obj_id, 
-            "type": "secondary", 
-            "label": obj["title"],
-            "description": obj.get("rationale", ""), # Aquí va el cruce (Por qué este objetivo)
-            "x": X_GAP, 
-            "y": obj_y, 
-            "parent_id": root_id, 
+            "id": str(uuid.uuid4()),
+            "type": "concept", # Changed from "post" for Strategy v2
+            "label": concept.get("label", concept.get("title", "Concepto")),
+            "description": concept.get("description", ""),
+            "suggested_format": concept.get("suggested_format", concept.get("format", "post")),
+            "suggested_frequency": concept.get("suggested_frequency", "medium"),
+            "tags": concept.get("tags", []),
+            "x": X_GAP * 3,
+            "y": strategy["y"] + ((k - 1) * Y_GAP_CONCEPT),
+            "parent_id": strategy["id"],
             "client_id": client_id
         })
-        
-        strategies = obj.get("strategies", [])
-        for j, strat in enumerate(strategies):
-            # Sub-distribución vertical para estrategias
-            strat_y = obj_y + ((j - 0.5) * Y_GAP_STRAT) 
-            strat_id = str(uuid.uuid4())
-            
-            # Nivel 2: Estrategias
-            nodes.append({
-                "id": strat_id, 
-                "type": "secondary", 
-                "label": strat["title"],
-                "description": "Estrategia Táctica",
-                "x": X_GAP * 2, 
-                "y": strat_y, 
-                "parent_id": obj_id, 
-                "client_id": client_id
-            })
-            
-            
+    return nodes
+
+
+def convert_tree_to_nodes(client_id: str, tree_data: dict) -> list[dict]:
+    """
+    Convierte el JSON jerárquico de IA en una lista plana de Nodos con coordenadas (X, Y)
+    para el Canvas de Estrategia del Frontend.
+    """
+    nodes = [root_node(client_id, tree_data.get("root_label", "Estrategia"))]
+
+    objectives = tree_data.get("objectives", [])
+    for i, obj in enumerate(objectives):
+        obj_node = objective_node(client_id, obj, objective_y(i, len(objectives)))
+        nodes.append(obj_node)
+
+        for j, strat in enumerate(obj.get("strategies", [])):
+            strat_node = strategy_node(client_id, strat, obj_node, j)
+            nodes.append(strat_node)
+
             # Changed from 'actions' to 'concepts' for Strategy v2 Playbook
             concepts = strat.get("concepts", strat.get("actions", []))  # Fallback for backwards compat
-            for k, concept in enumerate(concepts):
-                # Nivel 3: Conceptos/Arquetipos (Reemplaza Posts específicos)
-                concept_y = strat_y + ((k - 1) * 90) # Más apiñados
-                
-                # Handle both old format (actions with title) and new format (concepts with label)
-                label = concept.get("label", concept.get("title", "Concepto"))
-                description = concept.get("description", "")
-                suggested_format = concept.get("suggested_format", concept.get("format", "post"))
-                suggested_frequency = concept.get("suggested_frequency", "medium")
-                tags = concept.get("tags", [])
-                
-                nodes.append({
-                    "id": str(uuid.uuid4()), 
-                    "type": "concept", # Changed from "post" for Strategy v2
-                    "label": label,
-                    "description": description,
-                    "suggested_format": suggested_format,
-                    "suggested_frequency": suggested_frequency,
-                    "tags": tags,
-                    "x": X_GAP * 3, 
-                    "y": concept_y, 
-                    "parent_id": strat_id, 
-                    "client_id": client_id
-                })
+            nodes.extend(concept_nodes(client_id, concepts, strat_node))
 
     return nodes
@@ -45,13 +45,14 @@ Post Output:
 }
 """
 
+import asyncio
 import logging
-import os
-from typing import Any
-
-from apify_client import ApifyClientAsync
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
 
 from ..config import settings
+from . import scrape_state
+from .state_store import get_state_store
 
 logger = logging.getLogger(__name__)
 
@@ -59,10 +60,38 @@ logger = logging.getLogger(__name__)
 # Actor ID from Apify Store
 INSTAGRAM_ACTOR_ID = "apify/instagram-scraper"
 
+# Events that end a run (async mode webhooks)
+RUN_TERMINAL_EVENTS = ["ACTOR.RUN.SUCCEEDED", "ACTOR.RUN.FAILED", "ACTOR.RUN.TIMED_OUT", "ACTOR.RUN.ABORTED"]
+RUN_TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED")
+
+# Profile scrapes running in this process (see scrape_instagram_profile_cached)
+_scrapes_in_flight: dict[str, asyncio.Task] = {}
+
+
+def _client():
+    if not settings.APIFY_TOKEN:
+        raise ValueError("APIFY_TOKEN not configured in environment")
+    
+    from apify_client import ApifyClientAsync
+
+    return ApifyClientAsync(token=settings.APIFY_TOKEN, api_url=settings.APIFY_API_URL or None)
+
+
+def _posts_run_input(profile_url: str, limit: int, newer_than: Optional[str]) -> dict[str, Any]:
+    run_input = {
+        "directUrls": [profile_url],
+        "resultsType": "posts",
+        "resultsLimit": limit,
+    }
+    if newer_than:
+        run_input["onlyPostsNewerThan"] = newer_than
+    return run_input
+
 
 async def scrape_instagram_posts(
     profile_url: str,
-    limit: int = 100
+    limit: int = 100,
+    newer_than: Optional[str] = None
 ) -> list[dict[str, Any]]:
     """
     Scrape Instagram posts from a profile.
@@ -70,27 +99,21 @@ async def scrape_instagram_posts(
     Args:
         profile_url: Instagram profile URL (e.g., https://www.instagram.com/nike)
         limit: Maximum number of posts to fetch
+        newer_than: Only posts newer than this date ("YYYY-MM-DD", Apify's onlyPostsNewerThan)
         
     Returns:
         List of post dictionaries with: url, caption, hashtags, mentions,
         likesCount, commentsCount, timestamp, ownerUsername, latestComments
     """
-    if not settings.APIFY_TOKEN:
-        raise ValueError("APIFY_TOKEN not configured in environment")
-    
-    client = ApifyClientAsync(token=settings.APIFY_TOKEN)
+    client = _client()
     
     logger.info(f"📸 Starting Instagram posts scrape: {profile_url}")
-    logger.info(f"   Limit: {limit} posts")
+    logger.info(f"   Limit: {limit} posts" + (f", newer than {newer_than}" if newer_than else ""))
     
     try:
         # Run the Actor and wait for it to finish
         run = await client.actor(INSTAGRAM_ACTOR_ID).call(
-            run_input={
-                "directUrls": [profile_url],
-                "resultsType": "posts",
-                "resultsLimit": limit,
-            },
+            run_input=_posts_run_input(profile_url, limit, newer_than),
             timeout_secs=300  # Max 5 minutes
         )
         
@@ -111,6 +134,44 @@ async def scrape_instagram_posts(
         raise
 
 
+# ============================================================================
+# Async runs: start without waiting, collect when the run's webhook arrives
+# ============================================================================
+
+async def start_instagram_posts_run(
+    profile_url: str,
+    limit: int = 100,
+    newer_than: Optional[str] = None,
+    webhook_url: Optional[str] = None
+) -> dict[str, Any]:
+    """
+    Start the posts actor and return its run ({"id", "status", "defaultDatasetId", ...})
+    right away. With `webhook_url`, Apify POSTs the run there when it ends.
+    """
+    webhooks = [{"event_types": RUN_TERMINAL_EVENTS, "request_url": webhook_url}] if webhook_url else None
+    run = await _client().actor(INSTAGRAM_ACTOR_ID).start(
+        run_input=_posts_run_input(profile_url, limit, newer_than),
+        timeout_secs=300,
+        webhooks=webhooks
+    )
+    logger.info(f"🛫 Actor run started: {run['id']} ({profile_url})")
+    return run
+
+
+async def get_run(run_id: str) -> Optional[dict[str, Any]]:
+    return await _client().run(run_id).get()
+
+
+async def abort_run(run_id: str):
+    await _client().run(run_id).abort()
+
+
+async def fetch_run_items(run: dict[str, Any]) -> list[dict[str, Any]]:
+    result = await _client().dataset(run["defaultDatasetId"]).list_items(clean=True)
+    logger.info(f"📦 Retrieved {len(result.items)} items from run {run['id']}")
+    return result.items
+
+
 async def scrape_instagram_comments(
     post_url: str,
     limit: int = 500
@@ -126,10 +187,7 @@ async def scrape_instagram_comments(
         List of comment dictionaries with: id, text, timestamp, 
         ownerUsername, ownerIsVerified, position
     """
-    if not settings.APIFY_TOKEN:
-        raise ValueError("APIFY_TOKEN not configured in environment")
-    
-    client = ApifyClientAsync(token=settings.APIFY_TOKEN)
+    client = _client()
     
     logger.info(f"💬 Starting Instagram comments scrape: {post_url}")
     logger.info(f"   Limit: {limit} comments")
@@ -197,6 +255,21 @@ async def scrape_instagram_profile_with_posts_and_comments(
     
     # Step 2: Extract comments from post data (NO additional Apify calls!)
     # This uses the latestComments field included in the posts response
+    all_comments = _flatten_posts(posts)
+    stats = _post_stats(posts, all_comments)
+    
+    logger.info(f"📊 Scrape complete: {stats}")
+    logger.info(f"💰 Cost optimization: Only 1 Apify call (was 51+)")
+    
+    return {
+        "posts": posts,
+        "all_comments": all_comments,
+        "stats": stats
+    }
+
+
+def _flatten_posts(posts: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Captions + latestComments of each post, as one flat list of items."""
     all_comments = []
     
     for i, post in enumerate(posts):
@@ -236,11 +309,13 @@ async def scrape_instagram_profile_with_posts_and_comments(
         
         logger.info(f"   ✅ Extracted {len(latest_comments)} comments from post (no extra API call)")
     
-    # Calculate stats
+    return all_comments
+
+
+def _post_stats(posts: list[dict[str, Any]], all_comments: list[dict[str, Any]]) -> dict[str, Any]:
     total_likes = sum(p.get("likesCount", 0) for p in posts)
     total_comments_count = sum(p.get("commentsCount", 0) for p in posts)
-    
-    stats = {
+    return {
         "total_posts": len(posts),
         "total_comments_scraped": len(all_comments),
         "total_comments_reported": total_comments_count,
@@ -249,17 +324,170 @@ async def scrape_instagram_profile_with_posts_and_comments(
         "avg_comments": total_comments_count // len(posts) if posts else 0,
         "apify_calls": 1  # Only 1 call now!
     }
-    
-    logger.info(f"📊 Scrape complete: {stats}")
-    logger.info(f"💰 Cost optimization: Only 1 Apify call (was 51+)")
-    
+
+
+async def scrape_instagram_profile_delta(profile_url: str, posts_limit: int = 12) -> dict[str, Any]:
+    """
+    Incremental version of scrape_instagram_profile_with_posts_and_comments
+    (see services/scrape_state.py).
+
+    With a stored state for the profile, Apify is only asked for posts newer than
+    min(last seen post, now - SCRAPE_REFRESH_HOURS): new posts plus recent ones
+    whose comments may still be moving. Older posts of the window come from the
+    state. Without state (or when it is due for a full refresh) it scrapes the
+    full window.
+
+    Returns the same {"posts", "all_comments", "stats"} plus:
+        "delta": {
+            "mode": "full" | "incremental",
+            "fetched_posts", "new_posts", "changed_posts", "unchanged_posts",
+            "reused_posts",       # served from the state, not fetched
+            "new_items",          # items of new/changed posts
+            "fresh_posts": [...]  # shortCodes of new/changed posts
+        }
+    """
+    plan = plan_delta_scrape(profile_url, posts_limit)
+    logger.info(f"🚀 Starting {'full' if plan['full'] else 'incremental'} Instagram scrape: {profile_url}")
+    fetched = await scrape_instagram_posts(profile_url, limit=posts_limit, newer_than=plan["newer_than"])
+    return apply_delta_scrape(plan, fetched)
+
+
+def plan_delta_scrape(profile_url: str, posts_limit: int) -> dict[str, Any]:
+    """What to ask Apify for: {"profile_url", "posts_limit", "full", "newer_than"}."""
+    state = scrape_state.load(profile_url)
+    full = scrape_state.needs_full_scrape(state, posts_limit)
+    newer_than = None
+    if not full:
+        high_water = scrape_state.parse_timestamp((state.get("high_water") or {}).get("timestamp"))
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.SCRAPE_REFRESH_HOURS)
+        if high_water:
+            cutoff = min(cutoff, high_water)
+        newer_than = cutoff.date().isoformat()
+    return {"profile_url": profile_url, "posts_limit": posts_limit, "full": full, "newer_than": newer_than}
+
+
+def apply_delta_scrape(plan: dict[str, Any], fetched_items: list[dict[str, Any]]) -> dict[str, Any]:
+    """Merge the posts Apify returned for `plan` with the stored state, save it, build the result."""
+    profile_url, posts_limit, full = plan["profile_url"], plan["posts_limit"], plan["full"]
+    # Re-read: in async mode the state may have moved while the run was in flight
+    state = None if full else scrape_state.load(profile_url)
+    stored = (state or {}).get("posts", {})
+    fetched = [p for p in fetched_items if p.get("shortCode")]  # skips Apify's {"error": ...} placeholder items
+
+    counts = {"new": 0, "changed": 0, "unchanged": 0}
+    entries = dict(stored)
+    fresh = []
+    for post in fetched:
+        code = post["shortCode"]
+        digest = scrape_state.content_hash(post)
+        previous = stored.get(code)
+        status = "new" if previous is None else ("unchanged" if previous.get("hash") == digest else "changed")
+        counts[status] += 1
+        if status != "unchanged":
+            fresh.append(code)
+        entries[code] = {"hash": digest, "post": scrape_state.trim_post(post)}
+
+    window = sorted(entries.items(), key=lambda kv: kv[1]["post"].get("timestamp") or "", reverse=True)[:posts_limit]
+    posts = [entry["post"] for _, entry in window]
+    if not posts:
+        logger.warning("⚠️ No posts found")
+        return {"posts": [], "all_comments": [], "stats": {}, "delta": {}}
+
+    all_comments = _flatten_posts(posts)
+    fetched_codes = {p["shortCode"] for p in fetched}
+    fresh_set = set(fresh)
+    delta = {
+        "mode": "full" if full else "incremental",
+        "fetched_posts": len(fetched),
+        "new_posts": counts["new"],
+        "changed_posts": counts["changed"],
+        "unchanged_posts": counts["unchanged"],
+        "reused_posts": sum(1 for code, _ in window if code not in fetched_codes),
+        "new_items": sum(1 for item in all_comments if item["postId"] in fresh_set),
+        "fresh_posts": [code for code, _ in window if code in fresh_set],
+    }
+
+    now = datetime.now(timezone.utc).isoformat()
+    newest = posts[0]
+    scrape_state.save(profile_url, {
+        "high_water": {"shortCode": newest.get("shortCode"), "timestamp": newest.get("timestamp")},
+        "posts": dict(window),
+        "limit": posts_limit,
+        "full_at": now if full else (state or {}).get("full_at"),
+        "updated_at": now,
+    })
+
+    stats = _post_stats(posts, all_comments)
+    logger.info(
+        f"📊 Scrape delta ({delta['mode']}): {delta['fetched_posts']} fetched, {delta['new_posts']} new, "
+        f"{delta['changed_posts']} changed, {delta['reused_posts']} reused -> {delta['new_items']}/{len(all_comments)} new items"
+    )
+    return {"posts": posts, "all_comments": all_comments, "stats": stats, "delta": delta}
+
+
+def _cached_delta(posts: list[dict[str, Any]]) -> dict[str, Any]:
     return {
-        "posts": posts,
-        "all_comments": all_comments,
-        "stats": stats
+        "mode": "cached", "fetched_posts": 0, "new_posts": 0, "changed_posts": 0,
+        "unchanged_posts": 0, "reused_posts": len(posts), "new_items": 0, "fresh_posts": [],
     }
 
 
+def _cache_key(profile_url: str, posts_limit: int) -> str:
+    return f"scrape:result:{scrape_state.normalize_profile_url(profile_url)}:{posts_limit}"
+
+
+def get_cached_scrape(profile_url: str, posts_limit: int) -> Optional[dict[str, Any]]:
+    """A recent identical scrape (SCRAPE_CACHE_TTL_SECONDS), with delta mode "cached"."""
+    if settings.SCRAPE_CACHE_TTL_SECONDS <= 0:
+        return None
+    try:
+        cached = get_state_store().get_json(_cache_key(profile_url, posts_limit))
+    except Exception as e:
+        logger.warning(f"⚠️ Scrape cache unavailable: {e}")
+        return None
+    if not cached:
+        return None
+    logger.info(f"♻️ Scrape cache hit: {profile_url} ({len(cached['all_comments'])} items)")
+    return {**cached, "delta": _cached_delta(cached["posts"])}
+
+
+def cache_scrape(profile_url: str, posts_limit: int, result: dict[str, Any]):
+    if settings.SCRAPE_CACHE_TTL_SECONDS <= 0 or not result.get("all_comments"):
+        return
+    try:
+        get_state_store().set_json(_cache_key(profile_url, posts_limit), result, ttl=settings.SCRAPE_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache scrape of {profile_url}: {e}")
+
+
+async def _scrape_and_cache(profile_url: str, posts_limit: int) -> dict[str, Any]:
+    result = await scrape_instagram_profile_delta(profile_url, posts_limit=posts_limit)
+    cache_scrape(profile_url, posts_limit, result)
+    return result
+
+
+async def scrape_instagram_profile_cached(profile_url: str, posts_limit: int = 12) -> dict[str, Any]:
+    """
+    scrape_instagram_profile_delta behind a result cache and a single-flight.
+
+    Results are cached in the shared state store for SCRAPE_CACHE_TTL_SECONDS,
+    keyed by normalized profile URL + limit (a hit reports delta mode "cached").
+    Concurrent callers in this process for the same key share one Apify run.
+    """
+    cached = get_cached_scrape(profile_url, posts_limit)
+    if cached:
+        return cached
+
+    cache_key = _cache_key(profile_url, posts_limit)
+    task = _scrapes_in_flight.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(_scrape_and_cache(profile_url, posts_limit))
+        _scrapes_in_flight[cache_key] = task
+        task.add_done_callback(lambda _: _scrapes_in_flight.pop(cache_key, None))
+    else:
+        logger.info(f"🔗 Joining in-flight scrape: {profile_url}")
+    # Shielded: a caller timing out doesn't cancel the scrape for the others
+    return dict(await asyncio.shield(task))
 
 
 # Utility function to normalize comment format for classification
@@ -270,6 +498,7 @@ def normalize_comment_for_classification(item: dict[str, Any]) -> dict[str, Any]
     return {
         "platform": "instagram",
         "platform_id": item.get("id") or item.get("postId", ""),
+        "post_id": item.get("postId"),
         "content": item.get("text", ""),
         "author": item.get("ownerUsername", "unknown"),
         "posted_at": item.get("timestamp"),
@@ -1,20 +1,38 @@
 
+import asyncio
+import calendar
 import logging
 import uuid
 import random
 import json
-from datetime import datetime, timedelta
+from collections import defaultdict
+from datetime import datetime, timedelta, date
 from typing import List, Dict, Any, Optional
 
 from .database import db
 from .gemini_service import _call_gemini
+from .strategy_tree import StrategyTree, get_strategy_tree
+from .document_index import retrieve_context
 
 logger = logging.getLogger(__name__)
 
-# Enhanced Prompt for generating the monthly plan with Phase 1 Strategy Data
+# The month is generated in weekly chunks, concurrently
+MAX_CONCURRENT_CHUNKS = 4
+CHUNK_RETRIES = 1
+DAYS_PER_CHUNK = 7
+
+# Quota key -> output formats that count against it
+FORMAT_KINDS = {
+    "photo": {"post", "carousel"},
+    "video": {"reel", "video", "live"},
+    "story": {"story"},
+}
+FREQUENCY_WEIGHTS = {"high": 4, "medium": 2, "low": 1}
+
+# Enhanced Prompt for generating one week of the monthly plan with Phase 1 Strategy Data
 MONTHLY_PLAN_PROMPT = """
 Eres un SOCIAL MEDIA MANAGER SENIOR con acceso a una estrategia de contenido profundamente detallada.
-Tu tarea es generar el PLAN MENSUAL DE CONTENIDOS para {month_name} {year}.
+Tu tarea es generar la SEMANA {week} del PLAN MENSUAL DE CONTENIDOS de {month_name} {year}.
 
 ═══════════════════════════════════════════════════════════════════════════════
 📊 CONTEXTO DE MARCA
@@ -23,7 +41,7 @@ Tu tarea es generar el PLAN MENSUAL DE CONTENIDOS para {month_name} {year}.
 {brand_context}
 
 ═══════════════════════════════════════════════════════════════════════════════
-🎯 ESTRATEGIA COMPLETA (Jerarquía con Datos Enriquecidos)
+🎯 CONCEPTOS ASIGNADOS A ESTA SEMANA (Jerarquía con Datos Enriquecidos)
 ═══════════════════════════════════════════════════════════════════════════════
 
 {strategy_hierarchy_json}
@@ -32,25 +50,22 @@ IMPORTANTE: Para cada concepto tienes disponible:
 - ✅ **Razón Estratégica**: Por qué este concepto es crítico para el objetivo
 - ✅ **Hooks Creativos**: 4-6 hooks específicos PRE-VALIDADOS y listos para usar
 - ✅ **Guía de Ejecución**: Estructura narrativa, elementos clave, mejores prácticas y errores a evitar
-- ✅ **Frecuencia Sugerida**: Cuántas veces usar este concepto en el mes
+- ✅ **Usos (`uses`)**: Cuántos posts de este concepto tocan ESTA semana
 - ✅ **Tags**: Etiquetas temáticas para variación
 
 ═══════════════════════════════════════════════════════════════════════════════
 📋 INSTRUCCIONES DE GENERACIÓN
 ═══════════════════════════════════════════════════════════════════════════════
 
-**1. CUOTAS A CUMPLIR:**
+**1. CUOTAS A CUMPLIR (esta semana):**
    - Total de posts: {total_posts}
    - Posts/Carruseles: {quota_photo}
    - Reels/Videos: {quota_video}
    - Stories: {quota_story}
 
 **2. DISTRIBUCIÓN TEMPORAL:**
-   - Rango de fechas: {start_date} al {end_date}
-   - Distribuir según frecuencia sugerida de cada concepto:
-     * HIGH frequency: 3-4 veces en el mes
-     * MEDIUM frequency: 1-2 veces en el mes
-     * LOW frequency: 1 vez en el mes
+   - Rango de fechas: {start_date} al {end_date} (NO uses fechas fuera de este rango)
+   - Usa cada concepto exactamente el número de veces indicado en `uses`
    - NO repetir el mismo objetivo en días consecutivos
    - Balancear entre objetivos principales y secundarios
 
@@ -115,80 +130,35 @@ IMPORTANTE: Para cada concepto tienes disponible:
 4. **SÉ ACCIONABLE**: Los dos/donts deben ser prácticos para el creador de contenido
 5. **SÉ CONSISTENTE**: Respeta la estructura narrativa recomendada
 
-¡Genera el plan mensual ahora!
+¡Genera el plan de la semana ahora!
 """
 
-async def generate_monthly_plan(
-    client_id: str,
-    year: int,
-    month: int,
-    quotas: Dict[str, int]
-) -> List[Dict[str, Any]]:
-    """
-    Generates a monthly content plan based on strategy concepts and quotas.
-    Returns a list of generated tasks (not yet saved to DB).
-    """
-    # 1. Fetch Strategy Nodes (ALL nodes for hierarchy)
-    nodes = db.get_strategy_nodes(client_id)
-    concepts = [n for n in nodes if n.get("type") == "concept"]
-    
-    if not concepts:
-        logger.warning(f"No strategy concepts found for client {client_id}")
-        # Fallback concepts if none exist
-        concepts = [
-            {"id": "fallback_1", "label": "Educativo", "description": "Contenido de valor"},
-            {"id": "fallback_2", "label": "Promocional", "description": "Ofertas y productos"},
-            {"id": "fallback_3", "label": "Social Proof", "description": "Testimonios"}
-        ]
-
-    # 2. Get Brand Context (Interview)
-    interview = db.get_interview(client_id)
-    brand_context = f"Cliente ID: {client_id}"
-    if interview:
-        data = interview.get("data", {})
-        brand_context = (
-            f"Marca: {data.get('businessName', 'La Marca')}\n"
-            f"Industria: {data.get('industry', 'General')}\n"
-            f"Audiencia: {data.get('targetAudience', 'General')}\n"
-            f"Objetivos: {data.get('goals', 'Ventas')}"
-        )
-
-    # 3. Build Enriched Strategy Hierarchy
-    # Group nodes by type
-    main_nodes = [n for n in nodes if n.get("type") == "main"]
-    objective_nodes = [n for n in nodes if n.get("type") == "secondary" and n.get("parentId") in [m["id"] for m in main_nodes]]
-    strategy_nodes = [n for n in nodes if n.get("type") == "secondary" and n.get("parentId") not in [m["id"] for m in main_nodes]]
-    
-    # Build hierarchy with full Phase 1 data
+def _build_hierarchy(tree: StrategyTree) -> Dict[str, Any]:
+    """Objectives -> strategies -> concepts, straight from the tree's children index."""
+    root = tree.root
     hierarchy = {
-        "project": main_nodes[0]["label"] if main_nodes else "Proyecto Marketing",
+        "project": root["label"] if root else "Proyecto Marketing",
         "objectives": []
     }
-    
-    for obj in objective_nodes:
-        # Find strategies for this objective
-        obj_strategies = [s for s in strategy_nodes if s.get("parentId") == obj["id"]]
-        
+
+    for obj in tree.objectives():
         objective_data = {
             "id": obj["id"],
             "title": obj["label"],
             "rationale": obj.get("description", ""),
             "strategies": []
         }
-        
-        for strat in obj_strategies:
-            # Find concepts for this strategy
-            strat_concepts = [c for c in concepts if c.get("parentId") == strat["id"]]
-            
+
+        for strat in tree.children(obj["id"], "secondary"):
             strategy_data = {
                 "id": strat["id"],
                 "title": strat["label"],
                 "concepts": []
             }
-            
-            for concept in strat_concepts:
+
+            for concept in tree.children(strat["id"], "concept"):
                 # Include ALL Phase 1 fields
-                concept_data = {
+                strategy_data["concepts"].append({
                     "id": concept["id"],
                     "label": concept["label"],
                     "description": concept.get("description", ""),
@@ -202,100 +172,259 @@ async def generate_monthly_plan(
                     # Context for reference
                     "objective_context": obj["label"],
                     "strategy_context": strat["label"]
-                }
-                strategy_data["concepts"].append(concept_data)
-            
+                })
+
             if strategy_data["concepts"]:  # Only add if has concepts
                 objective_data["strategies"].append(strategy_data)
-        
+
         if objective_data["strategies"]:  # Only add if has strategies
             hierarchy["objectives"].append(objective_data)
 
-    # 4. Prepare Prompt Variables
-    import calendar
-    month_name = calendar.month_name[month]
-    
-    # Calculate dates
-    start_date = datetime(year, month, 1)
+    return hierarchy
+
+
+def _week_ranges(year: int, month: int) -> List[tuple[date, date]]:
+    """7-day chunks of the month; a short tail (29th-31st) joins the last week."""
     last_day = calendar.monthrange(year, month)[1]
-    end_date = datetime(year, month, last_day)
-    
-    total_posts = sum(quotas.values())
-
-    prompt = MONTHLY_PLAN_PROMPT.format(
-        month_name=month_name,
-        year=year,
-        brand_context=brand_context,
-        strategy_hierarchy_json=json.dumps(hierarchy, ensure_ascii=False, indent=2),
-        total_posts=total_posts,
-        quota_photo=quotas.get("photo", 0),
-        quota_video=quotas.get("video", 0),
-        quota_story=quotas.get("story", 0),
-        start_date=start_date.strftime("%Y-%m-%d"),
-        end_date=end_date.strftime("%Y-%m-%d")
+    starts = list(range(1, last_day + 1, DAYS_PER_CHUNK))
+    if len(starts) > 1 and last_day - starts[-1] + 1 < DAYS_PER_CHUNK:
+        starts.pop()
+    ends = [s - 1 for s in starts[1:]] + [last_day]
+    return [(date(year, month, s), date(year, month, e)) for s, e in zip(starts, ends)]
+
+
+def _split(total: int, weights: List[float]) -> List[int]:
+    """Integer split of `total` proportional to `weights` (largest remainder)."""
+    weight_sum = sum(weights)
+    if total <= 0 or weight_sum <= 0:
+        return [0] * len(weights)
+    exact = [total * w / weight_sum for w in weights]
+    counts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _allocate_concepts(concepts: List[dict], week_sizes: List[int]) -> List[Dict[str, int]]:
+    """
+    {concept_id: uses} per week. Monthly uses follow suggested_frequency; each
+    concept's uses are spread evenly over the month and objectives interleaved,
+    so concurrent chunks don't all pick the same concepts.
+    """
+    weights = [FREQUENCY_WEIGHTS.get(c.get("suggested_frequency"), 2) for c in concepts]
+    uses = _split(sum(week_sizes), weights)
+
+    # Slot k of a concept used n times sits at (k + 0.5) / n of the month
+    slots = sorted(
+        ((k + 0.5) / n, i) for i, n in enumerate(uses) for k in range(n)
     )
+    allocation: List[Dict[str, int]] = [defaultdict(int) for _ in week_sizes]
+    week = 0
+    filled = 0
+    for _, i in slots:
+        while week < len(week_sizes) - 1 and filled >= week_sizes[week]:
+            week, filled = week + 1, 0
+        allocation[week][concepts[i]["id"]] += 1
+        filled += 1
+    return [dict(a) for a in allocation]
+
+
+def _chunk_hierarchy(hierarchy: Dict[str, Any], uses: Dict[str, int]) -> Dict[str, Any]:
+    """The hierarchy restricted to one chunk's concepts, each annotated with its `uses`."""
+    objectives = []
+    for obj in hierarchy["objectives"]:
+        strategies = []
+        for strat in obj["strategies"]:
+            concepts = [{**c, "uses": uses[c["id"]]} for c in strat["concepts"] if c["id"] in uses]
+            if concepts:
+                strategies.append({**strat, "concepts": concepts})
+        if strategies:
+            objectives.append({**obj, "strategies": strategies})
+    return {"project": hierarchy["project"], "objectives": objectives}
+
+
+def _format_kind(fmt: str) -> str:
+    for kind, formats in FORMAT_KINDS.items():
+        if fmt in formats:
+            return kind
+    return "photo"
+
+
+async def _generate_chunk(prompt: str, week: int, sem: asyncio.Semaphore) -> List[dict]:
+    async with sem:
+        for attempt in range(CHUNK_RETRIES + 1):
+            try:
+                response = await _call_gemini(prompt, temperature=0.7, model="gpt-5-mini")
+                # Robust parsing
+                if isinstance(response, dict):
+                    return response.get("posts", [])
+                if isinstance(response, list):
+                    return response
+                return []
+            except Exception as e:
+                logger.warning(f"Week {week} of monthly plan failed (attempt {attempt + 1}): {e}")
+    return []
+
+
+def _balance_chunk(posts: List[dict], start: date, end: date, quotas: Dict[str, int]) -> List[dict]:
+    """
+    Keep a chunk inside its dates and quotas: excess posts of a format are dropped,
+    missing or out-of-range dates and (date, format) collisions move to the nearest
+    free day of the chunk.
+    """
+    days = [start + timedelta(days=d) for d in range((end - start).days + 1)]
+    taken: Dict[str, set] = defaultdict(set)
+    kept_per_kind: Dict[str, int] = defaultdict(int)
+    balanced = []
+    for p in posts:
+        kind = _format_kind(str(p.get("format", "post")).lower())
+        if kept_per_kind[kind] >= quotas.get(kind, 0):
+            continue
+        try:
+            wanted = datetime.strptime(str(p.get("date")), "%Y-%m-%d").date()
+        except ValueError:
+            wanted = random.choice(days)
+        wanted = min(max(wanted, start), end)
+        free = [d for d in days if d not in taken[kind]]
+        post_date = min(free, key=lambda d: abs((d - wanted).days)) if free else wanted
+        taken[kind].add(post_date)
+        kept_per_kind[kind] += 1
+        balanced.append({**p, "date": post_date.strftime("%Y-%m-%d")})
+    return balanced
 
-    # 5. Call AI (using gpt-5-mini for better reasoning)
-    try:
-        response = await _call_gemini(prompt, temperature=0.7, model="gpt-5-mini")
-        
-        # Robust parsing
-        posts = []
-        if isinstance(response, dict):
-            posts = response.get("posts", [])
-        elif isinstance(response, list):
-            posts = response
-            
-        logger.info(f"Generated {len(posts)} posts for {client_id}")
-        
-        # 6. Transform to Task format with enriched fields
-        tasks = []
-        month_group = f"{year}-{month:02d}"
-        
-        for p in posts:
-            # Validate date
-            post_date = p.get("date")
-            if not post_date:
-                day = random.randint(1, last_day)
-                post_date = f"{year}-{month:02d}-{day:02d}"
-            
-            # Find concept for context
-            concept = next((c for c in concepts if c["id"] == p.get("concept_id")), None)
-            concept_label = concept["label"] if concept else "General"
-            
-            task = {
-                "id": str(uuid.uuid4()),
-                "client_id": client_id,
-                "title": p.get("title") or f"{concept_label}: {p.get('format', 'post')}",
-                "description": p.get("description", ""),
-                "status": "PENDIENTE",
-                "priority": "Media",
-                "week": _get_week_of_month(post_date),
-                "area_estrategica": "Contenido",
-                "format": p.get("format", "post"),
-                "month_group": month_group,
-                "concept_id": p.get("concept_id"),
-                "execution_date": post_date,
-                "copy_suggestion": p.get("copy", ""),
-                # NEW ENRICHED FIELDS from Phase 1
-                "selected_hook": p.get("selected_hook", ""),
-                "narrative_structure": p.get("narrative_structure", ""),
-                "key_elements": p.get("key_elements", []),
-                "dos": p.get("dos", []),
-                "donts": p.get("donts", []),
-                "strategic_purpose": p.get("strategic_purpose", ""),
-                # Metadata
-                "score_impacto": 7,
-                "score_esfuerzo": 5,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            tasks.append(task)
-            
-        return tasks
 
-    except Exception as e:
-        logger.error(f"Error generating monthly plan: {e}")
-        raise e
+async def generate_monthly_plan(
+    client_id: str,
+    year: int,
+    month: int,
+    quotas: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """
+    Generates a monthly content plan based on strategy concepts and quotas.
+    Returns a list of generated tasks (not yet saved to DB).
+
+    Quotas and concept uses are allocated per week up front; the weeks are then
+    generated concurrently and merged.
+    """
+    # 1. Strategy hierarchy (indexed tree, cached per strategy version)
+    hierarchy = _build_hierarchy(get_strategy_tree(client_id))
+    concepts = [c for obj in hierarchy["objectives"] for s in obj["strategies"] for c in s["concepts"]]
+
+    if not concepts:
+        logger.warning(f"No strategy concepts found for client {client_id}")
+        # Fallback concepts if none exist
+        concepts = [
+            {"id": "fallback_1", "label": "Educativo", "description": "Contenido de valor"},
+            {"id": "fallback_2", "label": "Promocional", "description": "Ofertas y productos"},
+            {"id": "fallback_3", "label": "Social Proof", "description": "Testimonios"}
+        ]
+        hierarchy["objectives"] = [{"id": "general", "title": "General", "rationale": "",
+                                    "strategies": [{"id": "general", "title": "General", "concepts": concepts}]}]
+    concepts_by_id = {c["id"]: c for c in concepts}
+
+    # 2. Get Brand Context (Interview)
+    interview = db.get_interview(client_id)
+    brand_context = f"Cliente ID: {client_id}"
+    data = (interview or {}).get("data") or {}
+    if interview:
+        brand_context = (
+            f"Marca: {data.get('businessName', 'La Marca')}\n"
+            f"Industria: {data.get('industry', 'General')}\n"
+            f"Audiencia: {data.get('targetAudience', 'General')}\n"
+            f"Objetivos: {data.get('goals', 'Ventas')}"
+        )
+
+    # 3. Split the month: dates, per-format quotas and concept uses per week
+    month_name = calendar.month_name[month]
+    weeks = _week_ranges(year, month)
+    day_counts = [(end - start).days + 1 for start, end in weeks]
+    week_quotas = [dict() for _ in weeks]
+    for kind in FORMAT_KINDS:
+        for wq, n in zip(week_quotas, _split(quotas.get(kind, 0), day_counts)):
+            wq[kind] = n
+    allocation = _allocate_concepts(concepts, [sum(wq.values()) for wq in week_quotas])
+
+    # 4. Generate every week concurrently (using gpt-5-mini for better reasoning)
+    sem = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+    jobs = []
+    for w, ((start, end), wq, uses) in enumerate(zip(weeks, week_quotas, allocation), start=1):
+        if not sum(wq.values()):
+            jobs.append(None)
+            continue
+        # Attachment passages (catalog, prices...) about this week's concepts
+        query = " ".join(f"{concepts_by_id[cid]['label']} {concepts_by_id[cid].get('description', '')}" for cid in uses)
+        material = retrieve_context(client_id, query, max_chars=1500, fallback=data.get("product_context", ""))
+        week_context = f"{brand_context}\nMaterial del cliente (extractos):\n{material}" if material else brand_context
+        prompt = MONTHLY_PLAN_PROMPT.format(
+            week=w,
+            month_name=month_name,
+            year=year,
+            brand_context=week_context,
+            strategy_hierarchy_json=json.dumps(_chunk_hierarchy(hierarchy, uses), ensure_ascii=False, indent=2),
+            total_posts=sum(wq.values()),
+            quota_photo=wq["photo"],
+            quota_video=wq["video"],
+            quota_story=wq["story"],
+            start_date=start.strftime("%Y-%m-%d"),
+            end_date=end.strftime("%Y-%m-%d")
+        )
+        jobs.append(_generate_chunk(prompt, w, sem))
+
+    results = await asyncio.gather(*(job for job in jobs if job is not None))
+    expected = [i for i, job in enumerate(jobs) if job is not None]
+    if expected and not any(results):
+        raise ValueError("Monthly plan generation failed for every week")
+
+    # 5. Merge with date-collision and quota balancing
+    posts = []
+    for i, chunk in zip(expected, results):
+        start, end = weeks[i]
+        if not chunk:
+            logger.warning(f"Week {i + 1} of {month_name} {year} came back empty")
+        posts.extend(_balance_chunk(chunk, start, end, week_quotas[i]))
+    logger.info(f"Generated {len(posts)} posts for {client_id} ({len(expected)} weekly chunks)")
+
+    # 6. Transform to Task format with enriched fields
+    tasks = []
+    month_group = f"{year}-{month:02d}"
+
+    for p in posts:
+        post_date = p["date"]
+
+        # Concept for context
+        concept = concepts_by_id.get(p.get("concept_id"))
+        concept_label = concept["label"] if concept else "General"
+
+        task = {
+            "id": str(uuid.uuid4()),
+            "client_id": client_id,
+            "title": p.get("title") or f"{concept_label}: {p.get('format', 'post')}",
+            "description": p.get("description", ""),
+            "status": "PENDIENTE",
+            "priority": "Media",
+            "week": _get_week_of_month(post_date),
+            "area_estrategica": "Contenido",
+            "format": p.get("format", "post"),
+            "month_group": month_group,
+            "concept_id": p.get("concept_id"),
+            "execution_date": post_date,
+            "copy_suggestion": p.get("copy", ""),
+            # NEW ENRICHED FIELDS from Phase 1
+            "selected_hook": p.get("selected_hook", ""),
+            "narrative_structure": p.get("narrative_structure", ""),
+            "key_elements": p.get("key_elements", []),
+            "dos": p.get("dos", []),
+            "donts": p.get("donts", []),
+            "strategic_purpose": p.get("strategic_purpose", ""),
+            # Metadata
+            "score_impacto": 7,
+            "score_esfuerzo": 5,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        tasks.append(task)
+
+    return sorted(tasks, key=lambda t: t["execution_date"])
 
 def _get_week_of_month(date_str: str) -> int:
     try:
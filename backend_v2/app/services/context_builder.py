@@ -1,6 +1,7 @@
 import logging
 from typing import List, Dict, Any, Optional
 from ..services.database import db
+from ..services.strategy_tree import get_strategy_tree
 
 logger = logging.getLogger(__name__)
 
@@ -116,11 +117,10 @@ class ContextBuilderService:
 
             # 3. Fetch Strategy/Analysis Data
             # This brings high-level strategy pillars
-            strategy_nodes = db.get_strategy_nodes(client_id)
-            if strategy_nodes:
-                 # Objectives (main)
-                objectives = [n for n in strategy_nodes if n.get('type') == 'main']
-                for idx, obj in enumerate(objectives):
+            tree = get_strategy_tree(client_id)
+            if len(tree):
+                 # Objectives
+                for idx, obj in enumerate(tree.objectives()):
                     context_blocks["analysis"].append({
                         "id": f"strat_obj_{idx}",
                         "label": f"Objetivo: {obj.get('label', 'Principal')}",
@@ -128,9 +128,8 @@ class ContextBuilderService:
                         "selected": True
                     })
                 
-                # Pillars (secondary)
-                pillars = [n for n in strategy_nodes if n.get('type') == 'secondary']
-                for idx, pillar in enumerate(pillars):
+                # Pillars (strategies)
+                for idx, pillar in enumerate(tree.strategies()):
                      context_blocks["analysis"].append({
                         "id": f"strat_pillar_{idx}",
                         "label": f"Pilar: {pillar.get('label', '')}",
@@ -139,7 +138,7 @@ class ContextBuilderService:
                     })
                 
                 # Concepts/Posts (post)
-                concepts = [n for n in strategy_nodes if n.get('type') in ['concept', 'post']]
+                concepts = tree.concepts()
                 # Limit to latest 3 concepts to avoid noise
                 for idx, concept in enumerate(concepts[:3]):
                     context_blocks["analysis"].append({
@@ -150,12 +149,9 @@ class ContextBuilderService:
                     })
 
             # 4. Fetch Analysis Report Data (Interpretations)
-            latest_report = db.get_latest_completed_report(client_id)
-            if latest_report and "audit_log" in latest_report:
-                # Try to extract interpretations from audit_log or frontend_compatible_json
-                # The interpretations are usually stored in 'interpretations' result or directly in the report text
-                
-                # We'll check 'frontend_compatible_json' first as it holds the structured Q1-Q10
+            # Only Q9/Q10 are needed here; skip loading the rest of the report
+            latest_report = db.get_latest_completed_report(client_id, sections=["Q9", "Q10"])
+            if latest_report:
                 fcj = latest_report.get("frontend_compatible_json", {})
                 
                 # Check Q9 (Recomendaciones) specifically
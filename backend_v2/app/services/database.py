@@ -1,47 +1,193 @@
 
 
+import base64
+import hashlib
+import json
 import logging
-from typing import Optional, Any
-from supabase import create_client, Client
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional, Any, TYPE_CHECKING
 from ..config import settings
+from .response_cache import response_cache
+from .metrics import instrument_methods, DB_QUERY_SECONDS
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from supabase import Client
 
-# Add file logging to bypass PowerShell display issues
-file_handler = logging.FileHandler('database_debug.log')
-file_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.setLevel(logging.INFO)
+logger = logging.getLogger(__name__)
 
-class SupabaseService:
-    def __init__(self):
-        # Public Client (Anon) - Used only for auth operations
-        if settings.SUPABASE_URL and settings.SUPABASE_KEY:
-            self.anon_client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# ============================================================================
+# List endpoints: page sizes and column projections
+# ============================================================================
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Tasks carry large JSON/text fields (key_elements, dos, donts, copy_suggestion...).
+# List views only need the card fields; the full row is loaded via get_task().
+TASK_SUMMARY_COLUMNS = (
+    "id, client_id, title, description, status, priority, week, "
+    "area_estrategica, score_impacto, score_esfuerzo, format, month_group, "
+    "concept_id, execution_date, selected_image_id, created_at, completed_at"
+)
+TASK_DETAIL_COLUMNS = "*"
+TASK_COLUMNS_BY_VIEW = {
+    "summary": TASK_SUMMARY_COLUMNS,
+    "full": TASK_DETAIL_COLUMNS,
+}
+
+CLIENT_LIST_COLUMNS = "id, nombre, industry, plan, is_active, created_at"
+USER_LIST_COLUMNS = "id, email, full_name, role, created_at, client_id, plan, plan_expires_at"
+
+# Analysis reports: slim header row + one row per section in analysis_report_sections
+# (see migrations/007_split_analysis_report_sections.sql)
+REPORT_HEADER_COLUMNS = "id, client_id, status, created_at, content_hash, section_keys"
+REPORT_QUESTION_SECTIONS = ["_metadata"] + [f"Q{i}" for i in range(1, 11)]
+REPORT_AUDIT_SECTION = "audit_log"
+
+STRATEGY_NODE_COLUMNS = "*"
+STRATEGY_NODE_ID_COLUMNS = "id"
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Build an opaque keyset cursor from the last row of a page."""
+    raw = f"{created_at}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Inverse of encode_cursor. The cursor comes from the client, so both parts are
+    parsed (ISO timestamp, UUID) and returned normalized: nothing else can reach
+    the filter. Raises ValueError on malformed input.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00")).isoformat()
+        row_id = str(uuid.UUID(row_id))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    return created_at, row_id
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit or limit <= 0:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def apply_keyset(query, cursor: Optional[str], desc: bool = False):
+    """
+    Keyset pagination over (created_at, id).
+    Requires the composite indexes from migrations/006_list_endpoint_indexes.sql.
+    """
+    query = query.order("created_at", desc=desc).order("id", desc=desc)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        op = "lt" if desc else "gt"
+        query = query.or_(
+            f'created_at.{op}."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.{op}."{row_id}")'
+        )
+    return query
+
+
+def page_result(rows: list[dict], limit: int) -> dict:
+    """Trim the look-ahead row and compute next_cursor."""
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        if last.get("created_at") is None:
+            # Can't be keyed on: stop here rather than hand out a cursor that won't decode
+            logger.warning(f"⚠️ Row {last.get('id')} has no created_at; pagination stops at it")
         else:
-            logger.warning("Supabase credentials missing. Persistence disabled.")
-            self.anon_client = None
+            next_cursor = encode_cursor(str(last["created_at"]), str(last.get("id")))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def fetch_all_pages(build_query, desc: bool = False) -> list[dict]:
+    """
+    Every row of `build_query()`, walked in keyset pages of MAX_PAGE_SIZE. For callers
+    that don't paginate (no limit, no cursor): they used to get every row and still do.
+    """
+    rows, cursor = [], None
+    while True:
+        query = apply_keyset(build_query(), cursor, desc=desc).limit(MAX_PAGE_SIZE + 1)
+        page = page_result(query.execute().data or [], MAX_PAGE_SIZE)
+        rows.extend(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return rows
 
-        # Admin Client (Service Role) - Bypasses RLS, used for ALL DB operations
-        if settings.SUPABASE_URL and settings.SUPABASE_SERVICE_KEY:
-            try:
-                self.admin_client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
-                logger.info("✅ Admin client initialized successfully with SERVICE_KEY")
-            except Exception as e:
-                logger.error(f"❌ Admin client initialization FAILED: {e}")
-                self.admin_client = None
-        else:
-            logger.warning("⚠️ SUPABASE_SERVICE_KEY not configured - admin operations will use public client")
-            self.admin_client = None
 
-        # Primary DB client: prefer admin_client (bypasses RLS), fallback to anon
-        self.client: Client = self.admin_client or self.anon_client
-        if self.client == self.admin_client:
-            logger.info("✅ Using SERVICE_ROLE client for all DB operations (bypasses RLS)")
-        elif self.client == self.anon_client:
-            logger.warning("⚠️ Using ANON client for DB operations - RLS policies may block access!")
+def content_hash(payload: Any) -> str:
+    """Stable hash of a JSON-serializable payload (used for report versions / ETags)."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@instrument_methods(DB_QUERY_SECONDS)
+class SupabaseService:
+    def __init__(self):
+        # Clients are created on first use: importing this module (and every
+        # router that imports `db`) stays cheap, and forked workers build their own.
+        self._anon_client: Optional["Client"] = None
+        self._admin_client: Optional["Client"] = None
+        self._client: Optional["Client"] = None
+        self._connected = False
+        self._connect_lock = threading.Lock()
+
+    def _connect(self):
+        with self._connect_lock:
+            if self._connected:
+                return
+            from supabase import create_client
+
+            # Public Client (Anon) - Used only for auth operations
+            if settings.SUPABASE_URL and settings.SUPABASE_KEY:
+                self._anon_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+            else:
+                logger.warning("Supabase credentials missing. Persistence disabled.")
+
+            # Admin Client (Service Role) - Bypasses RLS, used for ALL DB operations
+            if settings.SUPABASE_URL and settings.SUPABASE_SERVICE_KEY:
+                try:
+                    self._admin_client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+                    logger.info("✅ Admin client initialized successfully with SERVICE_KEY")
+                except Exception as e:
+                    logger.error(f"❌ Admin client initialization FAILED: {e}")
+            else:
+                logger.warning("⚠️ SUPABASE_SERVICE_KEY not configured - admin operations will use public client")
+
+            # Primary DB client: prefer admin_client (bypasses RLS), fallback to anon
+            self._client = self._admin_client or self._anon_client
+            if self._client is not None and self._client is self._admin_client:
+                logger.info("✅ Using SERVICE_ROLE client for all DB operations (bypasses RLS)")
+            elif self._client is not None:
+                logger.warning("⚠️ Using ANON client for DB operations - RLS policies may block access!")
+            self._connected = True
+
+    @property
+    def anon_client(self) -> Optional["Client"]:
+        if not self._connected:
+            self._connect()
+        return self._anon_client
+
+    @property
+    def admin_client(self) -> Optional["Client"]:
+        if not self._connected:
+            self._connect()
+        return self._admin_client
+
+    @property
+    def client(self) -> Optional["Client"]:
+        if not self._connected:
+            self._connect()
+        return self._client
 
     # ============================================================================
     # Reports (Analysis)
@@ -63,23 +209,46 @@ class SupabaseService:
     def update_report_status(self, report_id: str, status: str, result: Optional[dict] = None, error: Optional[str] = None, audit_log: Optional[dict] = None):
         if not self.client: return
         data = {"status": status}
-        if result:
-            data["frontend_compatible_json"] = result
         if error:
             data["error_message"] = error
-        if audit_log:
-            data["audit_log"] = audit_log
+        if result or audit_log:
+            # Heavy JSON goes to analysis_report_sections; the header only keeps
+            # the list of stored sections and a content hash (ETag).
+            section_keys = self.save_report_sections(report_id, result or {}, audit_log)
+            if result:
+                data["content_hash"] = content_hash(result)
+                data["section_keys"] = section_keys
             
         try:
             self.client.table("analysis_reports").update(data).eq("id", report_id).execute()
         except Exception as e:
             logger.error(f"DB Update Error (Report): {e}")
 
-    def get_latest_completed_report(self, client_id: str) -> Optional[dict]:
+    def save_report_sections(self, report_id: str, result: dict, audit_log: Optional[dict] = None) -> list[str]:
+        """Upsert one row per Q block (plus audit_log). Returns the stored section keys."""
+        rows = [
+            {"report_id": report_id, "section_key": key, "payload": payload}
+            for key, payload in result.items()
+        ]
+        if audit_log:
+            rows.append({"report_id": report_id, "section_key": REPORT_AUDIT_SECTION, "payload": audit_log})
+        if not rows:
+            return []
+        try:
+            self.client.table("analysis_report_sections")\
+                .upsert(rows, on_conflict="report_id,section_key")\
+                .execute()
+        except Exception as e:
+            logger.error(f"DB Upsert Error (Report Sections): {e}")
+            raise
+        return [key for key in result.keys()]
+
+    def get_latest_report_header(self, client_id: str) -> Optional[dict]:
+        """Latest COMPLETED report header (no JSON payloads)."""
         if not self.client: return None
         try:
             response = self.client.table("analysis_reports")\
-                .select("*")\
+                .select(REPORT_HEADER_COLUMNS)\
                 .eq("client_id", client_id)\
                 .eq("status", "COMPLETED")\
                 .order("created_at", desc=True)\
@@ -88,9 +257,58 @@ class SupabaseService:
             if response.data:
                 return response.data[0]
         except Exception as e:
-            logger.error(f"DB Select Error (Report): {e}")
+            logger.error(f"DB Select Error (Report Header): {e}")
         return None
 
+    def get_report_sections(self, header: dict, sections: Optional[list[str]] = None) -> dict:
+        """
+        Load only the requested sections of a report.
+        Reports written before the split (section_keys is NULL) are read from the
+        legacy frontend_compatible_json / audit_log columns.
+        """
+        if not self.client: return {}
+        wanted = sections or REPORT_QUESTION_SECTIONS
+        try:
+            if header.get("section_keys") is None:
+                legacy_columns = ["frontend_compatible_json"]
+                if REPORT_AUDIT_SECTION in wanted:
+                    legacy_columns.append(REPORT_AUDIT_SECTION)
+                response = self.client.table("analysis_reports")\
+                    .select(", ".join(legacy_columns))\
+                    .eq("id", header["id"])\
+                    .limit(1)\
+                    .execute()
+                row = response.data[0] if response.data else {}
+                merged = dict(row.get("frontend_compatible_json") or {})
+                if row.get(REPORT_AUDIT_SECTION):
+                    merged[REPORT_AUDIT_SECTION] = row[REPORT_AUDIT_SECTION]
+                return {k: v for k, v in merged.items() if k in wanted}
+
+            response = self.client.table("analysis_report_sections")\
+                .select("section_key, payload")\
+                .eq("report_id", header["id"])\
+                .in_("section_key", wanted)\
+                .execute()
+            return {row["section_key"]: row["payload"] for row in (response.data or [])}
+        except Exception as e:
+            logger.error(f"DB Select Error (Report Sections): {e}")
+            return {}
+
+    def get_latest_completed_report(self, client_id: str, sections: Optional[list[str]] = None) -> Optional[dict]:
+        """
+        Latest COMPLETED report as {header..., "frontend_compatible_json": {...}}.
+        Pass `sections` (e.g. ["Q9", "Q10"]) to load only those blocks.
+        """
+        header = self.get_latest_report_header(client_id)
+        if not header:
+            return None
+        loaded = self.get_report_sections(header, sections)
+        audit_log = loaded.pop(REPORT_AUDIT_SECTION, None)
+        report = {**header, "frontend_compatible_json": loaded}
+        if audit_log is not None:
+            report[REPORT_AUDIT_SECTION] = audit_log
+        return report
+
     def get_client_status(self, client_id: str) -> dict:
         if not self.client: return {"status": None}
         try:
@@ -113,15 +331,43 @@ class SupabaseService:
     # Clients
     # ============================================================================
 
-    def list_clients(self) -> list[dict]:
+    def list_clients(self, columns: str = CLIENT_LIST_COLUMNS) -> list[dict]:
+        """All clients (admin views). Prefer list_clients_page for user-facing lists."""
         if not self.client: return []
         try:
-            response = self.client.table("clients").select("*").execute()
+            response = self.client.table("clients").select(columns).order("created_at").execute()
             return response.data if response.data else []
         except Exception as e:
             logger.error(f"DB List Error (Clients): {e}")
             return []
 
+    def list_clients_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        columns: str = CLIENT_LIST_COLUMNS
+    ) -> dict:
+        """
+        Keyset-paginated client list. Returns {"items": [...], "next_cursor": str|None}.
+        Without limit and cursor, every client (next_cursor None).
+        """
+        if not self.client: return {"items": [], "next_cursor": None}
+        if limit is None and cursor is None:
+            try:
+                return {"items": fetch_all_pages(lambda: self.client.table("clients").select(columns)), "next_cursor": None}
+            except Exception as e:
+                logger.error(f"DB List Page Error (Clients): {e}")
+                return {"items": [], "next_cursor": None}
+        limit = clamp_page_size(limit)
+        query = self.client.table("clients").select(columns)
+        query = apply_keyset(query, cursor).limit(limit + 1)
+        try:
+            response = query.execute()
+            return page_result(response.data or [], limit)
+        except Exception as e:
+            logger.error(f"DB List Page Error (Clients): {e}")
+            return {"items": [], "next_cursor": None}
+
     def create_client(self, client_data: dict):
         """Create a new client. Raises exception if fails."""
         if not self.client:
@@ -152,6 +398,7 @@ class SupabaseService:
         
         try:
             response = self.client.table("clients").update(updates).eq("id", client_id).execute()
+            response_cache.invalidate_client(client_id, "brand")
             logger.info(f"Updated client {client_id}: {updates}")
             return response.data
         except Exception as e:
@@ -162,6 +409,7 @@ class SupabaseService:
         if not self.client: return
         try:
             self.client.table("clients").delete().eq("id", client_id).execute()
+            response_cache.invalidate_client(client_id, "analysis", "brand", "strategy")
         except Exception as e:
             logger.error(f"DB Delete Error (Client): {e}")
 
@@ -197,7 +445,6 @@ class SupabaseService:
         if not self.client: return None
         try:
             response = self.client.table("users").select("*").eq("email", email).limit(1).execute()
-            print("DB RESPONSE", response) # Debug
             if response.data:
                 return response.data[0]
         except Exception as e:
@@ -256,15 +503,44 @@ class SupabaseService:
             logger.error(f"DB Update User Error: {e}")
             raise e
 
-    def list_users(self) -> list[dict]:
+    def list_users(self, columns: str = USER_LIST_COLUMNS) -> list[dict]:
         if not self.client: return []
         try:
-            response = self.client.table("users").select("id, email, full_name, role, created_at, client_id, plan, plan_expires_at").execute()
+            response = self.client.table("users").select(columns).order("created_at").execute()
             return response.data if response.data else []
         except Exception as e:
             logger.error(f"DB List Users Error: {e}")
             return []
 
+    def list_users_page(
+        self,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        client_id: Optional[str] = None,
+        columns: str = USER_LIST_COLUMNS
+    ) -> dict:
+        """Keyset-paginated user list, optionally scoped to a brand. Without limit and cursor, every user."""
+        if not self.client: return {"items": [], "next_cursor": None}
+
+        def users_query():
+            query = self.client.table("users").select(columns)
+            return query.eq("client_id", client_id) if client_id else query
+
+        if limit is None and cursor is None:
+            try:
+                return {"items": fetch_all_pages(users_query), "next_cursor": None}
+            except Exception as e:
+                logger.error(f"DB List Users Page Error: {e}")
+                return {"items": [], "next_cursor": None}
+        limit = clamp_page_size(limit)
+        query = apply_keyset(users_query(), cursor).limit(limit + 1)
+        try:
+            response = query.execute()
+            return page_result(response.data or [], limit)
+        except Exception as e:
+            logger.error(f"DB List Users Page Error: {e}")
+            return {"items": [], "next_cursor": None}
+
     def delete_user(self, user_id: str):
         if not self.client: return
         try:
@@ -333,14 +609,80 @@ class SupabaseService:
             logger.error(f"DB Batch Insert Error (Tasks): {e}", exc_info=True)
             raise  # Re-raise so pipeline can log it
 
-    def get_tasks(self, client_id: str) -> list[dict]:
+    def _tasks_query(
+        self,
+        client_id: str,
+        columns: str,
+        month_group: Optional[str] = None,
+        status: Optional[str] = None,
+        week: Optional[int] = None
+    ):
+        query = self.client.table("tasks").select(columns).eq("client_id", client_id)
+        if month_group:
+            query = query.eq("month_group", month_group)
+        if status:
+            query = query.eq("status", status)
+        if week is not None:
+            query = query.eq("week", week)
+        return query
+
+    def get_tasks(
+        self,
+        client_id: str,
+        columns: str = TASK_DETAIL_COLUMNS,
+        month_group: Optional[str] = None,
+        status: Optional[str] = None,
+        week: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> list[dict]:
+        """
+        Tasks for a client, filtered server-side. With `limit`, the first `limit`
+        rows; without it, every row (fetched in keyset pages of MAX_PAGE_SIZE, for
+        callers that don't paginate). Pass columns=TASK_SUMMARY_COLUMNS to skip the
+        heavy JSON fields.
+        """
         if not self.client: return []
         try:
-            response = self.client.table("tasks").select("*").eq("client_id", client_id).execute()
-            return response.data if response.data else []
+            if limit:
+                query = self._tasks_query(client_id, columns, month_group, status, week)
+                response = query.order("created_at").order("id").limit(limit).execute()
+                return response.data if response.data else []
+            return fetch_all_pages(lambda: self._tasks_query(client_id, columns, month_group, status, week))
         except Exception as e:
             logger.error(f"DB Get Tasks Error: {e}")
             return []
+
+    def get_tasks_page(
+        self,
+        client_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        columns: str = TASK_SUMMARY_COLUMNS,
+        month_group: Optional[str] = None,
+        status: Optional[str] = None,
+        week: Optional[int] = None
+    ) -> dict:
+        """
+        Keyset-paginated tasks. Returns {"items": [...], "next_cursor": str|None}.
+        Without limit and cursor, every matching task (next_cursor None).
+        """
+        if not self.client: return {"items": [], "next_cursor": None}
+        if limit is None and cursor is None:
+            try:
+                tasks = fetch_all_pages(lambda: self._tasks_query(client_id, columns, month_group, status, week))
+                return {"items": tasks, "next_cursor": None}
+            except Exception as e:
+                logger.error(f"DB Get Tasks Page Error: {e}")
+                return {"items": [], "next_cursor": None}
+        limit = clamp_page_size(limit)
+        query = self._tasks_query(client_id, columns, month_group, status, week)
+        query = apply_keyset(query, cursor).limit(limit + 1)
+        try:
+            response = query.execute()
+            return page_result(response.data or [], limit)
+        except Exception as e:
+            logger.error(f"DB Get Tasks Page Error: {e}")
+            return {"items": [], "next_cursor": None}
     
     def get_task(self, task_id: str) -> Optional[dict]:
         """Get a single task by ID."""
@@ -376,6 +718,9 @@ class SupabaseService:
             else:
                 # Insert
                 self.client.table("client_interviews").insert(payload).execute()
+            
+            # GET /brand injects personas from the interview
+            response_cache.invalidate_client(client_id, "brand")
                 
         except Exception as e:
             logger.error(f"DB Save Interview Error: {e}")
@@ -402,18 +747,20 @@ class SupabaseService:
     # Strategy (Visual Editor)
     # ============================================================================
 
-    def get_strategy_nodes(self, client_id: str) -> list[dict]:
+    def get_strategy_nodes(self, client_id: str, columns: str = STRATEGY_NODE_COLUMNS, limit: Optional[int] = None) -> list[dict]:
         if not self.client: return []
         try:
             logger.info(f"🔍 Fetching strategy nodes for client_id: {client_id}")
             
             # Order by type (main first, then secondary, then concept/post)
             # Then by created_at for consistent ordering within each type
-            response = self.client.table("strategy_nodes")\
-                .select("*")\
+            query = self.client.table("strategy_nodes")\
+                .select(columns)\
                 .eq("client_id", client_id)\
-                .order("created_at", desc=False)\
-                .execute()
+                .order("created_at", desc=False)
+            if limit:
+                query = query.limit(limit)
+            response = query.execute()
             
             logger.info(f"📊 Found {len(response.data) if response.data else 0} nodes for client {client_id}")
             
@@ -422,6 +769,10 @@ class SupabaseService:
             logger.error(f"❌ DB Get Strategy Error: {e}")
             return []
 
+    def has_strategy_nodes(self, client_id: str) -> bool:
+        """Existence check without pulling the whole tree."""
+        return bool(self.get_strategy_nodes(client_id, columns=STRATEGY_NODE_ID_COLUMNS, limit=1))
+
     def sync_strategy_nodes(self, client_id: str, nodes: list[dict]):
         """
         Full sync: Delete all existing nodes for client and re-insert.
@@ -446,8 +797,27 @@ class SupabaseService:
             else:
                 logger.info(f"ℹ️ No nodes to insert for client {client_id}")
                 
+            # Invalidate only once the new tree is written: a read during the sync
+            # would otherwise re-cache the old / half-written tree
+            response_cache.invalidate_client(client_id, "strategy")
         except Exception as e:
             logger.error(f"❌ DB Sync Strategy Error for client {client_id}: {e}")
+            response_cache.invalidate_client(client_id, "strategy")  # the delete may have gone through
+            raise e
+
+    def append_strategy_nodes(self, client_id: str, nodes: list[dict]):
+        """
+        Incremental insert (no delete): used while a strategy is being streamed,
+        after sync_strategy_nodes has reset the tree to its root.
+        """
+        if not self.client or not nodes: return
+        try:
+            for n in nodes:
+                n["client_id"] = client_id
+            self.client.table("strategy_nodes").insert(nodes).execute()
+            response_cache.invalidate_client(client_id, "strategy")
+        except Exception as e:
+            logger.error(f"❌ DB Append Strategy Error for client {client_id}: {e}")
             raise e
 
     # ============================================================================
@@ -474,7 +844,8 @@ class SupabaseService:
                 self.client.table("brand_identities").update(data).eq("client_id", client_id).execute()
             else:
                 self.client.table("brand_identities").insert(data).execute()
-                
+            
+            response_cache.invalidate_client(client_id, "brand")
             logger.info(f"✅ Brand identity updated for {client_id}")
         except Exception as e:
             logger.error(f"DB Update Brand Error: {e}")
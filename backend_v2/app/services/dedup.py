@@ -0,0 +1,225 @@
+"""
+Comment Dedup
+=============
+Pre-classification collapsing of duplicate, near-duplicate and trivial comments.
+
+Stages (on normalized items from apify_service.normalize_comment_for_classification):
+1. Local rules: mention-only (giveaway tagging), link-only and empty comments are
+   not classified (`dropped`); emoji-only comments are keyed by their set of emojis, and text
+   comments keep their emoji set in the key (emojis carry sentiment).
+2. Exact duplicates: same normalized text (case, accents kept, @mentions/URLs
+   removed, repeated letters squeezed, punctuation stripped).
+3. Near duplicates: MinHash over character shingles + LSH banding, confirmed by
+   estimated Jaccard >= NEAR_DUP_THRESHOLD.
+
+Only one representative per group is sent to the LLM. Its classification is then
+copied to every member (see `members`), so each original comment keeps its own
+author and date and the aggregates count it exactly once. `weight(rep)` is the
+number of comments a representative stands for.
+
+Dropped comments are only kept out of the LLM call: callers keep them in the
+data with SKIPPED_CLASSIFICATION (they still count as volume, and mention-only
+comments are edges of the influence graph).
+"""
+
+import hashlib
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+", re.IGNORECASE)
+MENTION_RE = re.compile(r"@[\w.]+")
+REPEAT_RE = re.compile(r"(.)\1{2,}")
+NON_WORD_RE = re.compile(r"[^\w\s]+")  # punctuation, symbols, emoji
+SPACE_RE = re.compile(r"\s+")
+
+# Emoji modifiers that don't change meaning (variation selector, ZWJ, skin tones)
+_EMOJI_MODIFIERS = {"\ufe0f", "\u200d"} | {chr(c) for c in range(0x1F3FB, 0x1F400)}
+
+MIN_NEAR_DUP_CHARS = 20       # shorter texts only collapse on exact match
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+LSH_BANDS = 16                # 16 bands x 4 rows: candidates from ~0.5 Jaccard
+NEAR_DUP_THRESHOLD = 0.8
+
+# Fixed neutral classification of the comments triage() drops
+SKIPPED_CLASSIFICATION = {
+    "ai_emotion": "Otro",
+    "ai_personality": "Sinceridad",
+    "ai_topic": "Otro",
+    "ai_sentiment_score": 0.0,
+    "skipped": True,
+}
+
+_MERSENNE_PRIME = np.uint64(4294967311)  # smallest prime > 2^32
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 2 ** 31, size=NUM_PERM, dtype=np.uint64)
+
+
+@dataclass
+class DedupResult:
+    representatives: list[int] = field(default_factory=list)    # input indices sent to the LLM, in order
+    members: dict[int, list[int]] = field(default_factory=dict)  # representative -> indices it stands for
+    dropped: dict[int, str] = field(default_factory=dict)        # input index -> reason
+
+    def weight(self, representative: int) -> int:
+        return len(self.members.get(representative, ()))
+
+    @property
+    def stats(self) -> dict:
+        reasons: dict[str, int] = {}
+        for reason in self.dropped.values():
+            reasons[reason] = reasons.get(reason, 0) + 1
+        total = sum(len(m) for m in self.members.values()) + len(self.dropped)
+        return {
+            "input": total,
+            "unique": len(self.representatives),
+            "collapsed": total - len(self.representatives) - len(self.dropped),
+            "dropped": reasons,
+        }
+
+
+def _is_emoji(ch: str) -> bool:
+    return unicodedata.category(ch) in ("So", "Sk") or ch in _EMOJI_MODIFIERS
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for exact/near-duplicate matching."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = URL_RE.sub(" ", text)
+    text = MENTION_RE.sub(" ", text)
+    text = REPEAT_RE.sub(r"\1\1", text)
+    text = NON_WORD_RE.sub(" ", text)
+    return SPACE_RE.sub(" ", text).strip()
+
+
+def emoji_key(text: str) -> str:
+    """Sorted set of the emojis in `text` (modifiers ignored)."""
+    return "".join(sorted({ch for ch in text or "" if _is_emoji(ch) and ch not in _EMOJI_MODIFIERS}))
+
+
+def triage(text: str) -> tuple[str, str, str]:
+    """
+    Cheap local rules. Returns (kind, key, emojis):
+    ("drop", reason, "") | ("emoji", emoji-set key, emoji set) | ("text", normalized text, emoji set)
+
+    Text comments keep their emoji set next to the normalized text: "me encanta 😍"
+    and "me encanta 😡" must not share a classification.
+    """
+    raw = text or ""
+    normalized = normalize_text(raw)
+    emojis = emoji_key(raw)
+    if normalized:
+        return "text", normalized, emojis
+    if emojis:
+        return "emoji", emojis, emojis
+    if MENTION_RE.search(raw):
+        return "drop", "mention_only", ""
+    if URL_RE.search(raw):
+        return "drop", "link_only", ""
+    return "drop", "empty", ""
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    hashes = _shingle_hashes(text)
+    # (a * x + b) mod p for every permutation x shingle, min over shingles
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+
+def _near_duplicate_groups(texts: list[str], partitions: list[str]) -> list[int]:
+    """
+    Union-find parent (index into `texts`) of each text's near-duplicate cluster.
+    Only texts with the same `partitions` value (their emoji set) can cluster.
+    """
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    candidates = [i for i, t in enumerate(texts) if len(t) >= MIN_NEAR_DUP_CHARS]
+    if len(candidates) < 2:
+        return parent
+
+    signatures = {i: minhash_signature(texts[i]) for i in candidates}
+    rows = NUM_PERM // LSH_BANDS
+    buckets: dict[tuple[int, str, bytes], int] = {}
+    for i in candidates:
+        sig = signatures[i]
+        for band in range(LSH_BANDS):
+            key = (band, partitions[i], sig[band * rows:(band + 1) * rows].tobytes())
+            other = buckets.setdefault(key, i)
+            if other == i:
+                continue
+            ri, ro = find(i), find(other)
+            if ri == ro:
+                continue
+            # Compare cluster roots, not the pair, so clusters can't drift by chaining
+            if np.mean(signatures[ri] == signatures[ro]) >= NEAR_DUP_THRESHOLD:
+                # Keep the earliest comment as the cluster root
+                parent[max(ri, ro)] = min(ri, ro)
+    return [find(i) for i in range(len(texts))]
+
+
+def collapse_comments(items: list[dict[str, Any]], text_key: str = "content") -> DedupResult:
+    """Group comments so each distinct one is classified once."""
+    result = DedupResult()
+    exact_groups: dict[str, list[int]] = {}
+    exact_keys: list[str] = []  # in first-seen order
+    texts_by_key: dict[str, str] = {}
+    emojis_by_key: dict[str, str] = {}
+
+    triaged: dict[str, tuple[str, str, str]] = {}  # raw text -> triage(), exact copies are common
+
+    for i, item in enumerate(items):
+        text = item.get(text_key) or ""
+        kind, key, emojis = triaged.get(text) or triaged.setdefault(text, triage(text))
+        if kind == "drop":
+            result.dropped[i] = key
+            continue
+        group_key = hashlib.sha1(f"{kind}:{key}:{emojis}".encode("utf-8")).hexdigest()
+        if group_key not in exact_groups:
+            exact_groups[group_key] = []
+            exact_keys.append(group_key)
+            texts_by_key[group_key] = key if kind == "text" else ""
+            emojis_by_key[group_key] = emojis
+        exact_groups[group_key].append(i)
+
+    roots = _near_duplicate_groups(
+        [texts_by_key[k] for k in exact_keys], [emojis_by_key[k] for k in exact_keys]
+    )
+    for position, group_key in enumerate(exact_keys):
+        representative = exact_groups[exact_keys[roots[position]]][0]
+        result.members.setdefault(representative, []).extend(exact_groups[group_key])
+
+    result.representatives = sorted(result.members)
+    for members in result.members.values():
+        members.sort()
+
+    stats = result.stats
+    logger.info(
+        f"🧹 Dedup: {stats['input']} comments -> {stats['unique']} to classify "
+        f"({stats['collapsed']} collapsed, {sum(stats['dropped'].values())} dropped)"
+    )
+    return result
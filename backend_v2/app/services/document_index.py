@@ -0,0 +1,118 @@
+"""
+Attachment Retrieval
+====================
+Per-client BM25 index over the interview attachment chunks (documents.py), so
+prompts carry the few chunks relevant to the task instead of a truncated prefix
+of the whole file.
+
+Indexes are built lazily from chunks.json and cached per process, keyed by the
+file's mtime (a new upload rebuilds it on the next query).
+"""
+
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from .documents import chunks_path, load_chunks
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.5
+B = 0.75
+MAX_CACHED_INDEXES = 64
+TOKEN_RE = re.compile(r"\w{2,}")
+STOPWORDS = frozenset(
+    "de la el en y a los las del se un una por con para es al lo como mas o pero sus le ya "
+    "este esta son entre cuando muy sin sobre tambien me hasta hay donde quien desde todo nos "
+    "the and of to in for is on with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return [t for t in TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, chunks: list[tuple[str, str]]):
+        """`chunks`: (source name, text) pairs."""
+        self.chunks = chunks
+        self._tf = [Counter(tokenize(text)) for _, text in chunks]
+        self._len = [sum(tf.values()) for tf in self._tf]
+        self._avg_len = (sum(self._len) / len(self._len)) if self._len else 0.0
+        df = Counter(term for tf in self._tf for term in tf)
+        n = len(chunks)
+        self._idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int = 5) -> list[tuple[float, int]]:
+        """(score, chunk position) of the best `k` chunks with a positive score."""
+        terms = [t for t in set(tokenize(query)) if t in self._idf]
+        if not terms or not self._avg_len:
+            return []
+        scored = []
+        for i, tf in enumerate(self._tf):
+            norm = K1 * (1 - B + B * self._len[i] / self._avg_len)
+            score = sum(self._idf[t] * tf[t] * (K1 + 1) / (tf[t] + norm) for t in terms if t in tf)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(reverse=True)
+        return scored[:k]
+
+
+_cache: "OrderedDict[str, tuple[float, BM25Index]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_index(client_id: str) -> Optional[BM25Index]:
+    """The client's index, or None when nothing has been ingested."""
+    try:
+        mtime = chunks_path(client_id).stat().st_mtime
+    except FileNotFoundError:
+        return None
+    with _cache_lock:
+        cached = _cache.get(client_id)
+        if cached and cached[0] == mtime:
+            _cache.move_to_end(client_id)
+            return cached[1]
+
+    documents = load_chunks(client_id).get("documents", {})
+    index = BM25Index([(name, text) for name, doc in documents.items() for text in doc.get("chunks", [])])
+    with _cache_lock:
+        _cache[client_id] = (mtime, index)
+        _cache.move_to_end(client_id)
+        while len(_cache) > MAX_CACHED_INDEXES:
+            _cache.popitem(last=False)
+    return index
+
+
+def retrieve_context(client_id: str, query: str, max_chars: int = 2000, k: int = 6,
+                     fallback: str = "") -> str:
+    """
+    Most relevant attachment chunks for `query`, best first, within `max_chars`.
+    Falls back to the leading chunks when nothing matches, and to `fallback`
+    (e.g. a legacy interview `product_context`) when the client has no index.
+    """
+    index = get_index(client_id)
+    if not index:
+        return (fallback or "")[:max_chars]
+
+    hits = [i for _, i in index.search(query, k)] or list(range(min(k, len(index))))
+    parts, used = [], 0
+    for i in hits:
+        source, text = index.chunks[i]
+        block = f"[{source}] {text}"
+        if used + len(block) > max_chars:
+            if not parts:
+                parts.append(block[:max_chars])
+            break
+        parts.append(block)
+        used += len(block) + 1
+    return "\n".join(parts)
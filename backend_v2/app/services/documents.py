@@ -0,0 +1,273 @@
+"""
+Interview Attachments
+=====================
+Ingestion of the files attached to a client's interview (product catalogs,
+price lists, brand docs):
+
+1. The upload is streamed to DOCUMENTS_DIR/<client_id>/files/ (capped at
+   DOCUMENT_MAX_MB), never held in memory as a whole.
+2. Parsing + chunking run in a process pool, off the event loop:
+   xlsx/xls (pandas), csv, pdf (pypdf), docx (stdlib zip/XML), txt/md.
+   Spreadsheets are chunked by rows with the sheet name and headers repeated,
+   documents by paragraphs.
+3. Chunks go to DOCUMENTS_DIR/<client_id>/chunks.json; re-uploading a file with
+   the same name replaces its chunks.
+
+Prompts don't read the raw text: they retrieve the relevant chunks through
+document_index.retrieve_context.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pypdf  # Optional: pip install pypdf
+except ImportError:
+    pypdf = None
+
+CHUNK_CHARS = 1200
+COPY_BUFFER_BYTES = 1024 * 1024
+SPREADSHEET_EXTENSIONS = {".xlsx", ".xls"}
+SAFE_NAME_RE = re.compile(r"[^\w.\- ]+")
+DOCX_PARAGRAPH_RE = re.compile(r"<w:p[ >].*?</w:p>", re.S)
+DOCX_TEXT_RE = re.compile(r"<w:t[^>]*>([^<]*)</w:t>")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_chunks_lock = threading.Lock()
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+def documents_root() -> Path:
+    return Path(settings.DOCUMENTS_DIR or os.path.join(tempfile.gettempdir(), "pixely_documents"))
+
+
+def client_dir(client_id: str) -> Path:
+    return documents_root() / SAFE_NAME_RE.sub("_", client_id)
+
+
+def chunks_path(client_id: str) -> Path:
+    return client_dir(client_id) / "chunks.json"
+
+
+def safe_filename(name: str) -> str:
+    return SAFE_NAME_RE.sub("_", Path(name or "documento").name).strip() or "documento"
+
+
+# ============================================================================
+# Parsing + chunking (run inside the process pool: module-level, picklable)
+# ============================================================================
+
+def _split_long(unit: str, max_chars: int) -> list[str]:
+    if len(unit) <= max_chars:
+        return [unit]
+    pieces, current = [], ""
+    for sentence in SENTENCE_RE.split(unit):
+        while len(sentence) > max_chars:  # no sentence boundary: hard split
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            pieces.append(current)
+            current = ""
+        current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_units(units: list[str], max_chars: int = CHUNK_CHARS, header: str = "") -> list[str]:
+    """Pack paragraphs/rows into chunks of ~max_chars; `header` starts every chunk."""
+    budget = max(200, max_chars - len(header))
+    chunks, current = [], []
+    size = 0
+    for unit in units:
+        for piece in _split_long(unit.strip(), budget):
+            if not piece:
+                continue
+            if current and size + len(piece) + 1 > budget:
+                chunks.append("\n".join([header, *current]).strip())
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join([header, *current]).strip())
+    return chunks
+
+
+def _row_line(headers: list[str], row: list) -> str:
+    cells = []
+    for h, v in zip(headers, row):
+        value = str(v).strip()
+        if value and value.lower() != "nan":
+            cells.append(f"{h}: {value}" if h else value)
+    return "; ".join(cells)
+
+
+def _table_chunks(title: str, headers: list[str], rows: list[list]) -> list[str]:
+    lines = [line for line in (_row_line(headers, r) for r in rows) if line]
+    return chunk_units(lines, header=f"[{title}]" if title else "")
+
+
+def _parse_spreadsheet(path: str) -> list[str]:
+    import pandas as pd  # deferred: only the worker processes need it
+    chunks = []
+    for sheet, df in pd.read_excel(path, sheet_name=None).items():
+        headers = ["" if str(c).startswith("Unnamed") else str(c) for c in df.columns]
+        chunks.extend(_table_chunks(f"Hoja: {sheet}", headers, df.values.tolist()))
+    return chunks
+
+
+def _parse_csv(path: str) -> list[str]:
+    with open(path, newline="", encoding="utf-8", errors="ignore") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.reader(f, dialect))
+    if not rows:
+        return []
+    return _table_chunks("", rows[0], rows[1:])
+
+
+def _parse_pdf(path: str) -> list[str]:
+    if pypdf is None:
+        raise RuntimeError("PDF support requires pypdf (pip install pypdf)")
+    reader = pypdf.PdfReader(path)
+    paragraphs = []
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        paragraphs.extend(p for p in re.split(r"\n\s*\n", text) if p.strip())
+    return chunk_units([" ".join(p.split()) for p in paragraphs])
+
+
+def _parse_docx(path: str) -> list[str]:
+    with zipfile.ZipFile(path) as z:
+        xml = z.read("word/document.xml").decode("utf-8", errors="ignore")
+    paragraphs = ["".join(DOCX_TEXT_RE.findall(p)) for p in DOCX_PARAGRAPH_RE.findall(xml)]
+    return chunk_units([p for p in paragraphs if p.strip()])
+
+
+def _parse_text(path: str) -> list[str]:
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        text = f.read()
+    return chunk_units([p for p in re.split(r"\n\s*\n", text) if p.strip()])
+
+
+def extract_chunks(path: str) -> list[str]:
+    """Parse one stored file into text chunks (CPU-bound; runs in the process pool)."""
+    ext = Path(path).suffix.lower()
+    if ext in SPREADSHEET_EXTENSIONS:
+        return _parse_spreadsheet(path)
+    if ext == ".csv":
+        return _parse_csv(path)
+    if ext == ".pdf":
+        return _parse_pdf(path)
+    if ext == ".docx":
+        return _parse_docx(path)
+    return _parse_text(path)
+
+
+# ============================================================================
+# Ingestion (event loop side)
+# ============================================================================
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.DOCUMENT_PARSE_WORKERS)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _copy_capped(src, dest: Path, max_bytes: int) -> int:
+    """Stream `src` to `dest` in fixed-size blocks. Blocking; run off-loop."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_suffix(dest.suffix + ".part")
+    written = 0
+    try:
+        with open(tmp, "wb") as out:
+            while block := src.read(COPY_BUFFER_BYTES):
+                written += len(block)
+                if written > max_bytes:
+                    raise DocumentTooLarge(f"File exceeds {max_bytes // (1024 * 1024)} MB")
+                out.write(block)
+        os.replace(tmp, dest)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return written
+
+
+def load_chunks(client_id: str) -> dict:
+    """{"documents": {name: {"chunks": [...], "chars", "ingested_at"}}}"""
+    try:
+        with open(chunks_path(client_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"documents": {}}
+
+
+def _save_document(client_id: str, name: str, chunks: list[str]):
+    path = chunks_path(client_id)
+    with _chunks_lock:
+        data = load_chunks(client_id)
+        data["documents"][name] = {
+            "chunks": chunks,
+            "chars": sum(len(c) for c in chunks),
+            "ingested_at": datetime.utcnow().isoformat()
+        }
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+async def ingest_upload(client_id: str, upload) -> dict:
+    """
+    Store, parse and chunk one UploadFile for the client.
+    Returns {"name", "bytes", "chunks", "chars", "preview"}.
+    """
+    name = safe_filename(upload.filename)
+    dest = client_dir(client_id) / "files" / name
+    size = await asyncio.to_thread(_copy_capped, upload.file, dest, settings.DOCUMENT_MAX_MB * 1024 * 1024)
+
+    loop = asyncio.get_running_loop()
+    chunks = await loop.run_in_executor(_get_pool(), extract_chunks, str(dest))
+    await asyncio.to_thread(_save_document, client_id, name, chunks)
+
+    logger.info(f"📎 Ingested {name} for {client_id}: {size} bytes -> {len(chunks)} chunks")
+    return {
+        "name": name,
+        "bytes": size,
+        "chunks": len(chunks),
+        "chars": sum(len(c) for c in chunks),
+        "preview": "\n".join(chunks)[:10000],
+    }
@@ -9,9 +9,11 @@ import json
 import logging
 import httpx
 import asyncio
-from typing import Any
+from typing import Any, Optional
 
 from ..config import settings
+from .metrics import span, record_llm_usage, current_tenant, LLM_REQUEST_SECONDS, CLASSIFIED_ITEMS_TOTAL
+from .local_classifier import route_comments
 
 logger = logging.getLogger(__name__)
 
@@ -29,54 +31,89 @@ COMMERCE_TOPICS = [
     "Recomendación",    # Boca a boca, referencias
 ]
 
-CLASSIFICATION_PROMPT = """
-IMPORTANT: Your response MUST be ONLY a valid JSON object.
-Do NOT add any text, explanation, or markdown before or after the JSON.
-Start directly with {{ and end with }}.
+# Código -> etiqueta. El modelo responde con índices; se decodifican en _decode_classification
+EMOTIONS = ["Alegría", "Confianza", "Miedo", "Sorpresa", "Tristeza", "Aversión", "Ira", "Anticipación"]  # Plutchik
+PERSONALITIES = ["Sinceridad", "Emocion", "Competencia", "Sofisticacion", "Robustez"]  # Aaker
 
-Eres un clasificador experto de comentarios de redes sociales para marcas comerciales.
 
-CONTEXTO DE LA MARCA (Usa esto para entender mejor la relevancia de los comentarios):
-{brand_context}
+def _code_table(labels: list[str]) -> str:
+    return ", ".join(f"{i}={label}" for i, label in enumerate(labels))
+
 
-Tu trabajo es ETIQUETAR cada comentario con los siguientes campos:
+# System message: identical for every batch of a run (only the brand context varies
+# between clients, and it goes last) so provider-side prompt caching reuses it.
+CLASSIFICATION_SYSTEM_PROMPT = """Eres un clasificador experto de comentarios de redes sociales para marcas comerciales.
+Responde ÚNICAMENTE con un objeto JSON válido, sin texto antes ni después.
 
-1. **emotion**: Una emoción de Plutchik (exactamente una):
-   Alegría, Confianza, Miedo, Sorpresa, Tristeza, Aversión, Ira, Anticipación
+Para cada comentario indica, usando estos CÓDIGOS:
+EMOCIÓN (Plutchik, exactamente una): {emotion_codes}
+PERSONALIDAD proyectada (Aaker): {personality_codes}
+TÓPICO principal: {topic_codes}
+  Si no encaja en ninguno, escribe en su lugar una categoría de máximo 2 palabras (ej: Aprendizaje).
+SENTIMIENTO: entero de -10 (muy negativo) a 10 (muy positivo).
 
-2. **personality**: Rasgo de personalidad proyectado según Aaker:
-   Sinceridad, Emocion, Competencia, Sofisticacion, Robustez
+ENTRADA: una línea por comentario con el formato <idx><TAB><texto>.
+SALIDA: {{"r": ["<idx>|<emoción>|<personalidad>|<tópico>|<sentimiento>", ...]}} con una cadena por comentario.
+Ejemplo: {{"r": ["0|0|0|1|8", "1|7|1|Aprendizaje|7"]}}
 
-3. **topic**: Tema principal. PRIMERO intenta usar uno de estos 10 tópicos comerciales:
-   Precio, Calidad, Servicio, Entrega, Experiencia, Producto, Garantía, Comunicación, Confianza, Recomendación
-   
-   Si el comentario NO encaja en ninguno de los anteriores, usa una categoría descriptiva 
-   de máximo 2 palabras que capture el tema (ej: "Aprendizaje", "Entretenimiento", "Comunidad").
+CONTEXTO DE LA MARCA (úsalo para entender la relevancia de los comentarios):
+{brand_context}
+"""
 
-4. **sentiment_score**: Número de -1.0 (muy negativo) a 1.0 (muy positivo)
 
-FORMATO DE SALIDA (OBLIGATORIO):
-- Devuelve ÚNICAMENTE un objeto JSON válido.
-- La raíz DEBE ser un objeto con la clave "results".
-- Cada ítem debe tener: idx, emotion, personality, topic, sentiment_score
-- El campo "idx" corresponde al índice del comentario en la lista de entrada.
+def build_classification_system_prompt(brand_context: str = "") -> str:
+    return CLASSIFICATION_SYSTEM_PROMPT.format(
+        emotion_codes=_code_table(EMOTIONS),
+        personality_codes=_code_table(PERSONALITIES),
+        topic_codes=_code_table(COMMERCE_TOPICS),
+        brand_context=brand_context or "No context provided."
+    )
 
-Ejemplo de salida EXACTA:
-{{"results": [{{"idx": 0, "emotion": "Alegría", "personality": "Sinceridad", "topic": "Calidad", "sentiment_score": 0.8}}, {{"idx": 1, "emotion": "Anticipación", "personality": "Emocion", "topic": "Aprendizaje", "sentiment_score": 0.7}}]}}
 
-COMENTARIOS A CLASIFICAR:
-{comments_json}
-"""
+def encode_comment_lines(batch: list[tuple[int, str]]) -> str:
+    """One "<idx>\\t<text>" line per comment (newlines/tabs inside the text flattened)."""
+    return "\n".join(f"{idx}\t{' '.join((text or '').split())}" for idx, text in batch)
 
 
-# Initialize OpenAI Client (Lazy or Global)
-import openai
+def _decode_code(value: str, labels: list[str], default: str) -> str:
+    if value.isdigit():
+        code = int(value)
+        return labels[code] if code < len(labels) else default
+    return value if value in labels else default
+
+
+def _decode_classification(row: Any) -> Optional[dict]:
+    """Compact "idx|emotion|personality|topic|sentiment" row -> classification dict."""
+    if isinstance(row, dict):
+        # Verbose row (model ignored the codes): already in the final shape
+        return row if "idx" in row else None
+    parts = [p.strip() for p in str(row).split("|")]
+    if len(parts) != 5:
+        return None
+    idx, emotion, personality, topic, sentiment = parts
+    try:
+        idx_value = int(idx)
+        score = max(-10.0, min(10.0, float(sentiment))) / 10
+    except ValueError:
+        return None
+    return {
+        "idx": idx_value,
+        "emotion": _decode_code(emotion, EMOTIONS, "Otro"),
+        "personality": _decode_code(personality, PERSONALITIES, "Sinceridad"),
+        # Free-text topics are kept as written
+        "topic": _decode_code(topic, COMMERCE_TOPICS, "Otro") if topic.isdigit() else (topic or "Otro"),
+        "sentiment_score": round(score, 2),
+    }
 
-async def _call_gemini(prompt: str, temperature: float = 0.7, model: str = "gpt-5-mini") -> Any:
+
+async def _call_gemini(prompt: str, temperature: float = 0.7, model: str = "gpt-5-mini", system: Optional[str] = None) -> Any:
     """
     Unified LLM caller using OpenAI SDK.
     Uses async context manager for proper resource cleanup.
+    `system` goes first as its own message: keep it stable across calls so the
+    provider can serve it from its prompt cache.
     """
+    import openai  # deferred: the SDK import dominates module load time
     
     if not model.startswith("gpt"):
         raise ValueError("Only GPT models are supported (Gemini removed)")
@@ -86,9 +123,12 @@ async def _call_gemini(prompt: str, temperature: float = 0.7, model: str = "gpt-
     
     # Use context manager to ensure proper cleanup (prevents zombie connections)
     async with openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY) as client:
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
         completion_args = {
             "model": model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "response_format": {"type": "json_object"}
         }
         
@@ -96,7 +136,10 @@ async def _call_gemini(prompt: str, temperature: float = 0.7, model: str = "gpt-
             completion_args["temperature"] = temperature
         
         try:
-            response = await client.chat.completions.create(**completion_args)
+            tenant = current_tenant.get()
+            with span("llm.completion", LLM_REQUEST_SECONDS, model=model, tenant=tenant):
+                response = await client.chat.completions.create(**completion_args)
+            record_llm_usage(model, getattr(response, "usage", None), tenant)
             content = response.choices[0].message.content
             
             # Clean markdown if present
@@ -132,12 +175,67 @@ async def _call_gemini(prompt: str, temperature: float = 0.7, model: str = "gpt-
             raise
 
 
+async def _stream_gemini(prompt: str, model: str = "gpt-5-mini", system: Optional[str] = None):
+    """
+    Streaming variant of _call_gemini: yields the raw JSON text as it is generated.
+    Parsing is up to the caller (see json_stream.JsonArrayItems).
+    """
+    import openai  # deferred: the SDK import dominates module load time
+
+    if not model.startswith("gpt"):
+        raise ValueError("Only GPT models are supported (Gemini removed)")
+
+    if not settings.OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY not configured")
+
+    async with openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY) as client:
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+
+        tenant = current_tenant.get()
+        try:
+            with span("llm.stream", LLM_REQUEST_SECONDS, model=model, tenant=tenant):
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    # The final chunk carries usage and no choices
+                    if getattr(chunk, "usage", None):
+                        record_llm_usage(model, chunk.usage, tenant)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except openai.APIError as e:
+            logger.error(f"❌ OpenAI API Error (stream): {e}")
+            raise
+
+
 
-async def classify_comments_batch(comments: list[str], brand_context: str = "", batch_size: int = 50) -> list[dict[str, Any]]:
+async def classify_comments_batch(
+    comments: list[str],
+    brand_context: str = "",
+    batch_size: int = 50,
+    local_threshold: Optional[float] = None
+) -> list[dict[str, Any]]:
     """
     Classify a list of comments using Gemini/OpenAI via REST in parallel.
+
+    Comments the local classifier is confident about (confidence >=
+    local_threshold, default settings.LOCAL_CLASSIFIER_THRESHOLD) are answered
+    locally; only the rest are sent to the LLM. `idx` is always the comment's
+    position in `comments`.
     """
-    all_results: list[dict] = []
+    all_results, pending = route_comments(comments, local_threshold)
+    CLASSIFIED_ITEMS_TOTAL.inc(len(all_results), tier="local")
+    CLASSIFIED_ITEMS_TOTAL.inc(len(pending), tier="llm")
+    logger.info(f"⚡ Local tier answered {len(all_results)}/{len(comments)} comments, {len(pending)} go to the LLM")
+    
+    # Same system prefix for every batch (prompt caching)
+    system_prompt = build_classification_system_prompt(brand_context)
     
     # Concurrency Control (e.g. 5 concurrent batches)
     sem = asyncio.Semaphore(5)
@@ -146,25 +244,16 @@ async def classify_comments_batch(comments: list[str], brand_context: str = "",
         async with sem:
             logger.info(f"🧠 Classifying batch {batch_idx + 1} ({len(batch_subset)} comments)...")
             
-            # Prepare input
-            comments_for_prompt = [
-                {"idx": idx_offset + j, "text": text}
-                for j, text in enumerate(batch_subset)
-                for idx_offset in [batch_idx * batch_size] # Capture offset
-            ]
-            
-            prompt = CLASSIFICATION_PROMPT.format(
-                brand_context=brand_context or "No context provided.",
-                comments_json=json.dumps(comments_for_prompt, ensure_ascii=False)
-            )
+            # Prepare input (idx = position in the original `comments` list)
+            prompt = encode_comment_lines(batch_subset)
             
             try:
-                batch_results = await _call_gemini(prompt, temperature=0.2, model="gpt-5-mini")
+                batch_results = await _call_gemini(prompt, temperature=0.2, model="gpt-5-mini", system=system_prompt)
                 
                 # Robust parsing
                 results_list = []
                 if isinstance(batch_results, dict):
-                    results_list = batch_results.get("results") or batch_results.get("classifications") or []
+                    results_list = batch_results.get("r") or batch_results.get("results") or batch_results.get("classifications") or []
                     if not results_list:
                         for v in batch_results.values():
                             if isinstance(v, list):
@@ -173,6 +262,7 @@ async def classify_comments_batch(comments: list[str], brand_context: str = "",
                 elif isinstance(batch_results, list):
                     results_list = batch_results
                 
+                results_list = [c for c in map(_decode_classification, results_list) if c is not None]
                 if results_list:
                     logger.info(f"✅ Batch {batch_idx + 1} finished: {len(results_list)} results")
                     return results_list
@@ -186,12 +276,12 @@ async def classify_comments_batch(comments: list[str], brand_context: str = "",
 
     # Create tasks
     tasks = []
-    num_batches = (len(comments) + batch_size - 1) // batch_size
+    num_batches = (len(pending) + batch_size - 1) // batch_size
     
     for i in range(num_batches):
         start = i * batch_size
         end = start + batch_size
-        batch = comments[start:end]
+        batch = pending[start:end]
         tasks.append(process_batch(batch, i))
     
     logger.info(f"🚀 Starting parallel classification of {num_batches} batches...")
@@ -244,49 +334,8 @@ def map_classification_to_raw_item(
 # INTERPRETATION GENERATOR
 # =============================================================================
 
-INTERPRETATION_PROMPT = """
-Actúa como un Consultor Senior de Estrategia de Marca. Tu cliente no es técnico.
-
-CONTEXTO ESTRATÉGICO DEL CLIENTE:
-{context_str}
-
-TIENES EL SIGUIENTE REPORTE DE DATOS (Q1-Q10):
-{aggregated_json}
-
-INSTRUCCIONES CRÍTICAS:
-Tu tarea es generar una interpretación breve (máximo 3 frases) para CADA bloque (Q1 a Q10).
-Para cada interpretación, DEBES cruzar los datos encontrados con la IDENTIDAD DE MARCA definida en el contexto.
-
-1. **Alineación**: ¿Los resultados reflejan la Misión, Visión o Valores de la marca? Si no, señálalo suavemente.
-2. **Personalidad**: ¿El tono de los comentarios coincide con el Arquetipo de la marca?
-3. **Accionable**: Explica qué significa el dato para SU negocio específico.
-4. **Formato**: Usa un lenguaje alentador pero estratégico. Usa **negritas** para conceptos clave.
-
-Devuelve un JSON estricto con este formato:
-{{
-    "Q1_interpretation": "Texto explicativo aquí...",
-    "Q2_interpretation": "Texto explicativo aquí...",
-    ...
-    "Q10_interpretation": "Texto explicativo aquí..."
-}}
-"""
-
-
-async def generate_interpretations(aggregated_json: dict, context: dict = None) -> dict:
-    """
-    Takes the aggregated Q1-Q10 data AND full client context (Interview + Brand) 
-    to generate human-readable explanations via REST.
-    """
-    print("🔍 [DEBUG] generate_interpretations CALLED")
-    print(f"🔍 [DEBUG] OPENAI_API_KEY present: {bool(settings.OPENAI_API_KEY)}")
-    print(f"🔍 [DEBUG] OPENAI_API_KEY prefix: {settings.OPENAI_API_KEY[:10] if settings.OPENAI_API_KEY else 'NONE'}...")
-    
-    if not settings.OPENAI_API_KEY:
-        print("❌ [DEBUG] OPENAI_API_KEY NOT CONFIGURED - RETURNING EMPTY")
-        logger.warning("OPENAI_API_KEY not configured, skipping interpretations")
-        return {}
-    
-    # Format Context String
+def format_interpretation_context(context: dict = None) -> str:
+    """Interview + brand book summary used as the client context of interpretations."""
     context_str = "No hay información estratégica previa disponible. Asume un e-commerce general."
     
     if context:
@@ -357,23 +406,25 @@ async def generate_interpretations(aggregated_json: dict, context: dict = None)
             f"Tono de Voz: {tone_str}\n"
         )
 
+    return context_str
+
+
+async def generate_interpretations(aggregated_json: dict, context: dict = None, client_id: str = None) -> dict:
+    """
+    Takes the aggregated Q1-Q10 data AND full client context (Interview + Brand) 
+    to generate human-readable explanations (see interpretation.py).
+    """
+    if not settings.OPENAI_API_KEY:
+        logger.warning("OPENAI_API_KEY not configured, skipping interpretations")
+        return {}
+    
+    from .interpretation import generate_interpretations as generate_from_digests  # deferred: it imports this module
+    
     try:
-        prompt = INTERPRETATION_PROMPT.format(
-            context_str=context_str,
-            aggregated_json=json.dumps(aggregated_json, indent=2, ensure_ascii=False)
-        )
-        
-        print(f"🔍 [DEBUG] Prompt length: {len(prompt)} chars")
-        logger.info(f"🗣️ Generating interpretations with context ({len(context_str)} chars)...")
-        
-        interpretations = await _call_gemini(prompt, temperature=0.7, model="gpt-5-mini")
-        
-        print(f"✅ [DEBUG] Interpretations received: {type(interpretations)}, keys: {list(interpretations.keys()) if isinstance(interpretations, dict) else 'NOT A DICT'}")
+        interpretations = await generate_from_digests(aggregated_json, context=context, client_id=client_id)
         logger.info(f"✅ Generated {len(interpretations)} interpretations")
         return interpretations
-        
     except Exception as e:
-        print(f"❌ [DEBUG] EXCEPTION in generate_interpretations: {e}")
         logger.error(f"❌ Error generating interpretations: {e}")
         return _get_fallback_interpretations()
 
@@ -491,155 +542,6 @@ async def generate_brand_identity(interview_data: dict) -> dict:
 # STRATEGIC PLAN GENERATOR (Tree Structure)
 # =============================================================================
 
-STRATEGY_PLAYBOOK_PROMPT = """
-Eres un ESTRATEGA SENIOR DE CONTENIDOS con experiencia profunda en marketing digital y creación de contenido viral.
-Tu misión es crear un PLAYBOOK ESTRATÉGICO INNOVADOR que servirá como la "Constitución" de contenido de la marca.
-
-⚠️ CRÍTICO: NO generes posts específicos. Genera ARQUETIPOS DE CONTENIDO (plantillas reutilizables).
-
----
-
-🎯 CONTEXTO ESTRATÉGICO:
-
-**ENTREVISTA COMPLETA (Objetivos, Audiencia, Diferenciadores):**
-{interview_context}
-
-**ANÁLISIS DE DATOS (Insights de Redes Sociales):**
-{analysis_insights}
-
-**PLAN DEL CLIENTE:** {plan_type}
-**NOMBRE DE LA MARCA:** {brand_name}
-
----
-
-🧠 TU TAREA (Pensamiento Estratégico Profundo):
-
-1. **OBJETIVOS ESTRATÉGICOS:**
-   - Extrae TODOS los objetivos de negocio de la entrevista
-   - Prioriza el MÁS CRÍTICO como "Objetivo Principal"
-   - Clasifica los demás como "Objetivos Secundarios"
-   - Para cada objetivo, explica POR QUÉ es importante (cruce con datos)
-
-2. **ESTRATEGIAS TÁCTICAS (2-3 por objetivo):**
-   - Cada estrategia debe ser ACCIONABLE y ESPECÍFICA
-   - Debe tener un ángulo DIFERENCIADOR
-   - Incluye el "por qué" estratégico, no solo el "qué"
-
-3. **ARQUETIPOS DE CONTENIDO (3-4 por estrategia):**
-   
-   Para cada arquetipo, define:
-   
-   **A. IDENTIDAD DEL CONCEPTO:**
-   - `label`: Nombre memorable y específico (2-4 palabras)
-   - `description`: Qué es y qué logra (2-3 frases DESCRIPTIVAS)
-   - `strategic_rationale`: Por qué este concepto es CRÍTICO para el objetivo (1-2 frases)
-   
-   **B. GUÍA DE EJECUCIÓN DETALLADA:**
-   - `execution_guidelines`:
-     * `structure`: Estructura narrativa paso a paso (ej: "Hook emocional (3s) → Problema (10s) → Solución (20s) → CTA (5s)")
-     * `key_elements`: 3-4 elementos OBLIGATORIOS que debe tener el contenido
-     * `dos`: 3-4 mejores prácticas ESPECÍFICAS
-     * `donts`: 3-4 errores ESPECÍFICOS a evitar
-   
-   **C. CREATIVIDAD E INNOVACIÓN:**
-   - `creative_hooks`: 4-6 hooks/ángulos creativos ESPECÍFICOS y USABLES para captar atención
-     (Ejemplo: "Pensé que era imposible hasta que probé [producto]..." NO "Hook emocional")
-   
-   **D. FORMATOS Y FRECUENCIA:**
-   - `suggested_format`: post | story | reel | carousel | video | live
-   - `suggested_frequency`: high (3-4/semana) | medium (1-2/semana) | low (1-2/mes)
-   - `tags`: 2-3 etiquetas temáticas
-
----
-
-📋 FORMATO JSON ESTRICTO:
-
-{{
-  "root_label": "Proyecto Marketing",
-  "objectives": [
-    {{
-      "title": "Objetivo Principal",
-      "rationale": "Por qué es crítico según cruce entrevista+análisis (2-3 frases)",
-      "strategies": [
-        {{
-          "title": "Estrategia: [Nombre Específico y Accionable]",
-          "concepts": [
-            {{
-              "label": "Testimonio Cliente Transformador",
-              "description": "Video de 45-60s mostrando la experiencia real de un cliente, enfocado en el viaje emocional desde el problema hasta el resultado medible, usando su lenguaje auténtico y mostrando pruebas visuales del cambio.",
-              "strategic_rationale": "Genera confianza mediante prueba social auténtica y supera objeciones de compra al mostrar resultados reales de personas similares a la audiencia objetivo.",
-              "execution_guidelines": {{
-                "structure": "Hook emocional con problema (5s) → Presentación del cliente y contexto (10s) → Descubrimiento de la solución (15s) → Proceso y experiencia (15s) → Resultado medible con emoción (10s) → CTA sutil (5s)",
-                "key_elements": [
-                  "Cliente real identificable con nombre y contexto",
-                  "Métrica concreta de resultado (ej: 'aumenté ventas 40% en 2 meses')",
-                  "Quote auténtico destacado visualmente",
-                  "Antes/Después visual o narrativo claro"
-                ],
-                "dos": [
-                  "Capturar emoción genuina del cliente (no actuada)",
-                  "Usar lenguaje natural y cotidiano del cliente",
-                  "Mostrar resultados medibles y específicos",
-                  "Incluir contexto del cliente para identificación"
-                ],
-                "donts": [
-                  "Sonar a publicidad forzada o guión sobre-producido",
-                  "Usar jerga técnica o lenguaje corporativo",
-                  "Exagerar resultados sin pruebas",
-                  "Hacer el video demasiado largo (máx 60s)"
-                ]
-              }},
-              "creative_hooks": [
-                "Pensé que era imposible hasta que probé [producto] y todo cambió...",
-                "En solo 30 días logré [resultado específico] que llevaba años intentando",
-                "Mi mayor error fue no hacer esto antes. Ahora [resultado positivo]",
-                "Nadie me dijo que sería TAN fácil conseguir [beneficio]",
-                "De [estado negativo específico] a [estado positivo específico] en [tiempo concreto]",
-                "Lo que más me sorprendió no fue [beneficio obvio], sino [beneficio inesperado]"
-              ],
-              "suggested_format": "reel",
-              "suggested_frequency": "medium",
-              "tags": ["social-proof", "testimonios", "resultados"]
-            }}
-          ]
-        }}
-      ]
-    }},
-    {{
-      "title": "Objetivo Secundario",
-      "rationale": "Segundo objetivo más importante...",
-      "strategies": [...]
-    }}
-  ]
-}}
-
----
-
-🎨 PRINCIPIOS DE EXCELENCIA:
-
-1. **SÉ ESPECÍFICO:** Evita conceptos genéricos. "Post Motivacional" ❌ → "Micro-Lección de 30s con Aplicación Inmediata" ✅
-2. **SÉ DESCRIPTIVO:** La description debe pintar una imagen clara del contenido
-3. **SÉ ACCIONABLE:** Los execution_guidelines deben ser tan claros que cualquiera pueda crear el contenido
-4. **SÉ CREATIVO:** Los creative_hooks deben ser USABLES, no genéricos
-5. **SÉ ESTRATÉGICO:** Cada concepto debe tener un propósito claro alineado al objetivo
-
----
-
-⚡ REGLAS CRÍTICAS:
-
-- El root_label DEBE ser exactamente: "Proyecto Marketing"
-- El primer objetivo DEBE tener title: "Objetivo Principal"
-- Los demás objetivos DEBEN tener title: "Objetivo Secundario"
-- Los labels de conceptos NO deben incluir el prefijo "Concepto:", solo el nombre
-- Mínimo 3 objetivos (1 principal + 2 secundarios)
-- Mínimo 2 estrategias por objetivo
-- Mínimo 3 conceptos por estrategia (para dar opciones)
-- TODOS los campos solicitados son OBLIGATORIOS
-- Los creative_hooks deben ser ESPECÍFICOS y DIRECTAMENTE USABLES
-- Los execution_guidelines deben ser PASO A PASO y ACCIONABLES
-- NUNCA generes títulos de posts específicos, solo arquetipos reutilizables
-"""
-
 def _format_interview_data(data: dict) -> str:
     """Convierte el JSON de entrevista en texto narrativo para el prompt."""
     if not data:
@@ -674,30 +576,8 @@ def _format_interview_data(data: dict) -> str:
 async def generate_strategic_plan(interview_data: dict, analysis_json: dict, plan_type: str = "pro") -> dict:
     """
     Genera el árbol estratégico usando TODO el contexto de la entrevista.
+    Esqueleto + conceptos por estrategia en paralelo (ver strategy_generator.py).
     """
-    # 1. Formatear la Entrevista completa (No solo objetivos)
-    interview_context_str = _format_interview_data(interview_data)
-    
-    # Extract brand name from interview data
-    brand_name = interview_data.get("businessName") or interview_data.get("brand_name") or "Marca"
-
-    # 2. Extraer Insights del Análisis
-    q9_recs = analysis_json.get("Q9", {}).get("results", {}).get("lista_recomendaciones", [])
-    q10_alert = analysis_json.get("Q10", {}).get("results", {}).get("alerta_prioritaria", "N/A")
-    
-    # Resumen de Análisis
-    insights_str = (
-        f"ESTADO ACTUAL: {q10_alert}\n"
-        f"RECOMENDACIONES CRÍTICAS (Data-Driven): {json.dumps(q9_recs[:5], ensure_ascii=False)}"
-    )
-    
-    # 3. Llamar a la IA con el nuevo Playbook Prompt
-    prompt = STRATEGY_PLAYBOOK_PROMPT.format(
-        interview_context=interview_context_str, # <--- Aquí va TODO
-        analysis_insights=insights_str,
-        plan_type=plan_type,
-        brand_name=brand_name  # Pass brand name to prompt
-    )
+    from .strategy_generator import generate_strategy_tree  # deferred: it imports this module
     
-    # Use gpt-5-mini for better reasoning and more detailed strategy generation
-    return await _call_gemini(prompt, temperature=0.7, model="gpt-5-mini")
+    return await generate_strategy_tree(interview_data, analysis_json, plan_type=plan_type)
@@ -10,14 +10,21 @@ import base64
 import httpx
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from openai import AsyncOpenAI
 
-from .database import db
+from .database import db, clamp_page_size, apply_keyset, page_result
 from .comfyui_service import get_comfyui_service
+from .strategy_tree import get_strategy_tree
+from .metrics import IMAGE_GENERATION_SECONDS, span
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Gallery cards don't need the (long) prompt columns
+IMAGE_LIST_COLUMNS = (
+    "id, client_id, task_id, concept_id, image_url, style_preset, aspect_ratio, "
+    "is_selected, cost_usd, generation_time_ms, generation_model, created_at"
+)
+
 
 class ImageGenerationService:
     """Service for generating images with OpenAI DALL-E 3"""
@@ -67,46 +74,49 @@ class ImageGenerationService:
                 aspect_ratio, mood_tone, color_suggestions
             )
             
-            # 3. Generate image based on provider
+            # 3. Generate image based on provider (timed with status, so failures are observed too)
             start_time = datetime.now()
-            
-            if settings.IMAGE_PROVIDER == "comfyui":
-                logger.info(f"🎨 Starting ComfyUI generation (FLUX)...")
-                comfy_service = get_comfyui_service()
-                
-                # Determine steps/cfg based on style (basic mapping)
-                steps = 4 if "schnell" in settings.IMAGE_PROVIDER or True else 20 # Defaulting to schnell speed
-                
-                result = await comfy_service.generate_from_prompt(
-                    prompt=base_prompt,
-                    negative_prompt=negative_prompt,
-                    steps=steps,
-                    width=1024, # simplified logic, should resolve generic resolution
-                    height=1024
-                )
-                
-                # Extract first image
-                images = result.get("images", [])
-                if not images:
-                    raise Exception("ComfyUI returned no images")
+            use_comfyui = settings.IMAGE_PROVIDER == "comfyui"
+            width, height = 1024, 1024  # simplified logic, should resolve generic resolution
+            model = "flux-schnell" if use_comfyui else "dall-e-3"
+            resolution = f"{width}x{height}" if use_comfyui else self._get_dalle_size(aspect_ratio)
+            
+            with span("image.generate", IMAGE_GENERATION_SECONDS, model=model, resolution=resolution):
+                if use_comfyui:
+                    logger.info(f"🎨 Starting ComfyUI generation (FLUX)...")
+                    comfy_service = get_comfyui_service()
                     
-                # ComfyUI returns a URL accessible from the backend (proxy/direct)
-                # We need to download it to save to Supabase, OR usage direct URL if public
-                # For persistence, we download and upload to Supabase
-                image_url_source = images[0]
-                image_data = await comfy_service.download_image(image_url_source)
-                revised_prompt = base_prompt # FLUX doesn't revise prompts like DALL-E
-                
-                self.model_name = "flux-schnell" # Update model name for record
-                
-            else:
-                # Default to DALL-E 3
-                image_data, revised_prompt = await self._call_dalle_api(
-                    prompt=base_prompt,
-                    aspect_ratio=aspect_ratio,
-                    style_preset=style_preset
-                )
-                self.model_name = "dall-e-3"
+                    # Determine steps/cfg based on style (basic mapping)
+                    steps = 4 if "schnell" in settings.IMAGE_PROVIDER or True else 20 # Defaulting to schnell speed
+                    
+                    result = await comfy_service.generate_from_prompt(
+                        prompt=base_prompt,
+                        negative_prompt=negative_prompt,
+                        steps=steps,
+                        width=width,
+                        height=height
+                    )
+                    
+                    # Extract first image
+                    images = result.get("images", [])
+                    if not images:
+                        raise Exception("ComfyUI returned no images")
+                        
+                    # ComfyUI returns a URL accessible from the backend (proxy/direct)
+                    # We need to download it to save to Supabase, OR usage direct URL if public
+                    # For persistence, we download and upload to Supabase
+                    image_url_source = images[0]
+                    image_data = await comfy_service.download_image(image_url_source)
+                    revised_prompt = base_prompt # FLUX doesn't revise prompts like DALL-E
+                    
+                else:
+                    # Default to DALL-E 3
+                    image_data, revised_prompt = await self._call_dalle_api(
+                        prompt=base_prompt,
+                        aspect_ratio=aspect_ratio,
+                        style_preset=style_preset
+                    )
+            self.model_name = model # Update model name for record
 
             generation_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
             
@@ -209,24 +219,19 @@ class ImageGenerationService:
         # Get strategy/concept data
         if concept_id:
             try:
-                nodes = db.get_strategy_nodes(client_id)
-                concept = next((n for n in nodes if n["id"] == concept_id), None)
+                tree = get_strategy_tree(client_id)
+                concept = tree.node(concept_id)
                 
                 if concept:
                     context["concept_label"] = concept.get("label", "")
                     context["strategic_rationale"] = concept.get("strategic_rationale", concept.get("description", ""))
                     
-                    # Find parent strategy
-                    parent_id = concept.get("parent_id") or concept.get("parentId")
-                    strategy = next((n for n in nodes if n["id"] == parent_id), None)
-                    if strategy:
-                        context["strategy_context"] = strategy.get("label", "")
-                        
-                        # Find grandparent objective
-                        grandparent_id = strategy.get("parent_id") or strategy.get("parentId")
-                        objective = next((n for n in nodes if n["id"] == grandparent_id), None)
-                        if objective:
-                            context["objective_context"] = objective.get("label", "")
+                    # Parent strategy, then grandparent objective
+                    lineage = tree.ancestors(concept_id)
+                    if len(lineage) > 0:
+                        context["strategy_context"] = lineage[0].get("label", "")
+                    if len(lineage) > 1:
+                        context["objective_context"] = lineage[1].get("label", "")
                     
                     logger.info(f"📋 Loaded strategy context: {context['concept_label']}")
             except Exception as e:
@@ -334,6 +339,8 @@ class ImageGenerationService:
             
             logger.info(f"🖼️ Calling DALL-E 3: size={size}, quality={quality}, style={dalle_style}")
             
+            from openai import AsyncOpenAI
+
             async with AsyncOpenAI(api_key=settings.OPENAI_API_KEY) as client:
                 response = await client.images.generate(
                     model="dall-e-3",
@@ -478,23 +485,27 @@ class ImageGenerationService:
     async def get_images_for_client(
         self,
         client_id: str,
-        limit: int = 50
-    ) -> List[Dict[str, Any]]:
-        """Get recent generated images for a client (for gallery)."""
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        columns: str = IMAGE_LIST_COLUMNS
+    ) -> Dict[str, Any]:
+        """
+        Get recent generated images for a client (for gallery), newest first.
+        Returns {"items": [...], "next_cursor": str|None}.
+        """
+        if not db.client:
+            return {"items": [], "next_cursor": None}
+        limit = clamp_page_size(limit)
+        query = db.client.table("generated_images")\
+            .select(columns)\
+            .eq("client_id", client_id)
+        query = apply_keyset(query, cursor, desc=True).limit(limit + 1)
         try:
-            if not db.client:
-                return []
-            response = db.client.table("generated_images")\
-                .select("*")\
-                .eq("client_id", client_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
-            
-            return response.data if response.data else []
+            response = query.execute()
+            return page_result(response.data or [], limit)
         except Exception as e:
             logger.error(f"Failed to fetch images for client {client_id}: {e}")
-            return []
+            return {"items": [], "next_cursor": None}
     
     async def select_image_for_task(self, image_id: str, task_id: str) -> bool:
         """Mark an image as selected for a task."""
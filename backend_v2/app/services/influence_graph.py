@@ -0,0 +1,275 @@
+"""
+Influence Graph
+===============
+Author index + interaction graph behind Q5 (influencers).
+
+Nodes are authors, posts and hashtags. Edges (weighted):
+- commenter -> post           one per comment
+- post      -> post owner     when the caption item of that post was scraped
+- author    -> @mentioned     from the item's `mentions` or @handles in its text
+- author    -> #hashtag       from the item's `hashtags` or #tags in its text
+
+Centrality is PageRank (power iteration) plus weighted degree. The transition
+matrix is sparse: a scipy CSR matrix when scipy is installed, otherwise np.bincount
+over the COO edge arrays (same result, a bit slower). The top-K authors come from
+a heap.
+"""
+
+import heapq
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from scipy import sparse  # Optional: pip install scipy
+except ImportError:
+    sparse = None
+
+MENTION_RE = re.compile(r"@([A-Za-z0-9_.]{1,30})")
+HASHTAG_RE = re.compile(r"#(\w{1,100})")
+
+UNKNOWN_AUTHORS = {"", "unknown", "anon"}
+
+EDGE_WEIGHT_COMMENT = 1.0
+EDGE_WEIGHT_OWNER = 1.0
+EDGE_WEIGHT_MENTION = 1.0
+EDGE_WEIGHT_HASHTAG = 0.5
+
+
+@dataclass
+class InteractionGraph:
+    """Authors are nodes 0..n_authors-1; posts and hashtags follow."""
+    author_names: list[str]
+    n_nodes: int
+    src: np.ndarray
+    dst: np.ndarray
+    weight: np.ndarray
+    item_author: np.ndarray                                  # author id per item (-1 = unknown)
+    first_item: dict[int, int] = field(default_factory=dict)  # author id -> index of first item
+    post_owners: set[int] = field(default_factory=set)       # author ids that own a scraped post
+
+    @property
+    def n_authors(self) -> int:
+        return len(self.author_names)
+
+
+def _normalize_handle(name: Any) -> str:
+    return str(name or "").strip().lstrip("@").lower()
+
+
+def build_interaction_graph(raw_items: list[dict[str, Any]]) -> InteractionGraph:
+    """Index authors and collect edges in a single pass over the items."""
+    author_ids: dict[str, int] = {}
+    author_names: list[str] = []
+    post_ids: dict[str, int] = {}
+    tag_ids: dict[str, int] = {}
+
+    def author_id(handle: str) -> int:
+        aid = author_ids.get(handle)
+        if aid is None:
+            aid = author_ids[handle] = len(author_names)
+            author_names.append(handle)
+        return aid
+
+    # Edge lists per target kind; post/tag ids are offset once all authors are known
+    to_author_src: list[int] = []
+    to_author_dst: list[int] = []
+    to_author_w: list[float] = []
+    to_post_src: list[int] = []
+    to_post_dst: list[int] = []
+    to_tag_src: list[int] = []
+    to_tag_dst: list[int] = []
+    post_owner: dict[int, int] = {}
+
+    item_author: list[int] = []
+    first_item: dict[int, int] = {}
+    raw_author_ids: dict[Any, int] = {}  # raw "author" value -> id (-1 = unknown), skips re-normalizing
+
+    for i, item in enumerate(raw_items):
+        raw_author = item.get("author")
+        aid = raw_author_ids.get(raw_author)
+        if aid is None:
+            handle = _normalize_handle(raw_author)
+            aid = -1 if handle in UNKNOWN_AUTHORS else author_id(handle)
+            raw_author_ids[raw_author] = aid
+        item_author.append(aid)
+        if aid < 0:
+            continue
+        handle = author_names[aid]
+        if aid not in first_item:
+            first_item[aid] = i
+
+        post = item.get("post_id")
+        if post:
+            pid = post_ids.setdefault(post, len(post_ids))
+            if item.get("is_caption"):
+                post_owner.setdefault(pid, aid)
+            else:
+                to_post_src.append(aid)
+                to_post_dst.append(pid)
+
+        content = item.get("content") or ""
+
+        mentions = item.get("mentions") or ()
+        if not mentions and "@" in content:
+            mentions = MENTION_RE.findall(content)
+        for mention in mentions:
+            target = _normalize_handle(mention)
+            if target and target != handle:
+                to_author_src.append(aid)
+                to_author_dst.append(author_id(target))
+                to_author_w.append(EDGE_WEIGHT_MENTION)
+
+        hashtags = item.get("hashtags") or ()
+        if not hashtags and "#" in content:
+            hashtags = HASHTAG_RE.findall(content)
+        for tag in hashtags:
+            tag = str(tag).lstrip("#").lower()
+            if tag:
+                to_tag_src.append(aid)
+                to_tag_dst.append(tag_ids.setdefault(tag, len(tag_ids)))
+
+    n_authors = len(author_names)
+    n_posts = len(post_ids)
+    owner_pids = list(post_owner)
+
+    src = np.concatenate([
+        np.asarray(to_author_src, dtype=np.int64),
+        np.asarray(to_post_src, dtype=np.int64),
+        n_authors + np.asarray(owner_pids, dtype=np.int64),
+        np.asarray(to_tag_src, dtype=np.int64),
+    ])
+    dst = np.concatenate([
+        np.asarray(to_author_dst, dtype=np.int64),
+        n_authors + np.asarray(to_post_dst, dtype=np.int64),
+        np.asarray([post_owner[p] for p in owner_pids], dtype=np.int64),
+        n_authors + n_posts + np.asarray(to_tag_dst, dtype=np.int64),
+    ])
+    weight = np.concatenate([
+        np.asarray(to_author_w, dtype=np.float64),
+        np.full(len(to_post_src), EDGE_WEIGHT_COMMENT),
+        np.full(len(owner_pids), EDGE_WEIGHT_OWNER),
+        np.full(len(to_tag_src), EDGE_WEIGHT_HASHTAG),
+    ])
+
+    return InteractionGraph(
+        author_names=author_names,
+        n_nodes=n_authors + n_posts + len(tag_ids),
+        src=src,
+        dst=dst,
+        weight=weight,
+        item_author=np.asarray(item_author, dtype=np.int64),
+        first_item=first_item,
+        post_owners=set(post_owner.values()),
+    )
+
+
+def weighted_degree(graph: InteractionGraph) -> tuple[np.ndarray, np.ndarray]:
+    """(in_degree, out_degree) per node, edge-weighted."""
+    in_deg = np.bincount(graph.dst, weights=graph.weight, minlength=graph.n_nodes)
+    out_deg = np.bincount(graph.src, weights=graph.weight, minlength=graph.n_nodes)
+    return in_deg, out_deg
+
+
+def pagerank(graph: InteractionGraph, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+    """Weighted PageRank; mass of dangling nodes is spread uniformly. `tol` is on the L1 change."""
+    n = graph.n_nodes
+    if n == 0:
+        return np.zeros(0)
+    _, out_deg = weighted_degree(graph)
+    dangling = out_deg == 0
+    # Column-stochastic transition weights, one per edge
+    edge_w = graph.weight / np.where(out_deg == 0, 1.0, out_deg)[graph.src]
+
+    if sparse is not None:
+        # Duplicate (src, dst) pairs are summed by the CSR constructor
+        transition = sparse.csr_matrix((edge_w, (graph.dst, graph.src)), shape=(n, n))
+        step = transition.dot
+    else:
+        step = lambda r: np.bincount(graph.dst, weights=edge_w * r[graph.src], minlength=n)
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new_rank = (1 - damping) / n + damping * (step(rank) + rank[dangling].sum() / n)
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank
+
+
+def top_k(scores: np.ndarray, k: int, candidates: Optional[list[int]] = None,
+          tiebreak: Optional[np.ndarray] = None) -> list[int]:
+    """Indices of the k highest scores, via a bounded heap (O(n log k))."""
+    pool = range(len(scores)) if candidates is None else candidates
+    if tiebreak is None:
+        return heapq.nlargest(k, pool, key=scores.__getitem__)
+    return heapq.nlargest(k, pool, key=lambda i: (scores[i], tiebreak[i]))
+
+
+def rank_influencers(raw_items: list[dict[str, Any]], k: int = 5, exclude_owners: bool = True) -> list[dict]:
+    """
+    Top-k community authors by PageRank, in the Q5 `influenciadores_globales` shape.
+    The profile owner(s) (authors of scraped captions) are left out by default:
+    every post points at them, so they would always rank first.
+    """
+    graph = build_interaction_graph(raw_items)
+    if graph.n_authors == 0:
+        return []
+
+    ranks = pagerank(graph)
+    in_deg, out_deg = weighted_degree(graph)
+    n_authors = graph.n_authors
+
+    known = graph.item_author >= 0
+    authors_of_items = graph.item_author[known]
+    sentiments = np.array(
+        [item.get("ai_sentiment_score") or 0.0 for item, ok in zip(raw_items, known.tolist()) if ok],
+        dtype=np.float64
+    )
+    item_counts = np.bincount(authors_of_items, minlength=n_authors)
+    sentiment_sums = np.bincount(authors_of_items, weights=sentiments, minlength=n_authors)
+    mentions_received = np.bincount(
+        graph.dst[graph.dst < n_authors],
+        weights=graph.weight[graph.dst < n_authors],
+        minlength=n_authors
+    )
+
+    # Only authors that actually wrote something can be ranked as influencers
+    candidates = [
+        a for a in np.flatnonzero(item_counts).tolist()
+        if not (exclude_owners and a in graph.post_owners)
+    ]
+    if not candidates:
+        return []
+
+    author_ranks = ranks[:n_authors]
+    degree = in_deg[:n_authors] + out_deg[:n_authors]
+    # Commenters nobody mentions share the same PageRank: break ties by activity
+    chosen = top_k(author_ranks, k, candidates, tiebreak=degree)
+    max_rank = max(author_ranks[candidates].max(), 1e-12)
+    max_degree_log = math.log1p(max(degree[candidates].max(), 1.0))
+
+    influencers = []
+    for a in chosen:
+        count = int(item_counts[a])
+        mean_sentiment = float(sentiment_sums[a] / count) if count else 0.0
+        evidence = raw_items[graph.first_item[a]].get("content", "") if a in graph.first_item else ""
+        influencers.append({
+            "username": f"@{graph.author_names[a]}",
+            "autoridad_promedio": round(100 * math.log1p(degree[a]) / max_degree_log),
+            "afinidad_promedio": round((mean_sentiment + 1) / 2 * 100),
+            "menciones": count,
+            "menciones_recibidas": int(mentions_received[a]),
+            "score_centralidad": round(float(author_ranks[a] / max_rank), 2),
+            "pagerank": float(author_ranks[a]),
+            "sentimiento": round(mean_sentiment, 2),
+            "comentario_evidencia": (evidence or "")[:100]
+        })
+    return influencers
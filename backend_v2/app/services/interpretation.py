@@ -0,0 +1,225 @@
+"""
+Report Interpretations
+======================
+Human-language interpretation of each Q1-Q10 block, generated from a compact
+numeric digest of the block instead of the full report JSON (no evidence
+texts, no long lists).
+
+Per block:
+1. Build the digest (`build_digest`) and hash it together with the client context.
+2. Cache hit on (context hash, block, digest hash) -> reuse the text.
+3. Same context as the client's previous report and numbers within tolerance
+   (`materially_same`) -> keep the previous text.
+4. Otherwise the block is generated. Stale blocks are generated in parallel, one
+   small LLM call each; the client context goes in the system message so it is
+   served from the provider's prompt cache after the first call.
+
+Cache and "previous report" state live in the shared state store.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Optional
+
+from .gemini_service import _call_gemini, format_interpretation_context, _get_fallback_interpretations
+from .state_store import get_state_store
+
+logger = logging.getLogger(__name__)
+
+BLOCKS = {
+    "Q1": "Emociones predominantes (Plutchik, % de comentarios)",
+    "Q2": "Personalidad de marca percibida (Aaker, %)",
+    "Q3": "Tópicos de conversación (frecuencia % y sentimiento promedio -1..1)",
+    "Q4": "Marcos narrativos (proporción positivo / negativo / aspiracional)",
+    "Q5": "Influenciadores de la comunidad (menciones, afinidad %, centralidad)",
+    "Q6": "Oportunidades de mejora (gap y competencia, 0-100)",
+    "Q7": "Sentimiento global (proporciones y subjetividad)",
+    "Q8": "Evolución temporal (% positivo, volumen y tópico por semana)",
+    "Q9": "Recomendaciones priorizadas",
+    "Q10": "Resumen ejecutivo y KPIs",
+}
+
+CACHE_TTL_SECONDS = 30 * 24 * 3600
+LAST_TTL_SECONDS = 90 * 24 * 3600
+MAX_CONCURRENT_CALLS = 5
+
+# "Material" change thresholds for numbers in a digest
+ABS_TOLERANCE_UNIT = 0.05      # values in [-1, 1] (sentiments, ratios)
+ABS_TOLERANCE_PERCENT = 3      # larger values (percentages, scores, counts)
+REL_TOLERANCE = 0.10
+
+INTERPRETATION_SYSTEM_PROMPT = """Actúa como un Consultor Senior de Estrategia de Marca. Tu cliente no es técnico.
+
+CONTEXTO ESTRATÉGICO DEL CLIENTE:
+{context_str}
+
+Recibirás UN bloque de datos agregados de su reporte de redes sociales.
+Escribe una interpretación breve (máximo 3 frases) cruzando los datos con la IDENTIDAD DE MARCA del contexto:
+1. **Alineación**: ¿Los resultados reflejan la Misión, Visión o Valores de la marca? Si no, señálalo suavemente.
+2. **Personalidad**: ¿El tono de los comentarios coincide con el Arquetipo de la marca?
+3. **Accionable**: Explica qué significa el dato para SU negocio específico.
+4. **Formato**: Usa un lenguaje alentador pero estratégico. Usa **negritas** para conceptos clave.
+
+Devuelve un JSON estricto: {{"interpretation": "Texto explicativo aquí..."}}
+"""
+
+BLOCK_PROMPT = """BLOQUE {q_key}: {title}
+DATOS: {digest}"""
+
+
+def _results(q_data: dict) -> dict:
+    return (q_data or {}).get("results") or {}
+
+
+def build_digest(q_key: str, q_data: dict) -> Any:
+    """Compact, numbers-first view of one Q block (what the interpretation needs)."""
+    q_data = q_data or {}
+    r = _results(q_data)
+
+    if q_key == "Q1":
+        return {e["name"]: e["value"] for e in q_data.get("emociones", []) if e.get("value")}
+    if q_key == "Q2":
+        return q_data.get("resumen_global_personalidad", {})
+    if q_key == "Q3":
+        return [[t.get("topic"), t.get("frecuencia_relativa"), t.get("sentimiento_promedio")]
+                for t in r.get("analisis_agregado", [])[:8]]
+    if q_key == "Q4":
+        return r.get("analisis_agregado", {})
+    if q_key == "Q5":
+        return [[i.get("username"), i.get("menciones"), i.get("afinidad_promedio"), i.get("score_centralidad")]
+                for i in r.get("influenciadores_globales", [])[:5]]
+    if q_key == "Q6":
+        return [[o.get("oportunidad"), o.get("gap_score"), o.get("competencia_score")]
+                for o in r.get("oportunidades", [])[:6]]
+    if q_key == "Q7":
+        return {k: v for k, v in r.get("analisis_agregado", {}).items() if isinstance(v, (int, float))}
+    if q_key == "Q8":
+        return {
+            "semanas": [[w.get("fecha_semana"), w.get("porcentaje_positivo"), w.get("engagement"), w.get("topico_principal")]
+                        for w in r.get("serie_temporal_semanal", [])],
+            "tendencia": r.get("resumen_global", {}).get("tendencia"),
+        }
+    if q_key == "Q9":
+        return {
+            "criticas": r.get("resumen_global", {}).get("recomendaciones_criticas", 0),
+            "top": [[x.get("titulo"), x.get("prioridad")] for x in r.get("lista_recomendaciones", [])[:5]],
+        }
+    if q_key == "Q10":
+        return {"alerta": r.get("alerta_prioritaria"), **r.get("kpis_principales", {})}
+    return r
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _numbers_close(a: float, b: float) -> bool:
+    abs_tol = ABS_TOLERANCE_UNIT if max(abs(a), abs(b)) <= 1 else ABS_TOLERANCE_PERCENT
+    return abs(a - b) <= max(abs_tol, REL_TOLERANCE * max(abs(a), abs(b)))
+
+
+def materially_same(old: Any, new: Any) -> bool:
+    """Same structure and labels, every number within tolerance."""
+    if isinstance(old, bool) or isinstance(new, bool):
+        return old == new
+    if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+        return _numbers_close(float(old), float(new))
+    if isinstance(old, dict) and isinstance(new, dict):
+        return old.keys() == new.keys() and all(materially_same(old[k], new[k]) for k in old)
+    if isinstance(old, list) and isinstance(new, list):
+        return len(old) == len(new) and all(materially_same(a, b) for a, b in zip(old, new))
+    return old == new
+
+
+def _cache_key(context_hash: str, q_key: str, digest_hash: str) -> str:
+    return f"interp:{context_hash}:{q_key}:{digest_hash}"
+
+
+def _last_key(client_id: str) -> str:
+    return f"interp:last:{client_id}"
+
+
+async def _generate_block(system_prompt: str, q_key: str, digest: Any, sem: asyncio.Semaphore) -> Optional[str]:
+    prompt = BLOCK_PROMPT.format(
+        q_key=q_key,
+        title=BLOCKS.get(q_key, q_key),
+        digest=json.dumps(digest, ensure_ascii=False, separators=(",", ":"))
+    )
+    async with sem:
+        try:
+            result = await _call_gemini(prompt, temperature=0.7, model="gpt-5-mini", system=system_prompt)
+        except Exception as e:
+            logger.error(f"❌ Interpretation for {q_key} failed: {e}")
+            return None
+    if isinstance(result, dict):
+        text = result.get("interpretation") or result.get(f"{q_key}_interpretation")
+        return text if isinstance(text, str) and text.strip() else None
+    return None
+
+
+async def generate_interpretations(aggregated_json: dict, context: dict = None, client_id: Optional[str] = None) -> dict:
+    """
+    {"Q1_interpretation": "...", ...} for every Q block present in `aggregated_json`.
+    Blocks that fail fall back to the generic text.
+    """
+    context_str = format_interpretation_context(context)
+    context_hash = _hash(context_str)
+    store = get_state_store()
+    previous = (store.get_json(_last_key(client_id)) or {}) if client_id else {}
+
+    interpretations: dict[str, str] = {}
+    state: dict[str, dict] = {}
+    stale: dict[str, tuple[Any, str]] = {}
+    reused = cached = 0
+
+    for q_key in BLOCKS:
+        if q_key not in aggregated_json:
+            continue
+        digest = build_digest(q_key, aggregated_json[q_key])
+        digest_hash = _hash(digest)
+
+        text = None
+        raw = store.get(_cache_key(context_hash, q_key, digest_hash))
+        if raw is not None:
+            text = raw.decode("utf-8")
+            cached += 1
+        else:
+            last = previous.get(q_key)
+            if last and last.get("context_hash") == context_hash and last.get("text") \
+                    and materially_same(last.get("digest"), digest):
+                text = last["text"]
+                digest = last["digest"]  # keep comparing against the digest the text was written for
+                reused += 1
+
+        if text is None:
+            stale[q_key] = (digest, digest_hash)
+        else:
+            interpretations[f"{q_key}_interpretation"] = text
+            state[q_key] = {"digest": digest, "context_hash": context_hash, "text": text}
+
+    logger.info(
+        f"🗣️ Interpretations: {len(stale)} to generate, {cached} cached, {reused} unchanged since last report",
+        extra={"context_chars": len(context_str)}
+    )
+
+    if stale:
+        system_prompt = INTERPRETATION_SYSTEM_PROMPT.format(context_str=context_str)
+        sem = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+        keys = list(stale)
+        texts = await asyncio.gather(*(_generate_block(system_prompt, q, stale[q][0], sem) for q in keys))
+        fallback = _get_fallback_interpretations()
+        for q_key, text in zip(keys, texts):
+            digest, digest_hash = stale[q_key]
+            if text is None:
+                interpretations[f"{q_key}_interpretation"] = fallback.get(f"{q_key}_interpretation", "")
+                continue
+            interpretations[f"{q_key}_interpretation"] = text
+            state[q_key] = {"digest": digest, "context_hash": context_hash, "text": text}
+            store.set(_cache_key(context_hash, q_key, digest_hash), text.encode("utf-8"), CACHE_TTL_SECONDS)
+
+    if client_id and state:
+        store.set_json(_last_key(client_id), {**previous, **state}, LAST_TTL_SECONDS)
+
+    return interpretations
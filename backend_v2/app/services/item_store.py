@@ -0,0 +1,304 @@
+"""
+Classified Item Store
+=====================
+Every report's classified comments, kept as one Parquet file per report:
+
+    ITEM_STORE_DIR/<client_id>/<report_id>.parquet
+
+and queried in-process with DuckDB, straight from the files. New metrics,
+drill-downs (comments by topic / emotion / week, author lookups) and
+cross-report comparisons then need neither a re-scrape nor a reclassification.
+
+Filters only ever reach SQL as bound parameters; grouping columns are checked
+against GROUPABLE. Needs pyarrow + duckdb: without them writes are skipped and
+`available()` is False. Both are imported on first use, not with the app.
+
+Set ITEM_STORE_DIR to persistent storage: the <tmp> default is only meant for
+development and logs a warning.
+"""
+
+import importlib.util
+import logging
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+SAFE_ID_RE = re.compile(r"[^\w\-]+")
+MAX_PAGE_SIZE = 500
+POSITIVE_THRESHOLD = 0.3  # same cut as the aggregator's Q4/Q7 "positive"
+
+# Columns that can be grouped by / filtered on in drill-downs
+GROUPABLE = ("ai_topic", "ai_emotion", "ai_personality", "week", "author", "post_id")
+
+
+@lru_cache()
+def item_schema():
+    import pyarrow as pa  # deferred: pyarrow + duckdb add ~80ms to app startup
+    return pa.schema([
+        ("report_id", pa.string()),
+        ("idx", pa.int32()),
+        ("platform", pa.string()),
+        ("platform_id", pa.string()),
+        ("post_id", pa.string()),
+        ("content", pa.string()),
+        ("author", pa.string()),
+        ("posted_at", pa.timestamp("ms")),  # naive UTC
+        ("is_caption", pa.bool_()),
+        ("likes", pa.int64()),
+        ("hashtags", pa.list_(pa.string())),
+        ("mentions", pa.list_(pa.string())),
+        ("ai_emotion", pa.string()),
+        ("ai_personality", pa.string()),
+        ("ai_topic", pa.string()),
+        ("ai_sentiment_score", pa.float32()),
+        ("skipped", pa.bool_()),  # not classified (mention-only, link-only, empty)
+        ("stored_at", pa.timestamp("ms")),
+    ])
+
+
+@lru_cache()
+def available() -> bool:
+    # Optional: pip install duckdb pyarrow (checked without importing them)
+    return all(importlib.util.find_spec(name) is not None for name in ("duckdb", "pyarrow"))
+
+
+@lru_cache()
+def _default_root() -> Path:
+    path = Path(tempfile.gettempdir()) / "pixely_items"
+    logger.warning(f"⚠️ ITEM_STORE_DIR not set: classified items go to {path} and are lost when the host is replaced")
+    return path
+
+
+def store_root() -> Path:
+    return Path(settings.ITEM_STORE_DIR) if settings.ITEM_STORE_DIR else _default_root()
+
+
+def client_dir(client_id: str) -> Path:
+    return store_root() / SAFE_ID_RE.sub("_", client_id)
+
+
+def report_path(client_id: str, report_id: str) -> Path:
+    return client_dir(client_id) / f"{SAFE_ID_RE.sub('_', report_id)}.parquet"
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    """ISO string -> naive UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _str_list(value: Any) -> list[str]:
+    return [str(v) for v in value] if isinstance(value, list) else []
+
+
+def write_report_items(client_id: str, report_id: str, items: list[dict]) -> Optional[Path]:
+    """Persist a report's classified items (blocking; run off-loop). Replaces a previous write."""
+    if not available():
+        logger.warning("⚠️ Item store disabled (install duckdb and pyarrow)")
+        return None
+    stored_at = datetime.utcnow()
+    rows = [{
+        "report_id": report_id,
+        "idx": i,
+        "platform": item.get("platform"),
+        "platform_id": str(item.get("platform_id") or "") or None,
+        "post_id": str(item.get("post_id") or "") or None,
+        "content": item.get("content") or "",
+        "author": item.get("author"),
+        "posted_at": _timestamp(item.get("posted_at")),
+        "is_caption": bool(item.get("is_caption")),
+        "likes": int(item.get("likes") or 0),
+        "hashtags": _str_list(item.get("hashtags")),
+        "mentions": _str_list(item.get("mentions")),
+        "ai_emotion": item.get("ai_emotion"),
+        "ai_personality": item.get("ai_personality"),
+        "ai_topic": item.get("ai_topic"),
+        "ai_sentiment_score": float(item.get("ai_sentiment_score") or 0.0),
+        "skipped": bool(item.get("skipped")),
+        "stored_at": stored_at,
+    } for i, item in enumerate(items)]
+
+    import pyarrow as pa  # deferred: see item_schema()
+    import pyarrow.parquet as pq
+
+    path = report_path(client_id, report_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(pa.Table.from_pylist(rows, schema=item_schema()), tmp, compression="zstd")
+    os.replace(tmp, path)
+    logger.info(f"🗄️ Stored {len(rows)} classified items for report {report_id}")
+    return path
+
+
+def _files(client_id: str, report_id: Optional[str]) -> list[str]:
+    if report_id:
+        path = report_path(client_id, report_id)
+        return [str(path)] if path.exists() else []
+    return sorted(str(p) for p in client_dir(client_id).glob("*.parquet"))
+
+
+# Start (Tuesday) of the Q8 week of posted_at: temporal.bucket_ids on epoch days,
+# so drill-down weeks line up with the Q8 series (W-MON, Tuesday..Monday)
+WEEK_SQL = (
+    "DATE '1970-01-01' + CAST(7 * floor((floor(epoch_ms(posted_at) / 86400000) + 2) / 7) - 2 AS INTEGER)"
+)
+
+
+def _query(files: list[str], sql: str, params: list) -> list[dict]:
+    """Run `sql` against `items` (the Parquet files + a derived week column); rows as dicts."""
+    import duckdb  # deferred: see item_schema()
+
+    con = duckdb.connect()
+    try:
+        cursor = con.execute(
+            f"WITH items AS (SELECT *, {WEEK_SQL} AS week "
+            "FROM read_parquet(?, union_by_name = true)) " + sql,
+            [files] + params
+        )
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        con.close()
+
+
+def _where(filters: dict[str, Any]) -> tuple[str, list]:
+    clauses, params = [], []
+    for column, value in filters.items():
+        if value is None:
+            continue
+        if column not in GROUPABLE:
+            raise ValueError(f"Unknown filter '{column}'")
+        clauses.append(f"{column} = ?")
+        params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def list_items(client_id: str, report_id: Optional[str] = None, filters: Optional[dict] = None,
+               limit: int = 50, offset: int = 0) -> dict:
+    """Comments matching `filters` (e.g. {"ai_topic": "Precio", "week": date}), newest first."""
+    files = _files(client_id, report_id)
+    if not files:
+        return {"items": [], "total": 0}
+    where, params = _where(filters or {})
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    total = _query(files, f"SELECT count(*) AS n FROM items{where}", params)[0]["n"]
+    rows = _query(
+        files,
+        f"SELECT report_id, post_id, content, author, posted_at, likes, ai_emotion, ai_personality, "
+        f"ai_topic, ai_sentiment_score FROM items{where} "
+        f"ORDER BY posted_at DESC NULLS LAST, idx LIMIT ? OFFSET ?",
+        params + [limit, max(0, offset)]
+    )
+    return {"items": rows, "total": total}
+
+
+def breakdown(client_id: str, by: str, report_id: Optional[str] = None, filters: Optional[dict] = None) -> list[dict]:
+    """Count, share and sentiment per value of `by` (one of GROUPABLE)."""
+    if by not in GROUPABLE:
+        raise ValueError(f"Cannot group by '{by}'")
+    files = _files(client_id, report_id)
+    if not files:
+        return []
+    where, params = _where(filters or {})
+    return _query(
+        files,
+        f"SELECT {by} AS value, count(*) AS count, "
+        f"round(100.0 * count(*) / sum(count(*)) OVER (), 2) AS percent, "
+        f"round(avg(ai_sentiment_score), 3) AS avg_sentiment, "
+        f"round(100.0 * avg(CASE WHEN ai_sentiment_score > {POSITIVE_THRESHOLD} THEN 1 ELSE 0 END), 2) AS percent_positive "
+        f"FROM items{where} GROUP BY {by} ORDER BY count DESC",
+        params
+    )
+
+
+def author_profile(client_id: str, author: str) -> Optional[dict]:
+    """Everything a user has said about the client, across reports."""
+    files = _files(client_id, None)
+    if not files:
+        return None
+    summary = _query(
+        files,
+        "SELECT count(*) AS comments, count(DISTINCT report_id) AS reports, "
+        "count(DISTINCT post_id) AS posts, round(avg(ai_sentiment_score), 3) AS avg_sentiment, "
+        "sum(likes) AS likes, min(posted_at) AS first_seen, max(posted_at) AS last_seen "
+        "FROM items WHERE author = ?",
+        [author]
+    )[0]
+    if not summary["comments"]:
+        return None
+    summary["author"] = author
+    for column in ("ai_topic", "ai_emotion"):
+        summary[column] = _query(
+            files,
+            f"SELECT {column} AS value, count(*) AS count FROM items WHERE author = ? "
+            f"GROUP BY {column} ORDER BY count DESC LIMIT 5",
+            [author]
+        )
+    return summary
+
+
+def report_trend(client_id: str, by: Optional[str] = None) -> list[dict]:
+    """
+    One row per stored report (oldest first) with volume and sentiment; with `by`,
+    one row per (report, value) to follow e.g. topic shares across reports.
+    """
+    files = _files(client_id, None)
+    if not files:
+        return []
+    if by is not None and by not in GROUPABLE:
+        raise ValueError(f"Cannot group by '{by}'")
+    group = f", {by}" if by else ""
+    select = f", {by} AS value" if by else ""
+    share = (f", round(100.0 * count(*) / sum(count(*)) OVER (PARTITION BY report_id), 2) AS percent"
+             if by else "")
+    return _query(
+        files,
+        f"SELECT report_id{select}, min(stored_at) AS stored_at, count(*) AS count{share}, "
+        f"round(avg(ai_sentiment_score), 3) AS avg_sentiment, "
+        f"round(100.0 * avg(CASE WHEN ai_sentiment_score > {POSITIVE_THRESHOLD} THEN 1 ELSE 0 END), 2) AS percent_positive "
+        f"FROM items GROUP BY report_id{group} ORDER BY min(stored_at){', count DESC' if by else ''}",
+        []
+    )
+
+
+def latest_classifications(client_id: str, post_ids: list[str]) -> dict[tuple, dict]:
+    """
+    Classifications from the client's most recent stored report for the given
+    posts, keyed by (post_id, author, content) -- lets an incremental re-analysis
+    skip reclassifying comments it has already seen.
+    """
+    if not available() or not post_ids:
+        return {}
+    files = list(client_dir(client_id).glob("*.parquet"))
+    if not files:
+        return {}
+    latest = max(files, key=lambda p: p.stat().st_mtime)
+    import pyarrow.parquet as pq  # deferred: see item_schema()
+
+    # Files written before the `skipped` column existed have no skipped items
+    skipped = ", skipped" if "skipped" in pq.read_schema(latest).names else ""
+    rows = _query(
+        [str(latest)],
+        f"SELECT post_id, author, content, ai_emotion, ai_personality, ai_topic, ai_sentiment_score{skipped} "
+        f"FROM items WHERE list_contains(?, post_id)",
+        [list(post_ids)]
+    )
+    return {
+        (row.pop("post_id"), row.pop("author"), row.pop("content")): row
+        for row in rows
+    }
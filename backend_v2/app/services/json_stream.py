@@ -0,0 +1,120 @@
+"""
+Incremental JSON
+================
+Pull complete elements out of a JSON document while it is still being streamed,
+e.g. each objective of {"objectives": [{...}, {...}, ...]} as soon as its closing
+brace arrives.
+
+Only the characters needed to track strings, escapes and nesting depth are
+scanned; each complete element is parsed once with json.loads.
+"""
+
+import json
+import logging
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayItems:
+    """
+    Feed text chunks, get back the elements of the array found under `key`
+    (at any depth, first occurrence) that completed within the chunk.
+    """
+
+    def __init__(self, key: str):
+        self._needle = f'"{key}"'
+        self._buffer = ""
+        self._pos = 0               # next character to scan
+        self._array_depth = None    # depth of the target array once found
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self.done = False
+
+    def _find_array(self) -> bool:
+        idx = self._buffer.find(self._needle)
+        if idx < 0:
+            return False
+        bracket = self._buffer.find("[", idx + len(self._needle))
+        if bracket < 0:
+            return False
+        # Depth at the key: count structure up to it (the prefix is small)
+        self._depth = 0
+        in_string = escape = False
+        for ch in self._buffer[:bracket]:
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+        self._depth += 1
+        self._array_depth = self._depth
+        self._pos = bracket + 1
+        return True
+
+    def feed(self, chunk: str) -> list[Any]:
+        if self.done or not chunk:
+            return []
+        self._buffer += chunk
+        if self._array_depth is None and not self._find_array():
+            return []
+
+        items = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._item_start is None and self._depth == self._array_depth:
+                    self._item_start = i
+            elif ch in "{[":
+                if self._item_start is None and self._depth == self._array_depth:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth < self._array_depth:
+                    self.done = True  # closing bracket of the target array
+                    break
+                if self._depth == self._array_depth and self._item_start is not None:
+                    items.append(self._parse(buffer[self._item_start:i + 1]))
+                    self._item_start = None
+            elif ch == "," and self._depth == self._array_depth and self._item_start is not None:
+                # Scalar element (string/number) ended
+                items.append(self._parse(buffer[self._item_start:i].strip()))
+                self._item_start = None
+
+        self._pos = len(buffer)
+        # Drop what was consumed, keeping an unfinished element
+        keep_from = self._item_start if self._item_start is not None else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._pos -= keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return [item for item in items if item is not None]
+
+    @staticmethod
+    def _parse(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"⚠️ Skipping malformed streamed element: {e}")
+            return None
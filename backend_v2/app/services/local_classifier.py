@@ -0,0 +1,321 @@
+"""
+Local Comment Classifier
+========================
+CPU-only fast path in front of the LLM classifier (gemini_service.classify_comments_batch).
+
+- Sentiment: Spanish lexicon + emoji scores, with negators ("no me gusta")
+  and intensifiers ("muy bueno").
+- Topic: keyword rules over the COMMERCE_TOPICS of gemini_service.
+- Emotion / personality: cue words on top of the sentiment.
+
+Every prediction carries a confidence. The raw score rewards texts whose tokens
+are all explained by the lexicons, with one polarity and one topic. Without
+LOCAL_CLASSIFIER_CALIBRATION the confidence is the raw score itself, so
+LOCAL_CLASSIFIER_THRESHOLD is a threshold on the raw score; with it, the raw
+score goes through a logistic calibration (Platt scaling, fitted offline with
+bench_local_classifier.py). Items at or above the threshold are answered
+locally; the rest go to the LLM.
+
+Pure reactions ("🔥🔥", "me encanta", "horrible") have no topic keyword by
+nature: they get REACTION_TOPIC with full topic confidence. Other comments
+without a topic keyword, and negative comments without an emotion cue
+("no me gusta el precio"), go to the LLM.
+"""
+
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Optional
+
+from ..config import settings
+
+WORD_OR_SYMBOL_RE = re.compile(r"[^\W\d_]+|[^\w\s]")
+LAUGH_RE = re.compile(r"^(?:ja|je|ji|ha|he|js)+j?$")
+REPEAT_RE = re.compile(r"(.)\1{2,}")
+DOUBLE_RE = re.compile(r"(.)\1")
+
+STOPWORDS = {
+    "a", "al", "algo", "aqui", "asi", "como", "con", "cual", "de", "del", "donde", "el", "ella", "en",
+    "era", "es", "esa", "ese", "eso", "esta", "estan", "este", "esto", "fue", "ha", "hay", "hola",
+    "la", "las", "le", "les", "lo", "los", "me", "mi", "mis", "nos", "o", "para", "pero", "por",
+    "pq", "porque", "q", "que", "se", "si", "son", "su", "sus", "te", "ti", "tiene", "tienen", "todo",
+    "todos", "tu", "tus", "un", "una", "uno", "unos", "usted", "ustedes", "x", "y", "ya", "yo",
+    "buenas", "buenos", "dias", "tardes", "noches", "quiero", "quisiera", "saber", "info",
+}
+NEGATORS = {"no", "nunca", "jamas", "ni", "tampoco", "sin", "nada"}
+INTENSIFIERS = {"muy", "super", "tan", "demasiado", "re", "mega", "sumamente", "tremendo"}
+
+POSITIVE_WORDS = {
+    "encanta", "encanto", "encantan", "encantada", "encantado", "amo", "amamos", "ame", "hermoso",
+    "hermosa", "hermosos", "hermosas", "bello", "bella", "precioso", "preciosa", "lindo", "linda",
+    "lindos", "lindas", "genial", "excelente", "excelentes", "increible", "perfecto", "perfecta",
+    "espectacular", "maravilloso", "maravillosa", "buenisimo", "buenisima", "bueno", "buena",
+    "mejor", "mejores", "gracias", "feliz", "top", "brutal", "wow", "recomiendo", "recomendado",
+    "recomendada", "fantastico", "fantastica", "divino", "divina", "love", "amazing", "great",
+    "nice", "crack", "felicidades", "felicitaciones", "exito", "gusta", "gustan", "gusto",
+    "bonito", "bonita", "fabuloso", "fabulosa", "rico", "rica", "delicioso", "deliciosa",
+    "confiable", "bien", "puntual", "rapido", "rapida", "facil", "comodo", "comoda", "bacan", "chevere",
+}
+NEGATIVE_WORDS = {
+    "malo", "mala", "malos", "malas", "mal", "pesimo", "pesima", "horrible", "terrible", "estafa",
+    "estafadores", "fraude", "odio", "decepcion", "decepcionado", "decepcionada", "peor", "lento",
+    "lenta", "tardan", "tardo", "tarde", "roto", "rota", "defectuoso", "defectuosa", "queja",
+    "reclamo", "mentira", "mentirosos", "basura", "asco", "fatal", "problema", "problemas",
+    "caro", "carisimo", "triste", "falso", "falsa", "robo", "ladrones", "demora",
+    "cancelaron", "ignoran",
+}
+
+EMOJI_SENTIMENT = {
+    "😍": 1.0, "🥰": 1.0, "😘": 0.8, "❤": 1.0, "💕": 1.0, "💖": 1.0, "💗": 1.0, "💓": 1.0, "💞": 1.0,
+    "💙": 1.0, "💚": 1.0, "💜": 1.0, "🧡": 1.0, "💛": 1.0, "🖤": 0.8, "🤍": 0.8, "🔥": 1.0, "👏": 1.0,
+    "🙌": 1.0, "💯": 1.0, "😊": 0.8, "😁": 0.8, "😀": 0.6, "😃": 0.6, "😄": 0.6, "😂": 0.4,
+    "🤣": 0.4, "🤩": 1.0, "✨": 0.6, "👍": 0.6, "🙏": 0.5, "👌": 0.6, "💪": 0.7, "🎉": 0.8,
+    "😢": -0.8, "😭": -0.3, "😡": -1.0, "🤬": -1.0, "😠": -1.0, "👎": -1.0, "💔": -0.8,
+    "😒": -0.7, "😞": -0.8, "🤮": -1.0, "🤢": -1.0, "😤": -0.7, "🙄": -0.6,
+}
+SURPRISE_CUES = {"wow", "increible", "😮", "😱", "🤯", "😲"}
+TRUST_CUES = {"confiable", "recomiendo", "recomendado", "recomendada", "gracias", "original", "🙏", "👌"}
+ANGER_CUES = {"estafa", "estafadores", "fraude", "pesimo", "pesima", "horrible", "robo", "ladrones", "😡", "🤬", "😠"}
+SADNESS_CUES = {"triste", "decepcion", "decepcionado", "decepcionada", "😢", "😭", "💔", "😞"}
+DISGUST_CUES = {"asco", "basura", "🤮", "🤢"}
+EXCITEMENT_CUES = {"🔥", "🤩", "🎉", "wow", "brutal", "!"}
+
+# Keyword rules per commerce topic (accent-stripped, lowercase)
+TOPIC_KEYWORDS = {
+    "Precio": {"precio", "precios", "cuanto", "cuesta", "cuestan", "costo", "costos", "vale", "valor",
+               "barato", "barata", "caro", "cara", "carisimo", "descuento", "descuentos", "oferta",
+               "ofertas", "promo", "promocion", "rebaja", "rebajas", "cuotas", "pago", "$"},
+    "Calidad": {"calidad", "material", "materiales", "durable", "resistente", "acabado", "acabados",
+                "tela", "roto", "rota", "defectuoso", "defectuosa", "dura", "duran"},
+    "Servicio": {"atencion", "servicio", "responden", "respondan", "respuesta", "dm", "inbox",
+                 "whatsapp", "trato", "vendedor", "vendedora", "asesor", "asesora", "amables"},
+    "Entrega": {"envio", "envios", "envian", "envias", "delivery", "llega", "llego", "llegan",
+                "entrega", "entregas", "despacho", "despachan", "shipping", "pedido", "tardo",
+                "tardan", "demora", "puntual"},
+    "Experiencia": {"experiencia", "tienda", "local", "compre", "visita", "volvere", "atendieron"},
+    "Producto": {"talla", "tallas", "color", "colores", "modelo", "modelos", "stock", "disponible",
+                 "tamano", "medidas", "sabor", "sabores", "ingredientes", "producto", "productos"},
+    "Garantía": {"garantia", "devolucion", "devolver", "reembolso", "cambio", "cambiar"},
+    "Comunicación": {"video", "foto", "fotos", "post", "contenido", "publicacion", "reel", "sorteo",
+                     "live", "campana", "anuncio"},
+    "Confianza": {"confiable", "estafa", "estafadores", "fraude", "seguro", "original", "originales",
+                  "falso", "falsa", "mentira", "ladrones", "robo"},
+    "Recomendación": {"recomiendo", "recomendado", "recomendada", "recomendacion", "recomienden"},
+}
+# Topic of pure reactions: only sentiment words, emoji and filler, no topic keyword
+REACTION_TOPIC = "Experiencia"
+# Fallback topic for other comments without a topic keyword (never confident enough to skip the LLM)
+PRAISE_TOPIC = "Experiencia"
+
+_KNOWN_WORDS = (
+    STOPWORDS | NEGATORS | INTENSIFIERS | POSITIVE_WORDS | NEGATIVE_WORDS
+    | set().union(*TOPIC_KEYWORDS.values()) | {"?", "!"}
+)
+
+
+@dataclass
+class LocalClassification:
+    emotion: str
+    personality: str
+    topic: str
+    sentiment_score: float
+    confidence: float
+    raw_score: float = 0.0  # before calibration
+
+    def to_result(self, idx: int) -> dict:
+        """Same shape as an LLM classification result."""
+        return {
+            "idx": idx,
+            "emotion": self.emotion,
+            "personality": self.personality,
+            "topic": self.topic,
+            "sentiment_score": self.sentiment_score,
+            "confidence": round(self.confidence, 3),
+            "source": "local",
+        }
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+
+
+def tokenize(text: str) -> list[str]:
+    """Accent-stripped word tokens plus emoji tokens, in order."""
+    text = REPEAT_RE.sub(r"\1\1", (text or "").lower())
+    tokens = []
+    for match in WORD_OR_SYMBOL_RE.finditer(text):
+        token = match.group()
+        if token.isalpha():
+            token = _strip_accents(token)
+            if LAUGH_RE.match(token):
+                token = "jaja"
+            elif token not in _KNOWN_WORDS:
+                # "encantaa" -> "encanta" (REPEAT_RE keeps two copies for "ll"/"rr")
+                single = DOUBLE_RE.sub(r"\1", token)
+                if single in _KNOWN_WORDS:
+                    token = single
+        elif unicodedata.category(token) not in ("So", "Sk") and token not in ("$", "?", "!"):
+            continue  # punctuation
+        tokens.append(token)
+    return tokens
+
+
+def _calibration() -> Optional[tuple[float, float]]:
+    raw = getattr(settings, "LOCAL_CLASSIFIER_CALIBRATION", "")
+    if raw:
+        try:
+            a, b = (float(x) for x in raw.split(","))
+            return a, b
+        except ValueError:
+            pass
+    return None
+
+
+def calibrate(raw: float, params: Optional[tuple[float, float]] = None) -> float:
+    """sigmoid(a * raw + b) with a fitted (a, b); the raw score itself when there is none."""
+    params = params or _calibration()
+    if params is None:
+        return raw
+    a, b = params
+    return 1.0 / (1.0 + math.exp(-(a * raw + b)))
+
+
+def is_reaction(tokens: list[str]) -> bool:
+    """Only sentiment words, emoji, intensifiers and filler, with some sentiment."""
+    carriers = [t for t in tokens if t in POSITIVE_WORDS or t in NEGATIVE_WORDS or t in EMOJI_SENTIMENT or t == "jaja"]
+    filler = STOPWORDS | INTENSIFIERS | {"!"}
+    return bool(carriers) and all(t in filler for t in tokens if t not in carriers)
+
+
+def raw_confidence(tokens: list[str], pos: float, neg: float, topic_hits: dict[str, int], reaction: bool = False) -> float:
+    """Uncalibrated score in [0, 1] (see module docstring)."""
+    if not tokens:
+        return 0.0
+    explained = sum(1 for t in tokens if t in _KNOWN_WORDS or t in EMOJI_SENTIMENT or t == "jaja")
+    coverage = explained / len(tokens)
+
+    purity = 1.0 if not (pos and neg) else abs(pos - neg) / (pos + neg)
+
+    if topic_hits:
+        best = max(topic_hits.values())
+        topic_conf = 1.0 if list(topic_hits.values()).count(best) == 1 else 0.5
+    elif reaction:
+        topic_conf = 1.0
+    else:
+        # No topic keyword and not a pure reaction: PRAISE_TOPIC is only a guess,
+        # so these stay below any sensible threshold and go to the LLM
+        topic_conf = 0.3
+
+    length_penalty = 1.0 if len(tokens) <= 12 else 0.8
+    return coverage * (0.6 + 0.4 * purity) * topic_conf * length_penalty
+
+
+def classify_local(text: str) -> LocalClassification:
+    tokens = tokenize(text)
+    pos = neg = 0.0
+    scale = 1.0
+    negate = 0
+    topic_hits: dict[str, int] = {}
+
+    for token in tokens:
+        if token in NEGATORS:
+            negate = 3  # negation window: the next three tokens
+            if token == "nunca":
+                neg += 0.5
+            continue
+        if token in INTENSIFIERS:
+            scale = 1.5
+            continue
+
+        score = EMOJI_SENTIMENT.get(token, 0.0)
+        if token in POSITIVE_WORDS:
+            score = 1.0
+        elif token in NEGATIVE_WORDS:
+            score = -1.0
+        elif token == "jaja":
+            score = 0.5
+        if negate:
+            score = -score
+            negate -= 1
+        score *= scale
+        scale = 1.0
+        if score > 0:
+            pos += score
+        elif score < 0:
+            neg -= score
+
+        for topic, keywords in TOPIC_KEYWORDS.items():
+            if token in keywords:
+                topic_hits[topic] = topic_hits.get(topic, 0) + 1
+
+    total = pos - neg
+    sentiment = max(-1.0, min(1.0, 0.6 * total))
+    token_set = set(tokens)
+
+    if sentiment >= 0.3:
+        if token_set & SURPRISE_CUES:
+            emotion = "Sorpresa"
+        elif token_set & TRUST_CUES:
+            emotion = "Confianza"
+        else:
+            emotion = "Alegría"
+    elif sentiment <= -0.3:
+        if token_set & ANGER_CUES:
+            emotion = "Ira"
+        elif token_set & DISGUST_CUES:
+            emotion = "Aversión"
+        elif token_set & SADNESS_CUES:
+            emotion = "Tristeza"
+        else:
+            emotion = None  # negative, but which emotion is the LLM's call
+    else:
+        emotion = "Anticipación" if "?" in token_set else "Confianza"
+
+    personality = "Emocion" if token_set & EXCITEMENT_CUES else "Sinceridad"
+
+    reaction = not topic_hits and is_reaction(tokens)
+    if topic_hits:
+        topic = max(topic_hits, key=topic_hits.get)
+    else:
+        topic = REACTION_TOPIC if reaction else PRAISE_TOPIC
+
+    raw = raw_confidence(tokens, pos, neg, topic_hits, reaction)
+    # Neutral statements without a question or a topic are the LLM's job
+    if emotion == "Confianza" and not (pos or neg) and not topic_hits:
+        raw *= 0.5
+    # So are negative comments without an emotion cue: low-confidence neutral fallback
+    if emotion is None:
+        emotion = "Tristeza"
+        raw *= 0.5
+
+    return LocalClassification(
+        emotion=emotion,
+        personality=personality,
+        topic=topic,
+        sentiment_score=round(sentiment, 2),
+        confidence=calibrate(raw),
+        raw_score=raw,
+    )
+
+
+def route_comments(comments: list[str], threshold: Optional[float] = None) -> tuple[list[dict], list[tuple[int, str]]]:
+    """
+    Split comments into (local results, pending (idx, text) for the LLM).
+    Local results use the LLM result shape with the comment's index as `idx`.
+    """
+    if threshold is None:
+        threshold = settings.LOCAL_CLASSIFIER_THRESHOLD
+    if not settings.LOCAL_CLASSIFIER_ENABLED:
+        return [], list(enumerate(comments))
+
+    local: list[dict] = []
+    pending: list[tuple[int, str]] = []
+    for idx, text in enumerate(comments):
+        prediction = classify_local(text)
+        if prediction.confidence >= threshold:
+            local.append(prediction.to_result(idx))
+        else:
+            pending.append((idx, text))
+    return local, pending
@@ -0,0 +1,329 @@
+"""
+Metrics Service
+===============
+In-process instrumentation: counters, histograms and timing spans, exposed in
+Prometheus text format on GET /metrics.
+
+Values are recorded per process. With METRICS_DIR set (gunicorn.conf.py sets
+it whenever it runs several workers, and wipes it on startup), every worker
+writes a snapshot of its metrics there every METRICS_FLUSH_SECONDS, and /metrics
+answers with the sum of all the snapshots, whichever worker serves it. Snapshots
+of exited workers are kept, so counters never go backwards (the same rule as
+prometheus_client's multiprocess mode). The OTel export below is not affected.
+
+Optional OpenTelemetry export: when OTEL_EXPORTER_OTLP_ENDPOINT is set and the
+opentelemetry SDK + OTLP/HTTP exporter are installed, every `span()` is also
+sent as a trace span to that collector.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_FLUSH_SECONDS = 5
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Tenant (client_id) of the work in progress; used as a label on LLM metrics
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default="unknown")
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(total: dict, dumped: list):
+        for key, value in dumped:
+            total[tuple(key)] = total.get(tuple(key), 0) + value
+
+    def render(self, values: Optional[dict] = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted((self._values if values is None else values).items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}  # key -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            if idx < len(self.buckets):
+                series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._series.items()]
+
+    @staticmethod
+    def merge(total: dict, dumped: list):
+        for key, (counts, subtotal, count) in dumped:
+            series = total.setdefault(tuple(key), [[0] * len(counts), 0.0, 0])
+            series[0] = [a + b for a, b in zip(series[0], counts)]
+            series[1] += subtotal
+            series[2] += count
+
+    def render(self, series: Optional[dict] = None) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (bucket_counts, total, count) in sorted((self._series if series is None else series).items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, bucket_counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# =============================================================================
+# METRIC DEFINITIONS
+# =============================================================================
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "pixely_pipeline_stage_seconds", "Duration of each analysis pipeline stage", ("stage", "status")
+)
+DB_QUERY_SECONDS = Histogram(
+    "pixely_db_query_seconds", "Duration of SupabaseService calls", ("operation",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+LLM_REQUEST_SECONDS = Histogram(
+    "pixely_llm_request_seconds", "LLM completion latency", ("model", "tenant", "status")
+)
+LLM_TOKENS_TOTAL = Counter(
+    "pixely_llm_tokens_total", "LLM tokens consumed", ("model", "tenant", "kind")
+)
+CLASSIFIED_ITEMS_TOTAL = Counter(
+    "pixely_classified_items_total", "Comments classified, by tier", ("tier",)
+)
+IMAGE_GENERATION_SECONDS = Histogram(
+    "pixely_image_generation_seconds", "Image generation duration", ("model", "resolution", "status")
+)
+
+REGISTRY = [
+    PIPELINE_STAGE_SECONDS,
+    DB_QUERY_SECONDS,
+    LLM_REQUEST_SECONDS,
+    LLM_TOKENS_TOTAL,
+    CLASSIFIED_ITEMS_TOTAL,
+    IMAGE_GENERATION_SECONDS,
+]
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(settings.METRICS_DIR, f"worker-{pid}.json")
+
+
+def flush_snapshot():
+    """Write this worker's metrics to METRICS_DIR (atomic replace)."""
+    if not settings.METRICS_DIR:
+        return
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp = f"{path}.{threading.get_ident()}.tmp"  # the periodic flush and a scrape may overlap
+    with open(tmp, "w") as f:
+        json.dump({metric.name: metric.dump() for metric in REGISTRY}, f)
+    os.replace(tmp, path)
+
+
+def _merged_snapshots() -> dict[str, dict]:
+    merged: dict[str, dict] = {metric.name: {} for metric in REGISTRY}
+    by_name = {metric.name: metric for metric in REGISTRY}
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not (entry.name.startswith("worker-") and entry.name.endswith(".json")):
+            continue
+        try:
+            with open(entry.path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Skipping metrics snapshot {entry.name}: {e}")
+            continue
+        for name, dumped in snapshot.items():
+            if name in by_name:
+                by_name[name].merge(merged[name], dumped)
+    return merged
+
+
+def render_prometheus() -> str:
+    lines: list[str] = []
+    if settings.METRICS_DIR:
+        # Every worker's share comes from its snapshot file, this one's included:
+        # mixing live and snapshot values would make totals dip between scrapes
+        flush_snapshot()
+        merged = _merged_snapshots()
+        for metric in REGISTRY:
+            lines.extend(metric.render(merged[metric.name]))
+    else:
+        for metric in REGISTRY:
+            lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def flush_snapshots_periodically():
+    """Lifespan task (METRICS_DIR set): keep this worker's snapshot fresh."""
+    while True:
+        await asyncio.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            flush_snapshot()
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write metrics snapshot: {e}")
+
+
+# =============================================================================
+# TRACING (optional OpenTelemetry)
+# =============================================================================
+
+_tracer = None
+
+
+def setup_tracing():
+    """Configure OTLP/HTTP export if an endpoint is set and the SDK is installed."""
+    global _tracer
+    if not settings.OTEL_EXPORTER_OTLP_ENDPOINT or _tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT set but opentelemetry-sdk / exporter not installed")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}))
+    endpoint = settings.OTEL_EXPORTER_OTLP_ENDPOINT.rstrip("/") + "/v1/traces"
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("pixely.backend")
+    logger.info(f"OpenTelemetry tracing enabled -> {endpoint}")
+
+
+@contextmanager
+def span(name: str, histogram: Optional[Histogram] = None, **labels):
+    """
+    Time a block. Records into `histogram` (with a status label when the
+    histogram has one) and emits an OTel span when tracing is enabled.
+    """
+    start = time.perf_counter()
+    status = "ok"
+    exc_info = (None, None, None)
+    otel_cm = _tracer.start_as_current_span(name, attributes={k: str(v) for k, v in labels.items()}) if _tracer else None
+    if otel_cm:
+        otel_cm.__enter__()
+    try:
+        yield
+    except BaseException as e:
+        status = "error"
+        exc_info = (type(e), e, e.__traceback__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if histogram is not None:
+            if "status" in histogram.labelnames:
+                labels["status"] = status
+            histogram.observe(elapsed, **labels)
+        if otel_cm:
+            # With the exception, OTel records it and marks the span as ERROR
+            otel_cm.__exit__(*exc_info)
+
+
+def pipeline_stage(stage: str):
+    return span(f"pipeline.{stage}", PIPELINE_STAGE_SECONDS, stage=stage)
+
+
+def record_llm_usage(model: str, usage, tenant: Optional[str] = None):
+    """Count prompt/completion tokens from an OpenAI `usage` object."""
+    if usage is None:
+        return
+    tenant = tenant or current_tenant.get()
+    LLM_TOKENS_TOTAL.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, tenant=tenant, kind="prompt")
+    LLM_TOKENS_TOTAL.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, tenant=tenant, kind="completion")
+    cached = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+    if cached:
+        LLM_TOKENS_TOTAL.inc(cached, model=model, tenant=tenant, kind="cached_prompt")
+
+
+def _timed(fn, histogram: Histogram, operation: str):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with histogram.time(operation=operation):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with histogram.time(operation=operation):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def instrument_methods(histogram: Histogram):
+    """Class decorator: time every public method of the class into `histogram`."""
+    def decorate(cls):
+        for name, fn in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(fn):
+                continue
+            setattr(cls, name, _timed(fn, histogram, name))
+        return cls
+    return decorate
@@ -23,10 +23,10 @@ import os
 import json
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
-from PIL import Image
 import io
 
 from .database import db
+from .metrics import span, IMAGE_GENERATION_SECONDS
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -217,8 +217,16 @@ class NanoBananaServiceV2:
     VALID_RESOLUTIONS = ['1K', '2K', '4K']
     
     def __init__(self):
-        self.client = None
-        self._configure_client()
+        self._client = None
+        self._client_configured = False
+    
+    @property
+    def client(self):
+        """google.genai Client, built on first use (the SDK import is slow)."""
+        if not self._client_configured:
+            self._client_configured = True
+            self._configure_client()
+        return self._client
     
     def _configure_client(self):
         """Configure the Google GenAI client (new google.genai package)"""
@@ -231,7 +239,7 @@ class NanoBananaServiceV2:
                 return
             
             # New API uses Client() with api_key parameter
-            self.client = genai.Client(api_key=api_key)
+            self._client = genai.Client(api_key=api_key)
             logger.info("✅ NanoBanana client configured (google.genai native image generation)")
             
         except Exception as e:
@@ -328,14 +336,15 @@ class NanoBananaServiceV2:
         # 8. Call NanoBanana API
         start_time = datetime.now()
         
-        image_data, thinking_images, revised_prompt = await self._call_gemini_image_api(
-            prompt=final_prompt,
-            reference_images=reference_images,
-            product_image=product_image,
-            aspect_ratio=aspect_ratio,
-            resolution=resolution,
-            model_key=model_key
-        )
+        with span("image.generate", IMAGE_GENERATION_SECONDS, model=model_config['id'], resolution=resolution):
+            image_data, thinking_images, revised_prompt = await self._call_gemini_image_api(
+                prompt=final_prompt,
+                reference_images=reference_images,
+                product_image=product_image,
+                aspect_ratio=aspect_ratio,
+                resolution=resolution,
+                model_key=model_key
+            )
         
         generation_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
         logger.info(f"   Generation took: {generation_time_ms}ms")
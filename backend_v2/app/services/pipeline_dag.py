@@ -0,0 +1,111 @@
+"""
+Pipeline DAG Executor
+=====================
+Runs async stages that declare their inputs by name. Every stage starts as soon
+as all of its inputs are available, so independent stages (DB loads, LLM calls)
+overlap.
+
+- `fn` receives the input values as keyword arguments. Plain functions (the
+  Supabase client is synchronous) run in a worker thread.
+- `timeout` bounds the stage (seconds, None = unbounded).
+- `required=False` stages don't fail the run: on error or timeout they resolve
+  to `default` and dependants carry on.
+
+Each stage is timed with metrics.pipeline_stage under its own name.
+"""
+
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from .metrics import pipeline_stage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[..., Any]
+    inputs: tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    required: bool = True
+    default: Any = None
+
+
+class StageFailed(Exception):
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+def _check_graph(stages: list[Stage], initial: dict):
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate stage names")
+    known = set(names) | set(initial)
+    for stage in stages:
+        missing = [i for i in stage.inputs if i not in known]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' has unknown inputs: {missing}")
+
+    # Kahn's algorithm over the stage-to-stage edges
+    pending = {s.name: {i for i in s.inputs if i not in initial} for s in stages}
+    while pending:
+        ready = [n for n, deps in pending.items() if not deps]
+        if not ready:
+            raise ValueError(f"Cycle between stages: {sorted(pending)}")
+        for n in ready:
+            del pending[n]
+        for deps in pending.values():
+            deps.difference_update(ready)
+
+
+async def _call(stage: Stage, kwargs: dict) -> Any:
+    if inspect.iscoroutinefunction(stage.fn):
+        call = stage.fn(**kwargs)
+    else:
+        call = asyncio.to_thread(stage.fn, **kwargs)
+    return await asyncio.wait_for(call, timeout=stage.timeout)
+
+
+async def run_dag(stages: list[Stage], initial: Optional[dict] = None, label: str = "") -> dict[str, Any]:
+    """Run every stage; returns {name: result} (including `initial`)."""
+    initial = dict(initial or {})
+    _check_graph(stages, initial)
+
+    loop = asyncio.get_running_loop()
+    futures: dict[str, asyncio.Future] = {name: loop.create_future() for name in initial}
+    for name, value in initial.items():
+        futures[name].set_result(value)
+    futures.update({s.name: loop.create_future() for s in stages})
+
+    async def run(stage: Stage):
+        kwargs = {}
+        for name in stage.inputs:
+            kwargs[name] = await futures[name]
+        try:
+            with pipeline_stage(stage.name):
+                result = await _call(stage, kwargs)
+        except Exception as e:
+            if stage.required:
+                raise StageFailed(stage.name, e) from e
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"failed: {e}"
+            logger.warning(f"⚠️ {label}Optional stage '{stage.name}' {reason}; using default",
+                           extra={"stage": stage.name})
+            result = stage.default
+        futures[stage.name].set_result(result)
+
+    tasks = [asyncio.create_task(run(s), name=f"stage:{s.name}") for s in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # Let cancelled stages unwind before the error propagates
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,309 @@
+"""
+Response Cache
+==============
+HTTP response caching for read-mostly GET endpoints.
+
+- Per-route policies (TTL, browser max-age, invalidation tag).
+- Strong ETags from a content hash (or the ETag the endpoint already set).
+- If-None-Match -> 304 without re-running the endpoint.
+- gzip / brotli variants computed once per cached entry.
+
+Writes that change the underlying data call `response_cache.invalidate(tag)`
+(see SupabaseService), TTLs bound staleness for anything else.
+
+Entries live in a per-process LRU. With a shared STATE_BACKEND (sqlite/redis)
+they are also written to the state store, and invalidation bumps a per-tag
+version there, so every worker stops serving stale entries at once.
+"""
+
+import gzip
+import hashlib
+import logging
+import pickle
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Optional
+
+from .state_store import StateBackend, MemoryBackend, get_state_store
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli  # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+MAX_ENTRIES = 512
+
+
+@dataclass
+class CachePolicy:
+    """Caching rule for one GET route."""
+    path: str                     # e.g. "/brand/{client_id}"
+    ttl: int                      # seconds the server-side entry stays fresh
+    tag: str                      # invalidation tag, may use path params: "brand:{client_id}"
+    browser_max_age: int = 0      # Cache-Control max-age (0 = always revalidate with ETag)
+    pattern: re.Pattern = field(init=False, repr=False)
+
+    def __post_init__(self):
+        regex = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", self.path)
+        self.pattern = re.compile(f"^{regex}$")
+
+    def match(self, path: str) -> Optional[dict]:
+        m = self.pattern.match(path)
+        return m.groupdict() if m else None
+
+
+CACHE_POLICIES = [
+    CachePolicy("/semantic/analysis/{client_id}", ttl=300, tag="analysis:{client_id}"),
+    CachePolicy("/brand/{client_id}", ttl=120, tag="brand:{client_id}"),
+    CachePolicy("/strategy/{client_id}", ttl=120, tag="strategy:{client_id}"),
+    CachePolicy("/studio/generation-options", ttl=600, tag="studio:templates", browser_max_age=300),
+    CachePolicy("/studio/templates", ttl=600, tag="studio:templates", browser_max_age=300),
+    CachePolicy("/tts/voices", ttl=86400, tag="tts:voices", browser_max_age=86400),
+]
+
+
+@dataclass
+class CacheEntry:
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+    etag: str
+    tag: str
+    expires_at: float             # wall clock (time.time), comparable across workers
+    browser_max_age: int
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        """Body for the given Content-Encoding, compressed once and memoized."""
+        if encoding is None:
+            return self.body
+        if encoding not in self.encoded:
+            if encoding == "br":
+                self.encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self.encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self.encoded[encoding]
+
+
+class ResponseCache:
+    """Rendered responses keyed by tag version + path + query string."""
+
+    def __init__(self, policies: list[CachePolicy], max_entries: int = MAX_ENTRIES,
+                 store: Optional[StateBackend] = None):
+        self.policies = policies
+        self.max_entries = max_entries
+        self._store = store
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    @property
+    def store(self) -> StateBackend:
+        return self._store or get_state_store()
+
+    @property
+    def shared(self) -> bool:
+        """Entries are mirrored to the store only when other workers can read them."""
+        return not isinstance(self.store, MemoryBackend)
+
+    def policy_for(self, path: str) -> tuple[Optional[CachePolicy], dict]:
+        for policy in self.policies:
+            params = policy.match(path)
+            if params is not None:
+                return policy, params
+        return None, {}
+
+    def tag_version(self, tag: str) -> int:
+        """Bumped by every invalidate(tag); usable as a data version by other caches."""
+        version = self.store.get(f"rc:tagver:{tag}")
+        return int(version) if version else 0
+
+    def key_for(self, tag: str, path_and_query: str) -> str:
+        return f"rc:{tag}:{self.tag_version(tag)}:{path_and_query}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None and self.shared:
+            raw = self.store.get(key)
+            if raw is not None:
+                entry = pickle.loads(raw)
+                self._remember(key, entry)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        self._remember(key, entry)
+        if self.shared:
+            ttl = entry.expires_at - time.time()
+            if ttl > 0:
+                self.store.set(key, pickle.dumps(replace(entry, encoded={})), ttl=ttl)
+
+    def _remember(self, key: str, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, tag: str):
+        """Drop every entry stored under `tag` (e.g. "brand:<client_id>") in all workers."""
+        self.store.incr(f"rc:tagver:{tag}")
+        stale = [key for key, entry in self._entries.items() if entry.tag == tag]
+        for key in stale:
+            del self._entries[key]
+        logger.debug(f"Response cache: invalidated {tag} ({len(stale)} local entries)")
+
+    def invalidate_client(self, client_id: str, *kinds: str):
+        for kind in kinds:
+            self.invalidate(f"{kind}:{client_id}")
+
+    def clear(self):
+        self._entries.clear()
+
+
+response_cache = ResponseCache(CACHE_POLICIES)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _pick_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class ResponseCacheMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware body buffering for uncached routes).
+    Register it before CORSMiddleware so CORS headers are added per request,
+    not stored in the cache.
+    """
+
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        policy, params = self.cache.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        query = scope.get("query_string", b"").decode("latin-1")
+        tag = policy.tag.format(**params)
+        key = self.cache.key_for(tag, f"{scope['path']}?{query}")
+
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = await self._render(scope, receive, send, policy, tag)
+            if entry is None:
+                # Non-200 response already forwarded as-is
+                return
+            self.cache.set(key, entry)
+
+        await self._send_entry(entry, headers, scope["method"], send)
+
+    async def _render(self, scope, receive, send, policy: CachePolicy, tag: str) -> Optional[CacheEntry]:
+        """Run the endpoint and capture a 200 response; forward anything else untouched."""
+        start_message: dict = {}
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def capture(message):
+            nonlocal passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message.update(message)
+            elif message["type"] == "http.response.body":
+                if passthrough:
+                    await send(message)
+                    return
+                chunks.append(message.get("body", b""))
+
+        # Render with identity encoding so the stored body is canonical
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for k, v in scope["headers"]
+            if k.lower() not in (b"if-none-match", b"accept-encoding")
+        ]
+        await self.app(scope, receive, capture)
+
+        if passthrough or not start_message:
+            return None
+
+        body = b"".join(chunks)
+        stored_headers = [
+            (k, v) for k, v in start_message.get("headers", [])
+            if k.lower() not in (b"content-length", b"etag", b"cache-control", b"vary")
+        ]
+        existing_etag = next(
+            (v.decode("latin-1") for k, v in start_message.get("headers", []) if k.lower() == b"etag"),
+            None
+        )
+        etag = existing_etag or f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+        return CacheEntry(
+            status=200,
+            headers=stored_headers,
+            body=body,
+            etag=etag,
+            tag=tag,
+            expires_at=time.time() + policy.ttl,
+            browser_max_age=policy.browser_max_age
+        )
+
+    async def _send_entry(self, entry: CacheEntry, request_headers: dict, method: str, send):
+        encoding = None
+        if len(entry.body) >= MIN_COMPRESS_BYTES:
+            encoding = _pick_encoding(request_headers.get("accept-encoding", ""))
+
+        # Strong ETags must differ per representation: "<hash>" / "<hash>-gzip" / "<hash>-br"
+        etag = f'{entry.etag[:-1]}-{encoding}"' if encoding else entry.etag
+        common = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", f"private, max-age={entry.browser_max_age}, must-revalidate".encode("latin-1")),
+            (b"vary", b"Accept-Encoding"),
+        ]
+
+        if_none_match = request_headers.get("if-none-match")
+        if any(
+            _etag_matches(if_none_match, tag)
+            for tag in (entry.etag, f'{entry.etag[:-1]}-gzip"', f'{entry.etag[:-1]}-br"')
+        ):
+            await send({"type": "http.response.start", "status": 304, "headers": common})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.variant(encoding)
+
+        out_headers = entry.headers + common + [(b"content-length", str(len(body)).encode("latin-1"))]
+        if encoding:
+            out_headers.append((b"content-encoding", encoding.encode("latin-1")))
+
+        await send({"type": "http.response.start", "status": entry.status, "headers": out_headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
@@ -0,0 +1,102 @@
+"""
+Scrape State
+============
+What we last saw of each Instagram profile, so re-analyses only pay Apify for
+what changed:
+
+    scrape:state:<normalized profile url> -> {
+        "high_water": {"shortCode", "timestamp"},   # newest post seen
+        "posts": {shortCode: {"hash", "post"}},       # the analysis window
+        "limit", "full_at", "updated_at"
+    }
+
+`hash` is a content hash of the post's caption + latestComments: a re-fetched
+post with the same hash is "unchanged" and its stored classifications can be
+reused. Posts older than SCRAPE_REFRESH_HOURS are not re-fetched at all.
+
+The state lives in the shared state store and expires after
+SCRAPE_FULL_REFRESH_DAYS, which also forces a periodic full scrape (drops
+deleted posts, picks up late comments on old posts).
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from ..config import settings
+from .state_store import get_state_store
+
+logger = logging.getLogger(__name__)
+
+# Post fields kept in the state (enough to rebuild the items and the stats)
+POST_FIELDS = (
+    "id", "shortCode", "url", "type", "caption", "hashtags", "mentions", "commentsCount",
+    "likesCount", "timestamp", "ownerUsername", "latestComments",
+)
+
+
+def normalize_profile_url(profile_url: str) -> str:
+    """'instagram.com/Nike/?hl=es' -> 'https://www.instagram.com/nike'"""
+    raw = (profile_url or "").strip()
+    parsed = urlparse(raw if "://" in raw else f"https://{raw}")
+    host = parsed.netloc.lower().removeprefix("www.")
+    path = parsed.path.strip("/").lower()
+    if host == "instagram.com":
+        host = "www.instagram.com"
+    return f"https://{host}/{path}" if path else f"https://{host}"
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Apify ISO timestamp -> aware UTC datetime."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def content_hash(post: dict) -> str:
+    comments = [
+        (c.get("id"), c.get("ownerUsername"), c.get("text"))
+        for c in post.get("latestComments") or []
+    ]
+    payload = json.dumps([post.get("caption") or "", comments], ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def trim_post(post: dict) -> dict:
+    return {k: post[k] for k in POST_FIELDS if k in post}
+
+
+def _key(profile_url: str) -> str:
+    return f"scrape:state:{normalize_profile_url(profile_url)}"
+
+
+def load(profile_url: str) -> Optional[dict]:
+    try:
+        return get_state_store().get_json(_key(profile_url))
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read scrape state for {profile_url}: {e}")
+        return None
+
+
+def save(profile_url: str, state: dict):
+    try:
+        get_state_store().set_json(_key(profile_url), state, ttl=settings.SCRAPE_FULL_REFRESH_DAYS * 86400)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not save scrape state for {profile_url}: {e}")
+
+
+def needs_full_scrape(state: Optional[dict], limit: int) -> bool:
+    if not settings.SCRAPE_INCREMENTAL or not state or not state.get("posts"):
+        return True
+    if state.get("limit", 0) < limit:
+        return True
+    full_at = parse_timestamp(state.get("full_at"))
+    age_days = (datetime.now(timezone.utc) - full_at).total_seconds() / 86400 if full_at else None
+    return age_days is None or age_days >= settings.SCRAPE_FULL_REFRESH_DAYS
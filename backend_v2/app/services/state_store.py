@@ -0,0 +1,429 @@
+"""
+Shared State Store
+==================
+Small key/value store with TTLs for state that must be shared between worker
+processes (response-cache entries and tag versions, pipeline job progress).
+
+Backends (STATE_BACKEND):
+- memory: per-process dict. Default; correct only with a single worker.
+- sqlite: one file shared by every worker on the host (STATE_SQLITE_PATH), WAL mode.
+- redis:  any Redis-compatible server (REDIS_URL); needs `pip install redis`.
+
+Values are bytes; `get_json` / `set_json` are provided for structured state.
+`claim_inflight` / `release_inflight` build a single-flight registry on `add`
+and `delete_if` (one running job per key, e.g. one pipeline per client + profile).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis  # Optional: pip install redis
+except ImportError:
+    redis = None
+
+
+class StateBackend(ABC):
+    """Interface shared by all backends. TTLs are in seconds (None = no expiry)."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Set only if the key is absent (or expired). Returns True if it was set."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def delete_if(self, key: str, value: bytes) -> bool:
+        """Delete only if the key currently holds `value` (atomic). Returns True if deleted."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def keys(self, prefix: str) -> list[str]:
+        """Live keys starting with `prefix` (for small indexes, not hot paths)."""
+
+    def purge_expired(self) -> int:
+        """Drop expired entries; returns how many. No-op where the server expires keys itself."""
+        return 0
+
+    def get_json(self, key: str) -> Optional[Any]:
+        raw = self.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set_json(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.set(key, json.dumps(value, default=str).encode("utf-8"), ttl)
+
+
+class MemoryBackend(StateBackend):
+    """
+    Two maps: cache entries (CACHE_PREFIXES) in an LRU capped at `max_entries`,
+    everything else (job state, inflight claims, run records, tag versions) kept
+    until it expires, so cache churn can never evict a running job's state.
+    """
+
+    CACHE_PREFIXES = ("rc:", "interp:", "scrape:")
+    PINNED_PREFIXES = ("rc:tagver:",)  # a lost tag version would resurrect old cache entries
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._pinned: dict[str, tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _map(self, key: str) -> dict:
+        if key.startswith(self.CACHE_PREFIXES) and not key.startswith(self.PINNED_PREFIXES):
+            return self._cache
+        return self._pinned
+
+    def _live(self, key: str) -> Optional[bytes]:
+        data = self._map(key)
+        item = data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.time():
+            del data[key]
+            return None
+        if data is self._cache:
+            self._cache.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: bytes, ttl: Optional[float]):
+        data = self._map(key)
+        data[key] = (value, time.time() + ttl if ttl else None)
+        if data is self._cache:
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._map(key).pop(key, None)
+
+    def delete_if(self, key, value):
+        with self._lock:
+            if self._live(key) != value:
+                return False
+            del self._map(key)[key]
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            current = int(self._live(key) or 0) + 1
+            self._store(key, str(current).encode(), None)
+            return current
+
+    def keys(self, prefix):
+        with self._lock:
+            now = time.time()
+            return [
+                key for data in (self._cache, self._pinned) for key, (_, expires_at) in data.items()
+                if key.startswith(prefix) and (expires_at is None or expires_at >= now)
+            ]
+
+    def purge_expired(self):
+        with self._lock:
+            now = time.time()
+            purged = 0
+            for data in (self._cache, self._pinned):
+                expired = [key for key, (_, expires_at) in data.items() if expires_at is not None and expires_at < now]
+                for key in expired:
+                    del data[key]
+                purged += len(expired)
+            return purged
+
+
+class SQLiteBackend(StateBackend):
+    """File-backed store; one connection per thread, safe across forked workers."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        pid = os.getpid()
+        if conn is None or self._local.pid != pid:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = pid
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl=None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None)
+        )
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM kv WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl if ttl else None)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return inserted == 1
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def delete_if(self, key, value):
+        return self._conn().execute(
+            "DELETE FROM kv WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, value, time.time())
+        ).rowcount == 1
+
+    def incr(self, key):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            current = int(row[0]) + 1 if row else 1
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, NULL)",
+                (key, str(current).encode())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return current
+
+    def keys(self, prefix):
+        rows = self._conn().execute(
+            "SELECT key FROM kv WHERE substr(key, 1, ?) = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (len(prefix), prefix, time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        return self._conn().execute(
+            "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+
+class RedisBackend(StateBackend):
+    # GET + DEL in one server-side step (compare-and-delete)
+    DELETE_IF_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("STATE_BACKEND=redis requires the 'redis' package")
+        self.url = url
+        self._client = None
+        self._pid = None
+
+    @property
+    def client(self):
+        # Reconnect after fork: sockets must not be shared between workers
+        if self._client is None or self._pid != os.getpid():
+            self._client = redis.Redis.from_url(self.url)
+            self._pid = os.getpid()
+        return self._client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, nx=True, px=int(ttl * 1000) if ttl else None))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def delete_if(self, key, value):
+        return bool(self.client.eval(self.DELETE_IF_SCRIPT, 1, key, value))
+
+    def incr(self, key):
+        return int(self.client.incr(key))
+
+    def keys(self, prefix):
+        pattern = "".join(f"\\{c}" if c in "*?[]\\" else c for c in prefix) + "*"
+        return [key.decode("utf-8") for key in self.client.scan_iter(match=pattern, count=500)]
+
+
+def _build_backend() -> StateBackend:
+    kind = settings.STATE_BACKEND.lower()
+    if kind == "sqlite":
+        path = settings.STATE_SQLITE_PATH or os.path.join(tempfile.gettempdir(), "pixely_state.sqlite3")
+        logger.info(f"State store: sqlite ({path})")
+        return SQLiteBackend(path)
+    if kind == "redis":
+        logger.info("State store: redis")
+        return RedisBackend(settings.REDIS_URL)
+    if kind != "memory":
+        logger.warning(f"Unknown STATE_BACKEND '{settings.STATE_BACKEND}', using memory")
+    return MemoryBackend()
+
+
+_state_store: Optional[StateBackend] = None
+
+
+def get_state_store() -> StateBackend:
+    """Process-wide store instance, created on first use."""
+    global _state_store
+    if _state_store is None:
+        _state_store = _build_backend()
+    return _state_store
+
+
+async def purge_expired_periodically():
+    """
+    Lifespan task: expired entries are only skipped on read, so without this the
+    sqlite file keeps every old cache version, scrape and job record. Every worker
+    runs it; the deletes are idempotent.
+    """
+    while True:
+        await asyncio.sleep(settings.STATE_PURGE_SECONDS)
+        try:
+            purged = await asyncio.to_thread(get_state_store().purge_expired)
+            if purged:
+                logger.info(f"🧹 State store: purged {purged} expired entries")
+        except Exception as e:
+            logger.warning(f"⚠️ State store purge failed: {e}")
+
+
+# =============================================================================
+# Job state (background pipeline progress, visible from any worker)
+# =============================================================================
+
+JOB_TTL_SECONDS = 24 * 3600
+
+
+def set_job_state(job_id: str, status: str, progress: int, message: Optional[str] = None, **extra):
+    get_state_store().set_json(
+        f"job:{job_id}",
+        {"status": status, "progress": progress, "message": message, "updated_at": time.time(), **extra},
+        ttl=JOB_TTL_SECONDS
+    )
+
+
+def get_job_state(job_id: str) -> Optional[dict]:
+    return get_state_store().get_json(f"job:{job_id}")
+
+
+def delete_job_state(job_id: str):
+    get_state_store().delete(f"job:{job_id}")
+
+
+# =============================================================================
+# Single-flight registry (one running job per key, shared by all workers)
+# =============================================================================
+
+INFLIGHT_TTL_SECONDS = 3600  # upper bound if a worker dies without releasing
+TERMINAL_JOB_STATES = ("COMPLETED", "ERROR")
+
+
+def claim_inflight(key: str, job_id: str, ttl: float = INFLIGHT_TTL_SECONDS) -> Optional[str]:
+    """
+    Register `job_id` as the running job for `key`. Returns None when claimed,
+    or the id of the job already running for `key` (nothing is registered then).
+    The job state of `job_id` must exist before claiming: entries whose job is
+    gone or finished are treated as stale and taken over. The takeover is a
+    compare-and-delete, so two claimers can't both replace the same stale entry.
+    """
+    store = get_state_store()
+    inflight_key = f"inflight:{key}"
+    for _ in range(3):
+        if store.add(inflight_key, job_id.encode("utf-8"), ttl):
+            return None
+        raw = store.get(inflight_key)
+        if raw is None:  # expired in between
+            continue
+        running = raw.decode("utf-8")
+        job = get_job_state(running)
+        if job and job.get("status") not in TERMINAL_JOB_STATES:
+            return running
+        store.delete_if(inflight_key, raw)  # lost the race: the next add() sees the winner
+    logger.warning(f"⚠️ Could not claim single-flight key {key}; running without it")
+    return None
+
+
+def refresh_inflight(key: str, job_id: str, ttl: float = INFLIGHT_TTL_SECONDS) -> bool:
+    """
+    Restart the TTL of `job_id`'s registration (jobs that resume after a long
+    wait, like async Apify runs). Returns False if `key` is held by another job.
+    """
+    store = get_state_store()
+    inflight_key = f"inflight:{key}"
+    value = job_id.encode("utf-8")
+    if store.add(inflight_key, value, ttl):
+        return True  # had expired: registered again
+    if store.get(inflight_key) != value:
+        return False
+    store.set(inflight_key, value, ttl)
+    return True
+
+
+def release_inflight(key: str, job_id: str):
+    """Drop the registration, if it is still `job_id`'s."""
+    get_state_store().delete_if(f"inflight:{key}", job_id.encode("utf-8"))
@@ -0,0 +1,329 @@
+"""
+Strategy Generator (two phases)
+===============================
+Builds the strategy tree consumed by aggregator.convert_tree_to_nodes:
+
+    {"root_label", "objectives": [{"title", "rationale", "strategies": [{"title", "concepts": [...]}]}]}
+
+Phase 1 (skeleton): one short completion with the objectives and their strategies.
+Phase 2 (concepts): one completion per strategy, in parallel (STRATEGY_CONCURRENCY),
+    each returning that strategy's content archetypes.
+
+Every branch is validated on its own. Only the branches that fail (bad JSON,
+too few valid concepts) are retried, up to STRATEGY_BRANCH_RETRIES times. A
+branch that still fails keeps its strategy node with no concepts, so one bad
+completion never discards the whole tree.
+
+The client context (interview + analysis insights) is the system message of
+every call, so the parallel calls share a cacheable prompt prefix.
+
+The skeleton is streamed: each objective is parsed out of the partial JSON as
+soon as its closing brace arrives, and its strategies start expanding while the
+model is still writing the next objective. `stream_strategy_tree` exposes this
+as events (objective / concepts / done) for the SSE endpoint;
+`generate_strategy_tree` just waits for the final tree.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Optional
+
+from ..config import settings
+from .gemini_service import _call_gemini, _stream_gemini, _format_interview_data
+from .json_stream import JsonArrayItems
+
+logger = logging.getLogger(__name__)
+
+ROOT_LABEL = "Proyecto Marketing"
+MAIN_OBJECTIVE = "Objetivo Principal"
+SECONDARY_OBJECTIVE = "Objetivo Secundario"
+MIN_OBJECTIVES = 3
+MIN_STRATEGIES = 2
+MIN_CONCEPTS = 3
+MIN_HOOKS = 4
+FORMATS = {"post", "story", "reel", "carousel", "video", "live"}
+FREQUENCIES = {"high", "medium", "low"}
+
+STRATEGY_SYSTEM_PROMPT = """Eres un ESTRATEGA SENIOR DE CONTENIDOS con experiencia profunda en marketing digital y creación de contenido viral.
+Estás construyendo el PLAYBOOK ESTRATÉGICO de la marca: la "Constitución" de su contenido.
+⚠️ CRÍTICO: NUNCA generes posts específicos, solo ARQUETIPOS DE CONTENIDO (plantillas reutilizables).
+Responde ÚNICAMENTE con un objeto JSON válido.
+
+🎯 CONTEXTO ESTRATÉGICO:
+
+**ENTREVISTA COMPLETA (Objetivos, Audiencia, Diferenciadores):**
+{interview_context}
+
+**ANÁLISIS DE DATOS (Insights de Redes Sociales):**
+{analysis_insights}
+
+**PLAN DEL CLIENTE:** {plan_type}
+**NOMBRE DE LA MARCA:** {brand_name}
+"""
+
+SKELETON_PROMPT = """FASE 1 — ESQUELETO DEL PLAYBOOK.
+
+1. **OBJETIVOS ESTRATÉGICOS** (mínimo {min_objectives}):
+   - Extrae TODOS los objetivos de negocio de la entrevista.
+   - El MÁS CRÍTICO es el "{main}"; los demás son "{secondary}".
+   - `rationale`: por qué es importante, cruzando entrevista y datos (2-3 frases).
+2. **ESTRATEGIAS TÁCTICAS** (2-3 por objetivo, mínimo {min_strategies}):
+   - `title`: "Estrategia: [Nombre Específico y Accionable]".
+   - `angle`: el ángulo DIFERENCIADOR y el "por qué" estratégico (1-2 frases).
+
+NO incluyas conceptos todavía.
+
+JSON:
+{{"objectives": [{{"title": "{main}", "rationale": "...", "strategies": [{{"title": "Estrategia: ...", "angle": "..."}}]}}]}}
+"""
+
+CONCEPTS_PROMPT = """FASE 2 — ARQUETIPOS DE CONTENIDO para UNA estrategia.
+
+OBJETIVO: {objective_title} — {objective_rationale}
+ESTRATEGIA: {strategy_title}
+ÁNGULO: {strategy_angle}
+Otras estrategias del plan (no repitas sus ideas): {sibling_titles}
+
+Genera 3-4 arquetipos. Para cada uno:
+- `label`: nombre memorable y específico (2-4 palabras), sin el prefijo "Concepto:".
+- `description`: qué es y qué logra (2-3 frases DESCRIPTIVAS).
+- `strategic_rationale`: por qué es CRÍTICO para el objetivo (1-2 frases).
+- `execution_guidelines`:
+  * `structure`: estructura narrativa paso a paso (ej: "Hook emocional (3s) → Problema (10s) → Solución (20s) → CTA (5s)").
+  * `key_elements`: 3-4 elementos OBLIGATORIOS.
+  * `dos`: 3-4 mejores prácticas ESPECÍFICAS.
+  * `donts`: 3-4 errores ESPECÍFICOS a evitar.
+- `creative_hooks`: 4-6 hooks ESPECÍFICOS y DIRECTAMENTE USABLES
+  (ej: "Pensé que era imposible hasta que probé [producto]..." y NO "Hook emocional").
+- `suggested_format`: post | story | reel | carousel | video | live
+- `suggested_frequency`: high (3-4/semana) | medium (1-2/semana) | low (1-2/mes)
+- `tags`: 2-3 etiquetas temáticas.
+
+Sé ESPECÍFICO: "Post Motivacional" ❌ → "Micro-Lección de 30s con Aplicación Inmediata" ✅
+
+JSON:
+{{"concepts": [{{"label": "...", "description": "...", "strategic_rationale": "...",
+  "execution_guidelines": {{"structure": "...", "key_elements": ["..."], "dos": ["..."], "donts": ["..."]}},
+  "creative_hooks": ["..."], "suggested_format": "reel", "suggested_frequency": "medium", "tags": ["..."]}}]}}
+"""
+
+
+class BranchInvalid(ValueError):
+    """A completion parsed but does not satisfy the branch schema."""
+
+
+def _str_list(value: Any) -> list[str]:
+    if not isinstance(value, list):
+        return []
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def validate_objective(obj: Any) -> Optional[dict]:
+    """{"rationale", "strategies"} or None when the objective has too few usable strategies."""
+    if not isinstance(obj, dict):
+        return None
+    strategies = [
+        {"title": str(s.get("title")).strip(), "angle": str(s.get("angle") or "").strip()}
+        for s in obj.get("strategies") or []
+        if isinstance(s, dict) and str(s.get("title") or "").strip()
+    ]
+    if len(strategies) < MIN_STRATEGIES:
+        return None
+    return {"rationale": str(obj.get("rationale") or "").strip(), "strategies": strategies}
+
+
+def _objective_title(index: int) -> str:
+    return MAIN_OBJECTIVE if index == 0 else SECONDARY_OBJECTIVE
+
+
+def validate_skeleton(data: Any) -> list[dict]:
+    """Objectives with titles normalized to the root/principal/secondary convention."""
+    objectives = data.get("objectives") if isinstance(data, dict) else None
+    if not isinstance(objectives, list):
+        raise BranchInvalid("skeleton has no 'objectives' list")
+
+    valid = [obj for obj in map(validate_objective, objectives) if obj is not None]
+    if len(valid) < MIN_OBJECTIVES:
+        raise BranchInvalid(f"skeleton has {len(valid)} usable objectives, need {MIN_OBJECTIVES}")
+    for i, obj in enumerate(valid):
+        obj["title"] = _objective_title(i)
+    return valid
+
+
+def _validate_concept(concept: Any) -> Optional[dict]:
+    if not isinstance(concept, dict):
+        return None
+    label = str(concept.get("label") or concept.get("title") or "").strip()
+    if label.lower().startswith("concepto:"):
+        label = label.split(":", 1)[1].strip()
+    description = str(concept.get("description") or "").strip()
+    hooks = _str_list(concept.get("creative_hooks"))
+    guidelines = concept.get("execution_guidelines")
+    if not label or not description or len(hooks) < MIN_HOOKS or not isinstance(guidelines, dict):
+        return None
+
+    fmt = str(concept.get("suggested_format") or "").strip().lower()
+    frequency = str(concept.get("suggested_frequency") or "").strip().lower()
+    return {
+        "label": label,
+        "description": description,
+        "strategic_rationale": str(concept.get("strategic_rationale") or "").strip(),
+        "execution_guidelines": {
+            "structure": str(guidelines.get("structure") or "").strip(),
+            "key_elements": _str_list(guidelines.get("key_elements")),
+            "dos": _str_list(guidelines.get("dos")),
+            "donts": _str_list(guidelines.get("donts")),
+        },
+        "creative_hooks": hooks,
+        "suggested_format": fmt if fmt in FORMATS else "post",
+        "suggested_frequency": frequency if frequency in FREQUENCIES else "medium",
+        "tags": _str_list(concept.get("tags"))[:3],
+    }
+
+
+def validate_concepts(data: Any) -> list[dict]:
+    concepts = data.get("concepts") if isinstance(data, dict) else None
+    if not isinstance(concepts, list):
+        raise BranchInvalid("response has no 'concepts' list")
+    valid = [c for c in map(_validate_concept, concepts) if c is not None]
+    if len(valid) < MIN_CONCEPTS:
+        raise BranchInvalid(f"{len(valid)} valid concepts, need {MIN_CONCEPTS}")
+    return valid
+
+
+async def _complete_validated(system: str, prompt: str, validate, what: str, retries: int):
+    """Call the LLM until `validate` accepts the result (1 + retries attempts)."""
+    last_error: Optional[Exception] = None
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(min(2 ** attempt, 8))
+        try:
+            return validate(await _call_gemini(prompt, temperature=0.7, model="gpt-5-mini", system=system))
+        except Exception as e:
+            last_error = e
+            logger.warning(f"⚠️ Strategy {what}: attempt {attempt + 1}/{retries + 1} failed: {e}")
+    raise last_error
+
+
+def _analysis_insights(analysis_json: dict) -> str:
+    q9_recs = analysis_json.get("Q9", {}).get("results", {}).get("lista_recomendaciones", [])
+    q10_alert = analysis_json.get("Q10", {}).get("results", {}).get("alerta_prioritaria", "N/A")
+    return (
+        f"ESTADO ACTUAL: {q10_alert}\n"
+        f"RECOMENDACIONES CRÍTICAS (Data-Driven): {json.dumps(q9_recs[:5], ensure_ascii=False)}"
+    )
+
+
+def _system_prompt(interview_data: dict, analysis_json: dict, plan_type: str) -> str:
+    brand_name = interview_data.get("businessName") or interview_data.get("brand_name") or "Marca"
+    return STRATEGY_SYSTEM_PROMPT.format(
+        interview_context=_format_interview_data(interview_data),
+        analysis_insights=_analysis_insights(analysis_json or {}),
+        plan_type=plan_type,
+        brand_name=brand_name
+    )
+
+
+async def _stream_skeleton(system: str, prompt: str) -> AsyncIterator[dict]:
+    """Valid objectives, each as soon as the model finishes writing it."""
+    parser = JsonArrayItems("objectives")
+    async for text in _stream_gemini(prompt, model="gpt-5-mini", system=system):
+        for item in parser.feed(text):
+            obj = validate_objective(item)
+            if obj is None:
+                logger.warning("⚠️ Strategy skeleton: skipping objective with too few strategies")
+                continue
+            yield obj
+
+
+async def stream_strategy_tree(interview_data: dict, analysis_json: dict, plan_type: str = "pro") -> AsyncIterator[dict]:
+    """
+    Events, in completion order:
+      {"type": "objective", "index": i, "objective": {...}}        (strategies without concepts yet)
+      {"type": "concepts", "objective_index": i, "strategy_index": j, "concepts": [...]}
+      {"type": "done", "tree": {...}}                               (same shape as generate_strategy_tree)
+
+    If the skeleton stream fails before any objective is out, the skeleton falls
+    back to the buffered call with retries. Once objectives have been emitted
+    they are kept, even when the stream ends short of MIN_OBJECTIVES.
+    """
+    system = _system_prompt(interview_data or {}, analysis_json or {}, plan_type)
+    skeleton_prompt = SKELETON_PROMPT.format(min_objectives=MIN_OBJECTIVES, min_strategies=MIN_STRATEGIES,
+                                             main=MAIN_OBJECTIVE, secondary=SECONDARY_OBJECTIVE)
+    retries = settings.STRATEGY_BRANCH_RETRIES
+    sem = asyncio.Semaphore(settings.STRATEGY_CONCURRENCY)
+    queue: asyncio.Queue = asyncio.Queue()
+    objectives: list[dict] = []
+    branch_tasks: list[asyncio.Task] = []
+
+    async def expand(i: int, j: int, obj: dict, strategy: dict):
+        # Siblings known so far: later objectives may still be streaming
+        titles = [s["title"] for o in objectives for s in o["strategies"] if s is not strategy]
+        prompt = CONCEPTS_PROMPT.format(
+            objective_title=obj["title"],
+            objective_rationale=obj["rationale"],
+            strategy_title=strategy["title"],
+            strategy_angle=strategy["angle"] or "-",
+            sibling_titles="; ".join(titles) or "-"
+        )
+        async with sem:
+            try:
+                strategy["concepts"] = await _complete_validated(
+                    system, prompt, validate_concepts, f"branch '{strategy['title']}'", retries
+                )
+            except Exception as e:
+                logger.error(f"❌ Strategy branch '{strategy['title']}' failed: {e}")
+                strategy["concepts"] = []
+        queue.put_nowait({"type": "concepts", "objective_index": i, "strategy_index": j,
+                          "concepts": strategy["concepts"]})
+
+    def add_objective(obj: dict):
+        i = len(objectives)
+        obj["title"] = _objective_title(i)
+        objectives.append(obj)
+        queue.put_nowait({"type": "objective", "index": i, "objective": obj})
+        for j, strategy in enumerate(obj["strategies"]):
+            branch_tasks.append(asyncio.create_task(expand(i, j, obj, strategy)))
+
+    async def build():
+        try:
+            async for obj in _stream_skeleton(system, skeleton_prompt):
+                add_objective(obj)
+        except Exception as e:
+            logger.warning(f"⚠️ Strategy skeleton stream broke after {len(objectives)} objectives: {e}")
+        if not objectives:
+            logger.warning("⚠️ Strategy skeleton stream gave nothing usable, retrying buffered")
+            for obj in await _complete_validated(system, skeleton_prompt, validate_skeleton, "skeleton", retries):
+                add_objective(obj)
+        elif len(objectives) < MIN_OBJECTIVES:
+            logger.warning(f"⚠️ Strategy skeleton: only {len(objectives)} objectives (wanted {MIN_OBJECTIVES})")
+        await asyncio.gather(*branch_tasks)
+
+    builder = asyncio.create_task(build())
+    builder.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        await builder  # re-raises a skeleton failure
+    finally:
+        # Client went away mid-stream: stop spending tokens
+        for task in (builder, *branch_tasks):
+            task.cancel()
+
+    branches = [s for obj in objectives for s in obj["strategies"]]
+    failed = sum(1 for s in branches if not s["concepts"])
+    if failed == len(branches):
+        raise ValueError("Every strategy branch failed; keeping the previous strategy")
+    logger.info(
+        f"✅ Strategy tree: {len(objectives)} objectives, {len(branches)} strategies, "
+        f"{sum(len(s['concepts']) for s in branches)} concepts ({failed} failed branches)"
+    )
+    yield {"type": "done", "tree": {"root_label": ROOT_LABEL, "objectives": objectives}}
+
+
+async def generate_strategy_tree(interview_data: dict, analysis_json: dict, plan_type: str = "pro") -> dict:
+    async for event in stream_strategy_tree(interview_data, analysis_json, plan_type):
+        if event["type"] == "done":
+            return event["tree"]
+    raise ValueError("Strategy stream ended without a tree")
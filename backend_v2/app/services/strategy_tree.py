@@ -0,0 +1,134 @@
+"""
+Strategy Tree
+=============
+In-memory index over a client's flat `strategy_nodes` rows
+(root "main" -> objective -> strategy -> concept):
+
+- `node(id)` / `children(id)`: dict lookups.
+- `ancestors(id)`: parent chain, nearest first, in O(depth).
+- `by_type(type)`: nodes bucketed by type, in DB order.
+- `objectives()` / `strategies()` / `concepts()`: nodes by level. Objectives and
+  strategies share the "secondary" type and are told apart by depth.
+
+Rows are normalized on the way in: `parent_id` is always set, whether the source
+used `parent_id` (DB) or `parentId` (frontend).
+
+`get_strategy_tree(client_id)` builds the tree once per strategy version. The
+version is the response cache's "strategy:<client_id>" tag, which strategy writes
+made through SupabaseService bump. Writes that bypass it (SQL scripts, the
+Supabase dashboard) don't, and with the memory state backend the tag is per
+worker, so cached trees also expire after TREE_TTL_SECONDS: that bounds how
+stale a tree can be. Cached trees are shared: treat them as read-only.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Iterable, Optional
+
+from .database import db
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_TREES = 128
+TREE_TTL_SECONDS = 120  # same as the /strategy/{client_id} response cache policy
+CONCEPT_TYPES = ("concept", "post")  # "post" = Strategy v1 leaves
+
+
+def parent_of(node: dict) -> Optional[str]:
+    return node.get("parent_id") or node.get("parentId")
+
+
+class StrategyTree:
+    def __init__(self, nodes: Iterable[dict]):
+        self._nodes: dict[str, dict] = {}
+        self._children: dict[Optional[str], list[dict]] = defaultdict(list)
+        self._by_type: dict[str, list[dict]] = defaultdict(list)
+        self._depth: dict[str, int] = {}
+
+        for raw in nodes:
+            node = {**raw, "parent_id": parent_of(raw)}
+            node.pop("parentId", None)
+            self._nodes[node["id"]] = node
+            self._by_type[node.get("type")].append(node)
+        for node in self._nodes.values():
+            self._children[node["parent_id"]].append(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __iter__(self):
+        return iter(self._nodes.values())
+
+    def node(self, node_id: Optional[str]) -> Optional[dict]:
+        return self._nodes.get(node_id)
+
+    def children(self, node_id: Optional[str], node_type: Optional[str] = None) -> list[dict]:
+        kids = self._children.get(node_id, [])
+        return kids if node_type is None else [n for n in kids if n.get("type") == node_type]
+
+    def by_type(self, *node_types: str) -> list[dict]:
+        if len(node_types) == 1:
+            return self._by_type.get(node_types[0], [])
+        return [n for t in node_types for n in self._by_type.get(t, [])]
+
+    def ancestors(self, node_id: str) -> list[dict]:
+        """Parent, grandparent, ... up to the root (cycles in bad data are cut)."""
+        chain = []
+        seen = {node_id}
+        node = self._nodes.get(node_id)
+        while node is not None:
+            parent = self._nodes.get(node["parent_id"])
+            if parent is None or parent["id"] in seen:
+                break
+            chain.append(parent)
+            seen.add(parent["id"])
+            node = parent
+        return chain
+
+    def depth(self, node_id: str) -> int:
+        """0 for roots (nodes without a known parent)."""
+        if node_id not in self._depth:
+            self._depth[node_id] = len(self.ancestors(node_id))
+        return self._depth[node_id]
+
+    @property
+    def root(self) -> Optional[dict]:
+        roots = self.by_type("main")
+        return roots[0] if roots else None
+
+    def objectives(self) -> list[dict]:
+        return [n for n in self.by_type("secondary") if self.depth(n["id"]) == 1]
+
+    def strategies(self) -> list[dict]:
+        return [n for n in self.by_type("secondary") if self.depth(n["id"]) == 2]
+
+    def concepts(self) -> list[dict]:
+        return self.by_type(*CONCEPT_TYPES)
+
+
+_cache: "OrderedDict[str, tuple[int, float, StrategyTree]]" = OrderedDict()  # (version, built_at, tree)
+_cache_lock = threading.Lock()
+
+
+def get_strategy_tree(client_id: str) -> StrategyTree:
+    """The client's StrategyTree, rebuilt when its strategy changed or TREE_TTL_SECONDS passed."""
+    version = response_cache.tag_version(f"strategy:{client_id}")
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(client_id)
+        if cached and cached[0] == version and now - cached[1] < TREE_TTL_SECONDS:
+            _cache.move_to_end(client_id)
+            return cached[2]
+
+    tree = StrategyTree(db.get_strategy_nodes(client_id))
+    # An empty tree may be a failed fetch: don't pin it until the next write
+    if len(tree):
+        with _cache_lock:
+            _cache[client_id] = (version, now, tree)
+            _cache.move_to_end(client_id)
+            while len(_cache) > MAX_CACHED_TREES:
+                _cache.popitem(last=False)
+    return tree
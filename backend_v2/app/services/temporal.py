@@ -0,0 +1,250 @@
+"""
+Temporal Aggregation
+====================
+Vectorized time-bucketing for Q8 (no pandas on the hot path).
+
+Timestamps are parsed once into an int64 array of UTC epoch seconds; buckets
+are plain integer arithmetic on epoch days:
+
+- daily:   day number
+- weekly:  day number of the week start. Weeks end on Monday, matching the
+           pandas 'W-MON' periods the Q8 output has always used
+           (label "YYYY-MM-DD/YYYY-MM-DD", Tuesday..Monday)
+- monthly: months since 1970-01
+
+Per bucket: item count, mean sentiment and the modal topic (bincount/argmax).
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+FREQUENCIES = ("daily", "weekly", "monthly")
+
+# 1970-01-01 was a Thursday; (day + 2) % 7 == 0 on Tuesdays
+_WEEK_START_OFFSET = 2
+
+
+def _parse_offset(tail: str) -> Optional[int]:
+    """Seconds east of UTC for the part after 'YYYY-MM-DDTHH:MM:SS', None if unparseable."""
+    # Drop fractional seconds
+    i = 0
+    if tail.startswith("."):
+        i = 1
+        while i < len(tail) and tail[i].isdigit():
+            i += 1
+    tz = tail[i:]
+    if tz in ("", "Z", "z"):
+        return 0
+    if tz[0] in "+-":
+        digits = tz[1:].replace(":", "")
+        if len(digits) in (2, 4) and digits.isdigit():
+            seconds = int(digits[:2]) * 3600 + (int(digits[2:]) * 60 if len(digits) == 4 else 0)
+            return seconds if tz[0] == "+" else -seconds
+    return None
+
+
+def _parse_one(value: Any) -> Optional[int]:
+    """Slow path for a single value (datetimes, epoch numbers, odd ISO strings)."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        # Epoch seconds or milliseconds
+        return int(value / 1000) if value > 1e11 else int(value)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+    return None
+
+
+def _parse_uniform_iso(values: list) -> Optional[np.ndarray]:
+    """
+    Fast path for the common case (every value an ISO string, e.g. Apify's
+    "2024-01-15T10:30:00.000Z"): two slicing passes and one numpy parse.
+    Returns None if any value needs the general path.
+    """
+    try:
+        heads = [v[:19] for v in values]
+        tails = {v[19:] for v in values}
+    except TypeError:  # non-string values (None, numbers, datetimes)
+        return None
+    tail_offsets = {tail: _parse_offset(tail) for tail in tails}
+    if None in tail_offsets.values():
+        return None
+    try:
+        epochs = np.array(heads, dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        return None
+    if len(tail_offsets) == 1:
+        offset = next(iter(tail_offsets.values()))
+        return epochs - offset if offset else epochs
+    return epochs - np.array([tail_offsets[v[19:]] for v in values], dtype=np.int64)
+
+
+def parse_timestamps(values: Iterable[Any]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse timestamps into (epoch_seconds int64, valid bool) arrays of equal length.
+
+    ISO-8601 strings go through numpy's C datetime parser in one call; only
+    values it cannot take (non-strings, unusual offsets, garbage) are parsed
+    one by one.
+    """
+    values = list(values)
+    n = len(values)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+
+    fast = _parse_uniform_iso(values)
+    if fast is not None:
+        return fast, np.ones(n, dtype=bool)
+
+    epochs = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    heads: list[str] = []
+    head_idx: list[int] = []
+    offsets: list[int] = []
+    slow_idx: list[int] = []
+    tail_offsets: dict[str, Optional[int]] = {}
+
+    for i, value in enumerate(values):
+        if isinstance(value, str) and len(value) >= 10 and value[4:5] == "-":
+            tail = value[19:]
+            offset = tail_offsets.get(tail)
+            if offset is None and tail not in tail_offsets:
+                offset = tail_offsets[tail] = _parse_offset(tail)
+            if offset is not None:
+                heads.append(value[:19])
+                head_idx.append(i)
+                offsets.append(offset)
+                continue
+        slow_idx.append(i)
+
+    if heads:
+        try:
+            parsed = np.array(heads, dtype="datetime64[s]").astype(np.int64)
+            idx = np.asarray(head_idx, dtype=np.int64)
+            epochs[idx] = parsed - np.asarray(offsets, dtype=np.int64)
+            valid[idx] = True
+        except ValueError:
+            # At least one malformed string: fall back for this batch
+            slow_idx.extend(head_idx)
+
+    for i in slow_idx:
+        epoch = _parse_one(values[i])
+        if epoch is not None:
+            epochs[i] = epoch
+            valid[i] = True
+
+    return epochs, valid
+
+
+def bucket_ids(epochs: np.ndarray, freq: str = "weekly") -> np.ndarray:
+    """Integer bucket id per timestamp (see module docstring)."""
+    days = epochs // SECONDS_PER_DAY
+    if freq == "daily":
+        return days
+    if freq == "weekly":
+        return days - (days + _WEEK_START_OFFSET) % 7
+    if freq == "monthly":
+        return epochs.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unknown frequency '{freq}', expected one of {FREQUENCIES}")
+
+
+def bucket_label(bucket: int, freq: str = "weekly") -> str:
+    if freq == "monthly":
+        return str(np.datetime64(int(bucket), "M"))
+    start = np.datetime64(int(bucket), "D")
+    if freq == "weekly":
+        return f"{start}/{start + np.timedelta64(6, 'D')}"
+    return str(start)
+
+
+def temporal_series(
+    timestamps: Iterable[Any],
+    sentiments: Iterable[Any],
+    topics: Iterable[Any],
+    freq: str = "weekly",
+    last_n: Optional[int] = None,
+    default_topic: str = "General",
+) -> list[dict]:
+    """
+    Bucket items by time and aggregate each bucket.
+
+    Returns buckets in chronological order (only the last `last_n` when set):
+        [{"bucket": "2024-01-09/2024-01-15", "count": 42,
+          "mean_sentiment": 0.31, "top_topic": "Precio"}, ...]
+    Items whose timestamp cannot be parsed are ignored.
+    """
+    epochs, valid = parse_timestamps(timestamps)
+    if not valid.any():
+        return []
+
+    # Sentiment: missing / non-numeric counts as neutral (0), like fillna(0)
+    sentiments = list(sentiments)
+    try:
+        sentiment = np.nan_to_num(np.array(sentiments, dtype=np.float64), nan=0.0)  # None -> nan -> 0
+    except (TypeError, ValueError):
+        sentiment = np.fromiter(
+            (s if isinstance(s, (int, float)) and s == s else 0.0 for s in sentiments),
+            dtype=np.float64,
+            count=len(sentiments)
+        )
+
+    # Topics -> int codes in first-seen order; missing topics (-1) never win the mode
+    codes: dict[Any, int] = {}
+    topic_codes = np.fromiter(
+        (-1 if t is None else codes.setdefault(t, len(codes)) for t in topics),
+        dtype=np.int64,
+        count=len(epochs)
+    )
+
+    buckets = bucket_ids(epochs[valid], freq)
+    sentiment = sentiment[valid]
+    topic_codes = topic_codes[valid]
+
+    unique_buckets, inverse = np.unique(buckets, return_inverse=True)
+    if last_n is not None and len(unique_buckets) > last_n:
+        first_kept = len(unique_buckets) - last_n
+        keep = inverse >= first_kept
+        unique_buckets = unique_buckets[first_kept:]
+        inverse = inverse[keep] - first_kept
+        sentiment = sentiment[keep]
+        topic_codes = topic_codes[keep]
+
+    n_buckets = len(unique_buckets)
+    counts = np.bincount(inverse, minlength=n_buckets)
+    sentiment_sums = np.bincount(inverse, weights=sentiment, minlength=n_buckets)
+
+    n_topics = max(len(codes), 1)
+    has_topic = topic_codes >= 0
+    topic_matrix = np.bincount(
+        inverse[has_topic] * n_topics + topic_codes[has_topic],
+        minlength=n_buckets * n_topics
+    ).reshape(n_buckets, n_topics)
+    top_codes = topic_matrix.argmax(axis=1)
+    top_counts = topic_matrix.max(axis=1)
+    names = list(codes)
+
+    series = []
+    for b in range(n_buckets):
+        series.append({
+            "bucket": bucket_label(unique_buckets[b], freq),
+            "count": int(counts[b]),
+            "mean_sentiment": float(sentiment_sums[b] / counts[b]),
+            "top_topic": names[top_codes[b]] if top_counts[b] > 0 else default_topic,
+        })
+    return series
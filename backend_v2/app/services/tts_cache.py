@@ -0,0 +1,98 @@
+"""
+TTS Clip Cache
+==============
+Content-addressed on-disk cache for synthesized narration.
+
+Clips are keyed by sha256(voice, text) and stored as <key>.mp3. The directory
+is capped at TTS_CACHE_MAX_MB; least-recently-used clips (by mtime, refreshed
+on every hit) are evicted first.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def clip_key(text: str, voice: str) -> str:
+    return hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+class TTSClipCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.mp3"
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the clip path on hit (and mark it recently used)."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, audio: bytes) -> Path:
+        """Store a finished clip atomically and enforce the size cap. Blocking; run off-loop."""
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.path_for(key)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._evict()
+        return path
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """(mtime, bytes, path) of every clip on disk, whichever worker wrote it."""
+        clips = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".mp3"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another worker meanwhile
+                clips.append((stat.st_mtime, stat.st_size, entry.path))
+        return clips
+
+    def _evict(self):
+        # The directory is shared by every gunicorn worker: totals come from disk,
+        # not from a per-process index
+        clips = self._scan()
+        total = sum(size for _, size, _ in clips)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(clips):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            logger.debug(f"TTS cache: evicted {os.path.basename(path)}")
+
+
+tts_cache = TTSClipCache(
+    directory=settings.TTS_CACHE_DIR or os.path.join(tempfile.gettempdir(), "pixely_tts_cache"),
+    max_bytes=settings.TTS_CACHE_MAX_MB * 1024 * 1024
+)
@@ -0,0 +1,131 @@
+"""
+Benchmark: tokens per classification run, previous prompt format vs compact format.
+
+Previous: the whole CLASSIFICATION_PROMPT (instructions + brand context + pretty
+JSON comments) as one user message per batch; verbose JSON objects in the output.
+Compact:  stable system message (instructions + code tables + brand context),
+"<idx>\\t<text>" lines as the user message, "idx|e|p|t|s" code rows in the output.
+
+Counts with tiktoken (o200k_base) when installed, otherwise chars / 4. "Cacheable"
+is the part of the input that repeats as an identical prefix in every batch after
+the first (providers only cache prefixes of >= 1024 tokens).
+
+Run from backend_v2/:  python bench_classification_prompt.py [comments] [brand_context_chars]
+"""
+
+import json
+import random
+import sys
+
+from app.services.gemini_service import (
+    COMMERCE_TOPICS, EMOTIONS, PERSONALITIES,
+    build_classification_system_prompt, encode_comment_lines,
+)
+
+N_COMMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+BRAND_CONTEXT_CHARS = int(sys.argv[2]) if len(sys.argv) > 2 else 3000
+BATCH_SIZE = 50
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+try:
+    import tiktoken  # Optional: pip install tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+    count_tokens = lambda text: len(_encoding.encode(text))
+    COUNTER = "tiktoken o200k_base"
+except ImportError:
+    count_tokens = lambda text: len(text) // 4
+    COUNTER = "chars / 4 (install tiktoken for exact counts)"
+
+# Pre-compact prompt, verbatim, for comparison
+LEGACY_PROMPT = """
+IMPORTANT: Your response MUST be ONLY a valid JSON object.
+Do NOT add any text, explanation, or markdown before or after the JSON.
+Start directly with {{ and end with }}.
+
+Eres un clasificador experto de comentarios de redes sociales para marcas comerciales.
+
+CONTEXTO DE LA MARCA (Usa esto para entender mejor la relevancia de los comentarios):
+{brand_context}
+
+Tu trabajo es ETIQUETAR cada comentario con los siguientes campos:
+
+1. **emotion**: Una emoción de Plutchik (exactamente una):
+   Alegría, Confianza, Miedo, Sorpresa, Tristeza, Aversión, Ira, Anticipación
+
+2. **personality**: Rasgo de personalidad proyectado según Aaker:
+   Sinceridad, Emocion, Competencia, Sofisticacion, Robustez
+
+3. **topic**: Tema principal. PRIMERO intenta usar uno de estos 10 tópicos comerciales:
+   Precio, Calidad, Servicio, Entrega, Experiencia, Producto, Garantía, Comunicación, Confianza, Recomendación
+
+   Si el comentario NO encaja en ninguno de los anteriores, usa una categoría descriptiva
+   de máximo 2 palabras que capture el tema (ej: "Aprendizaje", "Entretenimiento", "Comunidad").
+
+4. **sentiment_score**: Número de -1.0 (muy negativo) a 1.0 (muy positivo)
+
+FORMATO DE SALIDA (OBLIGATORIO):
+- Devuelve ÚNICAMENTE un objeto JSON válido.
+- La raíz DEBE ser un objeto con la clave "results".
+- Cada ítem debe tener: idx, emotion, personality, topic, sentiment_score
+- El campo "idx" corresponde al índice del comentario en la lista de entrada.
+
+Ejemplo de salida EXACTA:
+{{"results": [{{"idx": 0, "emotion": "Alegría", "personality": "Sinceridad", "topic": "Calidad", "sentiment_score": 0.8}}, {{"idx": 1, "emotion": "Anticipación", "personality": "Emocion", "topic": "Aprendizaje", "sentiment_score": 0.7}}]}}
+
+COMENTARIOS A CLASIFICAR:
+{comments_json}
+"""
+
+WORDS = ("me encanta el producto la calidad es buena pero el envío tardó mucho precio talla "
+         "disponible atención excelente recomiendo marca color tienda pedido llegó rápido").split()
+
+
+def make_comments(n: int) -> list[str]:
+    rng = random.Random(3)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25))) for _ in range(n)]
+
+
+def make_labels(n: int) -> list[tuple]:
+    rng = random.Random(4)
+    return [(i, rng.randrange(len(EMOTIONS)), rng.randrange(len(PERSONALITIES)),
+             rng.randrange(len(COMMERCE_TOPICS)), rng.randint(-10, 10)) for i in range(n)]
+
+
+def legacy_tokens(comments, labels, brand_context):
+    inp = out = 0
+    for start in range(0, len(comments), BATCH_SIZE):
+        batch = [{"idx": start + j, "text": t} for j, t in enumerate(comments[start:start + BATCH_SIZE])]
+        inp += count_tokens(LEGACY_PROMPT.format(brand_context=brand_context,
+                                                 comments_json=json.dumps(batch, ensure_ascii=False)))
+        rows = [{"idx": i, "emotion": EMOTIONS[e], "personality": PERSONALITIES[p],
+                 "topic": COMMERCE_TOPICS[t], "sentiment_score": s / 10}
+                for i, e, p, t, s in labels[start:start + BATCH_SIZE]]
+        out += count_tokens(json.dumps({"results": rows}, ensure_ascii=False))
+    return inp, out, 0
+
+
+def compact_tokens(comments, labels, brand_context):
+    system = count_tokens(build_classification_system_prompt(brand_context))
+    inp = out = cacheable = 0
+    for n, start in enumerate(range(0, len(comments), BATCH_SIZE)):
+        inp += system + count_tokens(encode_comment_lines(list(enumerate(comments[start:start + BATCH_SIZE], start))))
+        rows = [f"{i}|{e}|{p}|{t}|{s}" for i, e, p, t, s in labels[start:start + BATCH_SIZE]]
+        out += count_tokens(json.dumps({"r": rows}))
+        if n > 0 and system >= PROVIDER_CACHE_MIN_TOKENS:
+            cacheable += system
+    return inp, out, cacheable
+
+
+if __name__ == "__main__":
+    comments = make_comments(N_COMMENTS)
+    labels = make_labels(N_COMMENTS)
+    brand_context = ("Marca de ropa deportiva sostenible, tono cercano, público 18-35. " * 100)[:BRAND_CONTEXT_CHARS]
+
+    print(f"{N_COMMENTS} comments, batches of {BATCH_SIZE}, brand context {BRAND_CONTEXT_CHARS} chars, counted with {COUNTER}\n")
+    print(f"{'format':<8} {'input':>10} {'output':>10} {'cacheable':>10}")
+    old = legacy_tokens(comments, labels, brand_context)
+    new = compact_tokens(comments, labels, brand_context)
+    for name, (inp, out, cached) in (("previous", old), ("compact", new)):
+        print(f"{name:<8} {inp:>10,} {out:>10,} {cached:>10,}")
+    print(f"\ninput  -{1 - new[0] / old[0]:.0%}   output -{1 - new[1] / old[1]:.0%}   "
+          f"uncached input -{1 - (new[0] - new[2]) / old[0]:.0%}")
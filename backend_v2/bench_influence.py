@@ -0,0 +1,64 @@
+"""
+Benchmark: Q5 influencer graph at scale.
+
+Builds the author/post/mention/hashtag graph and runs PageRank + top-K for a
+synthetic scrape (default 1,000,000 comments from 100,000 authors on 2,000 posts).
+
+Run from backend_v2/:  python bench_influence.py [comments] [authors]
+"""
+
+import random
+import sys
+import time
+
+from app.services.influence_graph import build_interaction_graph, pagerank, rank_influencers
+
+N_COMMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+N_AUTHORS = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+N_POSTS = 2_000
+
+
+def make_items(n: int, n_authors: int) -> list[dict]:
+    rng = random.Random(7)
+    items = [
+        {"author": "brand", "post_id": f"p{p}", "is_caption": True,
+         "content": "Nueva colección #verano", "hashtags": ["verano"], "mentions": [],
+         "ai_sentiment_score": 0.5}
+        for p in range(N_POSTS)
+    ]
+    for _ in range(n):
+        # Zipf-ish activity: a few authors comment a lot
+        author = f"user{int(n_authors * rng.random() ** 3)}"
+        text = "me encanta"
+        if rng.random() < 0.1:
+            text += f" @user{int(n_authors * rng.random() ** 2)}"
+        if rng.random() < 0.05:
+            text += " #oferta"
+        items.append({
+            "author": author, "post_id": f"p{rng.randrange(N_POSTS)}", "is_caption": False,
+            "content": text, "hashtags": [], "mentions": [],
+            "ai_sentiment_score": rng.uniform(-1, 1),
+        })
+    return items
+
+
+if __name__ == "__main__":
+    print(f"generating {N_COMMENTS:,} comments / {N_AUTHORS:,} authors...")
+    items = make_items(N_COMMENTS, N_AUTHORS)
+
+    start = time.perf_counter()
+    graph = build_interaction_graph(items)
+    built = time.perf_counter()
+    ranks = pagerank(graph)
+    ranked = time.perf_counter()
+    top = rank_influencers(items, k=5)
+    total = time.perf_counter()
+
+    print(f"graph: {graph.n_nodes:,} nodes, {len(graph.src):,} edges, {graph.n_authors:,} authors")
+    print(f"build graph:           {(built - start) * 1000:8.1f} ms")
+    print(f"pagerank:              {(ranked - built) * 1000:8.1f} ms")
+    print(f"rank_influencers (all): {(total - ranked) * 1000:8.1f} ms")
+    for inf in top:
+        print(f"  {inf['username']:<12} centralidad={inf['score_centralidad']:.2f} "
+              f"autoridad={inf['autoridad_promedio']} menciones={inf['menciones']} "
+              f"recibidas={inf['menciones_recibidas']}")
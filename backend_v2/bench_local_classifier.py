@@ -0,0 +1,149 @@
+"""
+Offline evaluation: local classifier tier vs LLM labels.
+
+For a set of comments labelled by the LLM, reports per confidence threshold:
+how many comments the local tier would answer (LLM calls/tokens saved) and how
+often its answer agrees with the LLM (topic, sentiment polarity, emotion).
+Also prints a reliability table and refits the Platt calibration
+(LOCAL_CLASSIFIER_CALIBRATION="a,b").
+
+Run from backend_v2/:
+    python bench_local_classifier.py labels.jsonl
+        labels: one {"text", "topic", "emotion", "sentiment_score"} per line
+    python bench_local_classifier.py --label-with-llm comments.txt labels.jsonl
+        labels one comment per line with the LLM only (costs API calls), then evaluates
+    python bench_local_classifier.py
+        small built-in sample, smoke test only
+"""
+
+import asyncio
+import json
+import sys
+
+import numpy as np
+
+from app.config import settings
+from app.services.local_classifier import classify_local
+from app.services.gemini_service import build_classification_system_prompt, encode_comment_lines
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95)
+BATCH_SIZE = 50
+NEUTRAL_BAND = 0.2
+
+SAMPLE = [
+    {"text": "🔥🔥🔥", "topic": "Experiencia", "emotion": "Alegría", "sentiment_score": 0.9},
+    {"text": "precio?", "topic": "Precio", "emotion": "Anticipación", "sentiment_score": 0.0},
+    {"text": "me encanta", "topic": "Producto", "emotion": "Alegría", "sentiment_score": 0.8},
+    {"text": "Hacen envíos a Arequipa?", "topic": "Entrega", "emotion": "Anticipación", "sentiment_score": 0.0},
+    {"text": "Pésima atención, nunca responden el DM", "topic": "Servicio", "emotion": "Ira", "sentiment_score": -0.8},
+    {"text": "Qué lindos colores 😍", "topic": "Producto", "emotion": "Alegría", "sentiment_score": 0.9},
+    {"text": "Tienen la talla S disponible?", "topic": "Producto", "emotion": "Anticipación", "sentiment_score": 0.0},
+    {"text": "Me llegó roto y no me quieren hacer el cambio", "topic": "Garantía", "emotion": "Ira", "sentiment_score": -0.8},
+    {"text": "La mejor marca, se las recomiendo", "topic": "Recomendación", "emotion": "Confianza", "sentiment_score": 0.9},
+    {"text": "Alguien sabe si es original?", "topic": "Confianza", "emotion": "Anticipación", "sentiment_score": 0.0},
+]
+
+
+def polarity(score) -> int:
+    score = float(score or 0.0)
+    return 0 if abs(score) < NEUTRAL_BAND else (1 if score > 0 else -1)
+
+
+def load_labels(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def label_with_llm(comments_path: str, out_path: str) -> list[dict]:
+    from app.services.gemini_service import classify_comments_batch
+
+    with open(comments_path, encoding="utf-8") as f:
+        comments = [line.strip() for line in f if line.strip()]
+    # A threshold above 1 keeps every comment on the LLM tier
+    results = await classify_comments_batch(comments, local_threshold=2.0)
+    labels = []
+    for r in results:
+        idx = r.get("idx")
+        if isinstance(idx, int) and 0 <= idx < len(comments):
+            labels.append({"text": comments[idx], **{k: r.get(k) for k in ("topic", "emotion", "personality", "sentiment_score")}})
+    with open(out_path, "w", encoding="utf-8") as f:
+        for row in labels:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    print(f"labelled {len(labels)}/{len(comments)} comments -> {out_path}")
+    return labels
+
+
+def prompt_tokens(texts: list[str]) -> int:
+    """Rough prompt size (chars / 4) for classifying `texts` in LLM batches."""
+    if not texts:
+        return 0
+    system = len(build_classification_system_prompt("x" * 500))  # typical brand context
+    n_batches = (len(texts) + BATCH_SIZE - 1) // BATCH_SIZE
+    payload = len(encode_comment_lines(list(enumerate(texts))))
+    return (n_batches * system + payload) // 4
+
+
+def fit_platt(raw: np.ndarray, agree: np.ndarray, steps: int = 5000, lr: float = 0.5) -> tuple[float, float]:
+    """Logistic regression of agreement on the raw score (gradient descent on log loss)."""
+    a, b = 1.0, 0.0  # identity-like start: the uncalibrated confidence is the raw score
+    y = agree.astype(np.float64)
+    for _ in range(steps):
+        p = 1.0 / (1.0 + np.exp(-(a * raw + b)))
+        grad = p - y
+        a -= lr * float(np.mean(grad * raw))
+        b -= lr * float(np.mean(grad))
+    return a, b
+
+
+def evaluate(labels: list[dict]):
+    texts = [row["text"] for row in labels]
+    predictions = [classify_local(t) for t in texts]
+    conf = np.array([p.confidence for p in predictions])
+    raw = np.array([p.raw_score for p in predictions])
+    topic_ok = np.array([p.topic == row.get("topic") for p, row in zip(predictions, labels)])
+    polarity_ok = np.array([polarity(p.sentiment_score) == polarity(row.get("sentiment_score")) for p, row in zip(predictions, labels)])
+    emotion_ok = np.array([p.emotion == row.get("emotion") for p, row in zip(predictions, labels)])
+    agree = topic_ok & polarity_ok
+
+    all_tokens = prompt_tokens(texts)
+    all_batches = (len(texts) + BATCH_SIZE - 1) // BATCH_SIZE
+    print(f"\n{len(texts)} labelled comments, LLM-only cost: {all_batches} calls, ~{all_tokens:,} prompt tokens\n")
+    print(f"{'thresh':>6} {'local':>7} {'topic':>6} {'polar':>6} {'emotion':>7} {'agree':>6} {'calls':>6} {'tokens saved':>13}")
+    for threshold in THRESHOLDS:
+        local = conf >= threshold
+        n_local = int(local.sum())
+        remaining = [t for t, is_local in zip(texts, local) if not is_local]
+        calls = (len(remaining) + BATCH_SIZE - 1) // BATCH_SIZE
+        saved = 1 - prompt_tokens(remaining) / all_tokens if all_tokens else 0.0
+
+        def rate(mask):
+            return f"{mask[local].mean():6.1%}" if n_local else "     -"
+
+        print(f"{threshold:>6.2f} {n_local / len(texts):>7.1%} {rate(topic_ok)} {rate(polarity_ok)} "
+              f"{rate(emotion_ok):>7} {rate(agree)} {calls:>6} {saved:>13.1%}")
+
+    print("\nreliability (topic + polarity agreement by confidence bin):")
+    edges = np.linspace(0, 1, 6)
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        mask = (conf >= lo) & (conf < hi if hi < 1 else conf <= hi)
+        if mask.any():
+            print(f"  [{lo:.1f}, {hi:.1f}) n={int(mask.sum()):5d}  mean conf {conf[mask].mean():.2f}  observed {agree[mask].mean():.2f}")
+
+    if 0 < agree.sum() < len(agree):
+        a, b = fit_platt(raw, agree)
+        print(f"\nrefitted calibration: LOCAL_CLASSIFIER_CALIBRATION=\"{a:.2f},{b:.2f}\"  (current: {settings.LOCAL_CLASSIFIER_CALIBRATION or 'none, raw score'})")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["--label-with-llm"] and len(args) == 3:
+        rows = asyncio.run(label_with_llm(args[1], args[2]))
+    elif args:
+        rows = load_labels(args[0])
+    else:
+        print("no labels file given: using the built-in sample (smoke test only)")
+        rows = SAMPLE
+    evaluate(rows)
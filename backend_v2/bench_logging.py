@@ -0,0 +1,95 @@
+"""
+Benchmark: per-request logging overhead, old vs new.
+
+"old"  = FileHandler attached at import (synchronous write + flush per record)
+         plus the print() debug dumps that ran on every DB lookup / pipeline run.
+"new"  = app.logging_config pipeline (QueueHandler -> listener thread, JSON).
+
+Each simulated request emits the same records the hot paths used to emit, then
+waits on simulated I/O (a DB/LLM round trip). Only the time spent inside the
+logging calls is counted: that is the overhead added to every request.
+Run from backend_v2/:  python bench_logging.py [requests]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from app.logging_config import _EnqueueHandler, JsonFormatter, DebugSamplingFilter
+
+N_REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+IO_WAIT_S = 0.0005  # simulated round trip between requests (not counted)
+
+# Roughly what `print("DB RESPONSE", response)` dumped for one user row
+FAKE_RESPONSE = {"data": [{"id": "u-1", "email": "a@b.c", "role": "client", "brand_id": "b-1", "profile": "x" * 400}]}
+
+
+def simulate_request(log: logging.Logger, with_prints: bool):
+    if with_prints:
+        print("DB RESPONSE", FAKE_RESPONSE)
+        print(f"🔍 [DEBUG] Interpretations received keys: {list(range(10))}")
+    log.info("DB Get User: %s", "a@b.c")
+    log.debug("cache lookup %s", "brand:b-1")
+    log.info("✅ Interpretations injected: %d blocks updated", 10)
+
+
+def timed_requests(log: logging.Logger, with_prints: bool) -> float:
+    elapsed = 0.0
+    for _ in range(N_REQUESTS):
+        start = time.perf_counter()
+        simulate_request(log, with_prints)
+        elapsed += time.perf_counter() - start
+        time.sleep(IO_WAIT_S)
+    return elapsed
+
+
+def run_old(tmpdir: str) -> float:
+    log = logging.getLogger("bench.old")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    handler = logging.FileHandler(os.path.join(tmpdir, "database_debug.log"))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    log.addHandler(handler)
+
+    # Line-buffered like a terminal's stdout (a real console is slower still)
+    with open(os.path.join(tmpdir, "stdout.txt"), "w", buffering=1, encoding="utf-8") as sink:
+        with redirect_stdout(sink):
+            elapsed = timed_requests(log, with_prints=True)
+    handler.close()
+    return elapsed
+
+
+def run_new(tmpdir: str) -> float:
+    import queue
+    from logging.handlers import QueueListener
+
+    log = logging.getLogger("bench.new")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    file_sink = logging.FileHandler(os.path.join(tmpdir, "app.log"))
+    file_sink.setFormatter(JsonFormatter())
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _EnqueueHandler(q)
+    handler.addFilter(DebugSamplingFilter(0.1))
+    log.addHandler(handler)
+    listener = QueueListener(q, file_sink)
+    listener.start()
+
+    elapsed = timed_requests(log, with_prints=False)
+    listener.stop()
+    file_sink.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmpdir:
+        old = run_old(tmpdir)
+        new = run_new(tmpdir)
+    print(f"requests: {N_REQUESTS}")
+    print(f"old (FileHandler + print): {old / N_REQUESTS * 1e6:8.1f} µs/request")
+    print(f"new (queue + JSON):        {new / N_REQUESTS * 1e6:8.1f} µs/request")
+    print(f"saved:                     {(old - new) / N_REQUESTS * 1e6:8.1f} µs/request ({old / new:.1f}x)")
@@ -0,0 +1,72 @@
+"""
+Benchmark: cold import time of the API (what every container start / worker fork pays).
+
+Runs `python -X importtime -c "import app.main"` in fresh interpreters and reports
+wall time plus the slowest top-level packages by cumulative import time. Heavy SDKs
+(openai, google.genai, supabase, apify_client, edge_tts, PIL, pandas) should NOT
+appear: they are imported on first use.
+
+Run from backend_v2/:  python bench_startup.py [--runs 5] [--top 15] [--module app.main]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """
+    Cumulative import time (µs) per top-level package from one -X importtime run.
+    A package is counted where it is first entered from a different package, so
+    e.g. `openai` shows up even when it is pulled in by `app.services.*`.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.exit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    by_package: dict[str, int] = defaultdict(int)
+    pending: dict[int, list[tuple[str, int]]] = defaultdict(list)  # depth -> unclaimed children
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package" (children print before parents)
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        package = name.strip().split(".")[0]
+        for child_package, child_us in pending.pop(depth + 1, []):
+            if child_package != package:
+                by_package[child_package] += child_us
+        if depth == 0:
+            by_package[package] += int(cumulative)
+        else:
+            pending[depth].append((package, int(cumulative)))
+    return by_package
+
+
+def wall_time(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--module", default="app.main")
+    args = parser.parse_args()
+
+    walls = [wall_time(args.module) for _ in range(args.runs)]
+    profile = import_profile(args.module)
+
+    print(f"import {args.module}: median {statistics.median(walls) * 1000:.0f} ms "
+          f"(min {min(walls) * 1000:.0f}, max {max(walls) * 1000:.0f}, {args.runs} runs)")
+    print(f"\n{'package':<30}{'cumulative ms':>15}")
+    for name, us in sorted(profile.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"{name:<30}{us / 1000:>15.1f}")
@@ -0,0 +1,254 @@
+"""
+Fake Apify API for developing / testing the async scrape mode without an Apify account.
+
+Implements the slice of the Apify v2 API that apify_service uses:
+
+    POST /v2/acts/<actor>/runs               start a run (run_input as body, ?webhooks=<base64>)
+    GET  /v2/actor-runs/<run_id>             run status (?waitForFinish=<s> blocks, as actor.call() uses)
+    POST /v2/actor-runs/<run_id>/abort       abort a running run
+    GET  /v2/datasets/<dataset_id>/items     the run's posts (Apify pagination headers included)
+
+Runs finish after --delay seconds and then POST the ACTOR.RUN.* webhooks registered
+with them, with Apify's default payload ({"eventType", "eventData", "resource"}).
+Posts are generated deterministically per profile and honor resultsLimit and
+onlyPostsNewerThan; --new-post-every makes a new post appear periodically, to
+exercise incremental scrapes.
+
+Run from backend_v2/:
+
+    python fake_apify_server.py [--port 8765] [--delay 3] [--drop-webhooks]
+
+and start the API with:
+
+    APIFY_TOKEN=fake APIFY_API_URL=http://localhost:8765 APIFY_ASYNC_MODE=true \\
+    APIFY_WEBHOOK_BASE_URL=http://localhost:8000 APIFY_WEBHOOK_SECRET=dev uvicorn app.main:app
+
+--drop-webhooks never calls back, so only the API's polling fallback can resume.
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COMMENTS = [
+    "Me encanta, ¿tienen envíos a provincia?",
+    "Muy caro para lo que es 😕",
+    "¡Increíble calidad! Ya es mi segunda compra",
+    "Pedí hace dos semanas y aún no llega",
+    "¿Hay talla M?",
+    "🔥🔥🔥",
+    "La atención por DM fue excelente",
+    "Precio?",
+]
+
+runs: dict[str, dict] = {}
+run_inputs: dict[str, dict] = {}
+run_webhooks: dict[str, list] = {}
+runs_lock = threading.Condition()
+options = argparse.Namespace()
+started_at = datetime.now(timezone.utc)
+
+
+def iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def make_post(username: str, number: int, posted_at: datetime) -> dict:
+    code = f"{username[:4]}{number:04d}"
+    seed = sum(map(ord, code))
+    return {
+        "id": str(seed * 7919),
+        "shortCode": code,
+        "url": f"https://www.instagram.com/p/{code}/",
+        "type": "Image",
+        "caption": f"Post {code} de @{username} #nuevacoleccion",
+        "hashtags": ["nuevacoleccion"],
+        "mentions": [],
+        "likesCount": 100 + seed % 400,
+        "commentsCount": 4 + seed % 20,
+        "timestamp": iso(posted_at),
+        "ownerUsername": username,
+        "latestComments": [
+            {"id": f"{code}-{i}", "ownerUsername": f"user{(seed + i) % 97}",
+             "text": COMMENTS[(seed + i) % len(COMMENTS)], "timestamp": iso(posted_at + timedelta(hours=i + 1))}
+            for i in range(3 + seed % 5)
+        ],
+    }
+
+
+def profile_posts(profile_url: str) -> list[dict]:
+    """--posts posts, one every 36h before startup, plus one per --new-post-every since. Newest first."""
+    username = urlparse(profile_url).path.strip("/").split("/")[0].lower() or "brand"
+    elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+    extra = int(elapsed // options.new_post_every) if options.new_post_every else 0
+    new = [
+        make_post(username, options.posts + k, started_at + timedelta(seconds=options.new_post_every * k))
+        for k in range(extra, 0, -1)
+    ]
+    return new + [
+        make_post(username, options.posts - n, started_at - timedelta(hours=36) * n)
+        for n in range(options.posts)
+    ]
+
+
+def dataset_items(run_id: str) -> list[dict]:
+    run_input = run_inputs[run_id]
+    items = []
+    for url in run_input.get("directUrls", []):
+        items.extend(profile_posts(url))
+    newer_than = run_input.get("onlyPostsNewerThan")
+    if newer_than:
+        items = [p for p in items if p["timestamp"][:len(newer_than)] >= newer_than]
+    items = items[:run_input.get("resultsLimit", 100)]
+    # Like the real actor: an error item when nothing matched
+    return items or [{"error": "no_items", "errorDescription": "Empty or private data for provided input"}]
+
+
+def send_webhooks(run: dict):
+    event = f"ACTOR.RUN.{run['status'].replace('-', '_')}"
+    for hook in run_webhooks.get(run["id"], []):
+        if event not in hook.get("eventTypes", []):
+            continue
+        payload = {
+            "userId": "fake",
+            "createdAt": iso(datetime.now(timezone.utc)),
+            "eventType": event,
+            "eventData": {"actorId": run["actId"], "actorRunId": run["id"]},
+            "resource": run,
+        }
+        request = urllib.request.Request(
+            hook["requestUrl"], data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                print(f"🔔 webhook {event} -> {hook['requestUrl']} [{response.status}]")
+        except Exception as e:
+            print(f"⚠️ webhook {event} -> {hook['requestUrl']} failed: {e}")
+
+
+def finish_run(run_id: str, status: str = "SUCCEEDED"):
+    with runs_lock:
+        run = runs[run_id]
+        if run["status"] != "RUNNING":
+            return
+        run["status"] = status
+        run["finishedAt"] = iso(datetime.now(timezone.utc))
+        runs_lock.notify_all()
+    print(f"✅ run {run_id} {status}")
+    if not options.drop_webhooks:
+        send_webhooks(run)
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _json(self, body, status=200, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._json({"error": {"type": "record-not-found", "message": "Not found"}}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 4 and parts[:2] == ["v2", "actor-runs"] and parts[3] == "abort":
+            if parts[2] not in runs:
+                return self._not_found()
+            finish_run(parts[2], "ABORTED")
+            return self._json({"data": runs[parts[2]]})
+        if len(parts) != 4 or parts[:2] != ["v2", "acts"] or parts[3] != "runs":
+            return self._not_found()
+        query = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if self.headers.get("Content-Encoding") == "gzip":  # apify_client gzips JSON bodies
+            body = gzip.decompress(body)
+        run_input = json.loads(body or b"{}")
+        webhooks = json.loads(base64.b64decode(query["webhooks"][0])) if "webhooks" in query else []
+
+        run_id = uuid.uuid4().hex[:17]
+        run = {
+            "id": run_id,
+            "actId": parts[2],
+            "status": "RUNNING",
+            "startedAt": iso(datetime.now(timezone.utc)),
+            "finishedAt": None,
+            "defaultDatasetId": f"ds{run_id}",
+            "defaultKeyValueStoreId": f"kv{run_id}",
+        }
+        with runs_lock:
+            runs[run_id] = run
+            run_inputs[run_id] = run_input
+            run_webhooks[run_id] = webhooks
+        timer = threading.Timer(options.delay, finish_run, args=(run_id,))
+        timer.daemon = True
+        timer.start()
+        print(f"🛫 run {run_id} started for {run_input.get('directUrls')} ({len(webhooks)} webhooks)")
+        self._json({"data": run}, 201)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        query = parse_qs(url.query)
+        if len(parts) == 3 and parts[:2] == ["v2", "actor-runs"]:
+            wait = float(query.get("waitForFinish", ["0"])[0])
+            deadline = time.time() + wait
+            with runs_lock:
+                run = runs.get(parts[2])
+                while run and run["status"] == "RUNNING" and time.time() < deadline:
+                    runs_lock.wait(deadline - time.time())
+            return self._json({"data": run}) if run else self._not_found()
+
+        if len(parts) == 4 and parts[:2] == ["v2", "datasets"] and parts[3] == "items":
+            run_id = parts[2].removeprefix("ds")
+            if run_id not in runs:
+                return self._not_found()
+            items = dataset_items(run_id)
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", [str(len(items))])[0] or len(items))
+            page = items[offset:offset + limit]
+            return self._json(page, headers={
+                "X-Apify-Pagination-Total": len(items),
+                "X-Apify-Pagination-Offset": offset,
+                "X-Apify-Pagination-Count": len(page),
+                "X-Apify-Pagination-Limit": limit,
+                "X-Apify-Pagination-Desc": "false",
+            })
+        self._not_found()
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=3.0, help="seconds until a run succeeds")
+    parser.add_argument("--posts", type=int, default=30, help="posts per profile")
+    parser.add_argument("--new-post-every", type=float, default=0, help="seconds between new posts (0 = never)")
+    parser.add_argument("--drop-webhooks", action="store_true", help="never call webhooks (test polling)")
+    parser.parse_args(namespace=options)
+
+    server = ThreadingHTTPServer(("0.0.0.0", options.port), Handler)
+    print(f"🧪 Fake Apify API on http://localhost:{options.port} (runs finish after {options.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
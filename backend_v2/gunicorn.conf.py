@@ -0,0 +1,65 @@
+"""
+Gunicorn settings for the multi-worker production profile.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+- Uvicorn workers (async). Several workers need a shared state store (response
+  cache, pipeline job state, single-flight, Apify runs): with STATE_BACKEND=sqlite
+  (single host) or redis, WEB_CONCURRENCY workers (default: one per core); with
+  the per-process memory backend, one worker, and startup fails if more are
+  requested. The Dockerfile and Procfile default to STATE_BACKEND=sqlite.
+- preload_app: app.main is imported once in the master and shared copy-on-write.
+  SDK clients are created lazily, so no sockets exist before the fork.
+- Metrics: with several workers, each one writes its metrics to METRICS_DIR
+  (default <tmp>/pixely_metrics, wiped at startup) and /metrics serves their sum,
+  so a scrape sees the whole server whichever worker answers it.
+- Pipelines run for minutes as in-process background tasks: workers are not
+  recycled by request count (GUNICORN_MAX_REQUESTS, default 0 = never) and get
+  GUNICORN_GRACEFUL_TIMEOUT (default: the longest pipeline stage) to finish them
+  on shutdown.
+
+Single-process development is unchanged: uvicorn app.main:app --reload
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from app.config import settings
+
+SHARED_STATE_BACKENDS = ("sqlite", "redis")
+shared_state = settings.STATE_BACKEND.lower() in SHARED_STATE_BACKENDS
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() if shared_state else 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Analysis pipelines and image generation hold requests open for a long time
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "900"))  # = longest pipeline stage
+keepalive = 5
+
+# Recycling a worker kills its running pipelines: opt-in only
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = 200 if max_requests else 0
+
+accesslog = "-"
+
+# Set before preload_app imports the app, so every forked worker inherits it
+if workers > 1 and not settings.METRICS_DIR:
+    settings.METRICS_DIR = os.path.join(tempfile.gettempdir(), "pixely_metrics")
+
+
+def on_starting(server):
+    if workers > 1 and not shared_state:
+        raise RuntimeError(
+            f"STATE_BACKEND={settings.STATE_BACKEND} with {workers} workers: response cache "
+            f"invalidation, pipeline status, single-flight and Apify runs would be per-worker. "
+            f"Use STATE_BACKEND=sqlite or redis, or WEB_CONCURRENCY=1."
+        )
+    if settings.METRICS_DIR:
+        # Snapshots from a previous run would be added to this run's counters
+        shutil.rmtree(settings.METRICS_DIR, ignore_errors=True)
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
@@ -0,0 +1,61 @@
+-- =============================================================================
+-- Migration: Composite indexes for list endpoints
+-- Description: Supports server-side filters + keyset pagination on
+--              (created_at, id) used by SupabaseService list/page methods.
+-- =============================================================================
+
+-- ============================================================================
+-- TASKS
+-- /planning/{client_id}/history, /api/v1/fichas/{client_id}/tasks,
+-- /api/admin/brands/{brand_id}/tasks
+-- ============================================================================
+
+-- Keyset pagination per client
+CREATE INDEX IF NOT EXISTS idx_tasks_client_created_id
+    ON tasks(client_id, created_at, id);
+
+-- month_group filter (Planning module: one month at a time)
+CREATE INDEX IF NOT EXISTS idx_tasks_client_month_created_id
+    ON tasks(client_id, month_group, created_at, id);
+
+-- status / week filters (Kanban)
+CREATE INDEX IF NOT EXISTS idx_tasks_client_status_week
+    ON tasks(client_id, status, week);
+
+-- ============================================================================
+-- STRATEGY NODES
+-- get_strategy_nodes orders by created_at; has_strategy_nodes uses LIMIT 1
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_strategy_nodes_client_created
+    ON strategy_nodes(client_id, created_at);
+
+-- ============================================================================
+-- GENERATED IMAGES (gallery is newest first)
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_generated_images_client_created_id
+    ON generated_images(client_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_generated_images_task_created
+    ON generated_images(task_id, created_at DESC);
+
+-- ============================================================================
+-- CLIENTS / USERS
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_clients_created_id
+    ON clients(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_users_created_id
+    ON users(created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_users_client_created_id
+    ON users(client_id, created_at, id);
+
+-- ============================================================================
+-- ANALYSIS REPORTS (latest completed report per client)
+-- ============================================================================
+
+CREATE INDEX IF NOT EXISTS idx_analysis_reports_client_status_created
+    ON analysis_reports(client_id, status, created_at DESC);
@@ -0,0 +1,52 @@
+-- =============================================================================
+-- Migration: Split analysis reports into header + per-section rows
+-- Description: analysis_reports keeps a slim header (status, content_hash,
+--              section_keys). Each Q block (and the audit log) is stored as its
+--              own JSONB row so readers load only the sections they need.
+-- =============================================================================
+
+-- ============================================================================
+-- HEADER COLUMNS
+-- ============================================================================
+
+ALTER TABLE analysis_reports
+ADD COLUMN IF NOT EXISTS content_hash TEXT,       -- sha256 of the full result; used as ETag
+ADD COLUMN IF NOT EXISTS section_keys TEXT[];     -- NULL = legacy row (payload still inline)
+
+-- ============================================================================
+-- SECTIONS
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS analysis_report_sections (
+    report_id TEXT NOT NULL REFERENCES analysis_reports(id) ON DELETE CASCADE,
+    section_key TEXT NOT NULL,                    -- "_metadata", "Q1".."Q10", "audit_log"
+    payload JSONB NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (report_id, section_key)
+);
+
+-- ============================================================================
+-- BACKFILL (existing reports)
+-- ============================================================================
+
+INSERT INTO analysis_report_sections (report_id, section_key, payload)
+SELECT r.id, e.key, e.value
+FROM analysis_reports r, jsonb_each(r.frontend_compatible_json) e
+WHERE r.frontend_compatible_json IS NOT NULL
+ON CONFLICT (report_id, section_key) DO NOTHING;
+
+INSERT INTO analysis_report_sections (report_id, section_key, payload)
+SELECT r.id, 'audit_log', r.audit_log
+FROM analysis_reports r
+WHERE r.audit_log IS NOT NULL
+ON CONFLICT (report_id, section_key) DO NOTHING;
+
+UPDATE analysis_reports r
+SET section_keys = ARRAY(SELECT jsonb_object_keys(r.frontend_compatible_json)),
+    content_hash = md5(r.frontend_compatible_json::text)
+WHERE r.frontend_compatible_json IS NOT NULL
+  AND r.section_keys IS NULL;
+
+-- Once the backfill is verified the inline payloads can be dropped:
+-- UPDATE analysis_reports SET frontend_compatible_json = NULL, audit_log = NULL
+-- WHERE section_keys IS NOT NULL;
@@ -0,0 +1,205 @@
+"""
+Async Apify mode against fake_apify_server.py (no Apify account, DB or LLM needed):
+
+- webhook path: the run calls back, the webhook resumes the pipeline
+- --drop-webhooks path: nothing calls back, the poller resumes it
+- deadline: a run that never finishes fails its job and frees the inflight key
+- a resumed run holds the inflight key again for the rest of the pipeline
+
+Run from backend_v2/:
+    python -m pytest -q test_apify_async_mode.py
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import fake_apify_server
+from app.config import settings
+from app.routers import pipeline
+from app.services import state_store
+
+PROFILE = "https://www.instagram.com/fakebrand/"
+SECRET = "test-secret"
+
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class WebhookInbox(BaseHTTPRequestHandler):
+    """Stands in for the public API URL: keeps what Apify POSTs."""
+    received: list[tuple[dict, dict]] = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        WebhookInbox.received.append((parse_qs(urlparse(self.path).query), body))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+@pytest.fixture
+def async_mode(monkeypatch):
+    fake_apify_server.options.__dict__.update(delay=0.3, posts=5, new_post_every=0, drop_webhooks=False)
+    apify = _serve(fake_apify_server.Handler)
+    WebhookInbox.received = []
+    inbox = _serve(WebhookInbox)
+
+    monkeypatch.setattr(settings, "APIFY_TOKEN", "fake")
+    monkeypatch.setattr(settings, "APIFY_API_URL", f"http://127.0.0.1:{apify.server_port}")
+    monkeypatch.setattr(settings, "APIFY_WEBHOOK_BASE_URL", f"http://127.0.0.1:{inbox.server_port}")
+    monkeypatch.setattr(settings, "APIFY_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(state_store, "_state_store", state_store.MemoryBackend())
+
+    resumed, failed = [], []
+
+    async def run_full_pipeline(report_id, client_id, instagram_url, comments_limit=1000, scraped=None):
+        resumed.append((report_id, scraped))
+
+    monkeypatch.setattr(pipeline, "_run_full_pipeline", run_full_pipeline)
+    monkeypatch.setattr(pipeline.db, "update_report_status",
+                        lambda report_id, status, **kwargs: failed.append((report_id, status, kwargs)))
+    yield {"resumed": resumed, "failed": failed}
+    apify.shutdown()
+    inbox.shutdown()
+
+
+def _suspend(report_id: str, ttl: float = state_store.INFLIGHT_TTL_SECONDS) -> str:
+    """launch_pipeline up to the point where async mode hands off to Apify."""
+    state_store.set_job_state(report_id, "PROCESSING", 0, client_id="c1")
+    assert state_store.claim_inflight(pipeline._inflight_key("c1", PROFILE), report_id, ttl) is None
+    return report_id
+
+
+async def _wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+async def _drain():
+    while pipeline._resume_tasks:
+        await asyncio.gather(*pipeline._resume_tasks)
+
+
+def _pending_runs() -> list[str]:
+    return state_store.get_state_store().keys(pipeline.RUN_RECORD_PREFIX)
+
+
+def test_webhook_resumes_the_pipeline(async_mode):
+    async def scenario():
+        report_id = _suspend("r-webhook")
+        await pipeline._start_apify_run(report_id, "c1", PROFILE)
+        assert len(_pending_runs()) == 1
+
+        await _wait_for(lambda: WebhookInbox.received)
+        query, payload = WebhookInbox.received[0]
+        assert query["token"] == [SECRET]
+        assert payload["eventType"] == "ACTOR.RUN.SUCCEEDED"
+
+        api = FastAPI()
+        api.include_router(pipeline.router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://api") as client:
+            bad = await client.post("/pipeline/apify/webhook", params={"token": "nope"}, json=payload)
+            assert bad.status_code == 401
+            ok = await client.post("/pipeline/apify/webhook", params={"token": SECRET}, json=payload)
+            assert ok.status_code == 202
+            await _drain()
+            # Webhook retry: already resumed, nothing happens
+            retry = await client.post("/pipeline/apify/webhook", params={"token": SECRET}, json=payload)
+            assert retry.status_code == 202
+            await _drain()
+
+    asyncio.run(scenario())
+    assert len(async_mode["resumed"]) == 1
+    report_id, scraped = async_mode["resumed"][0]
+    assert report_id == "r-webhook"
+    assert len(scraped["posts"]) == 5 and scraped["all_comments"]
+    assert _pending_runs() == []
+
+
+def test_webhook_requires_the_secret(async_mode, monkeypatch):
+    monkeypatch.setattr(settings, "APIFY_WEBHOOK_SECRET", "")
+    assert pipeline._webhook_url() is None
+
+    async def scenario():
+        api = FastAPI()
+        api.include_router(pipeline.router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api), base_url="http://api") as client:
+            response = await client.post("/pipeline/apify/webhook", json={"resource": {"id": "x"}})
+            assert response.status_code == 401
+
+    asyncio.run(scenario())
+
+
+def test_polling_resumes_without_webhooks(async_mode):
+    fake_apify_server.options.drop_webhooks = True
+
+    async def scenario():
+        report_id = _suspend("r-poll")
+        await pipeline._start_apify_run(report_id, "c1", PROFILE)
+        # Still running: polling leaves it pending
+        assert pipeline.poll_pending_runs() == 1
+        await _drain()
+        assert _pending_runs() and not async_mode["resumed"]
+
+        await asyncio.sleep(0.5)
+        assert pipeline.poll_pending_runs() == 1
+        await _drain()
+
+    asyncio.run(scenario())
+    assert WebhookInbox.received == []
+    assert [r for r, _ in async_mode["resumed"]] == ["r-poll"]
+    assert _pending_runs() == []
+
+
+def test_overdue_run_fails_the_job(async_mode, monkeypatch):
+    fake_apify_server.options.delay = 60
+    monkeypatch.setattr(settings, "APIFY_RUN_DEADLINE_SECONDS", 0)
+
+    async def scenario():
+        report_id = _suspend("r-stuck")
+        await pipeline._start_apify_run(report_id, "c1", PROFILE)
+        await asyncio.sleep(0.05)
+        assert pipeline.poll_pending_runs() == 1
+        await _drain()
+
+    asyncio.run(scenario())
+    assert async_mode["resumed"] == []
+    assert [(r, s) for r, s, _ in async_mode["failed"]] == [("r-stuck", "ERROR")]
+    job = state_store.get_job_state("r-stuck")
+    assert job["status"] == "ERROR" and "did not finish" in job["message"]
+    assert _pending_runs() == []
+    # The inflight key is free again: a new analysis of the profile can start
+    state_store.set_job_state("r-next", "PROCESSING", 0, client_id="c1")
+    assert state_store.claim_inflight(pipeline._inflight_key("c1", PROFILE), "r-next") is None
+
+
+def test_resume_refreshes_the_inflight_key(async_mode):
+    fake_apify_server.options.drop_webhooks = True
+
+    async def scenario():
+        # The registration expires while the run is still going
+        report_id = _suspend("r-slow", ttl=0.2)
+        await pipeline._start_apify_run(report_id, "c1", PROFILE)
+        await asyncio.sleep(0.5)
+        assert pipeline.poll_pending_runs() == 1
+        await _drain()
+
+    asyncio.run(scenario())
+    assert [r for r, _ in async_mode["resumed"]] == ["r-slow"]
+    inflight = state_store.get_state_store().get(f"inflight:{pipeline._inflight_key('c1', PROFILE)}")
+    assert inflight == b"r-slow"